@@ -1,49 +1,78 @@
 from dotenv import load_dotenv
-from groq import Groq
-from langfuse import observe, get_client
+from llm_gateway import make_groq_client
+import tracing
+from tracing import observe
+import deadline
+from question_cache import QuestionCache, cache_enabled
 
 GROUP_NAME = "GROUPE_NOA_NIELS"
 
 load_dotenv()
-langfuse = get_client()
 
-groq_client = Groq()
+groq_client = make_groq_client()
+
+# Questions reformulées ("fast simple meals for dinner?") : réponse multi-température déjà calculée
+question_cache = QuestionCache.from_env()
 
 
 @observe(name="ask_chef", as_type="generation")
-def ask_chef(question: str) -> str:
+def ask_chef(question: str, deadline_s: float = None) -> str:
+    if cache_enabled():
+        cached = question_cache.lookup(question)
+        if cached is not None:
+            answer, similarity, cached_question = cached
+            tracing.update_current_trace(metadata={"question_cache": "hit", "similarity": round(similarity, 3)})
+            print(f"[CACHE] Réponse de « {cached_question} » réutilisée (similarité {similarity:.2f})")
+            return answer
+
     # On définit la liste ici
     temperatures = [0.1, 0.7, 1.2]
     resultat_complet = ""
+    complete = True
 
-    # On doit boucler car groq.create n'accepte qu'un seul nombre (float) à la fois
-    for temp in temperatures:
-        langfuse.update_current_trace(
-            name=f"{GROUP_NAME}, Partie 1",
-            tags=[GROUP_NAME, "Partie 1"],
-            metadata={
-                "type":"ask_chef",
-                "temperature": temp,
-            }
-        )
-
-        response = groq_client.chat.completions.create(
-            model="openai/gpt-oss-120b",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a specialized french chef with a deep knowledge of seasonal ingredients and traditional recipes. You provide concise and practical cooking advice based on the user's question."
-                },
-                {"role": "user", "content": question}
-            ],
-            temperature=temp  # On utilise la variable temp (un chiffre) de la boucle
-        )
-        
-        # On ajoute la réponse au résultat final
-        resultat_complet += f"\n--- Temperature {temp} ---\n{response.choices[0].message.content}\n"
+    with deadline.scope(deadline_s) as budget:
+        # On doit boucler car groq.create n'accepte qu'un seul nombre (float) à la fois
+        for temp in temperatures:
+            # Budget court : on s'arrête aux températures déjà obtenues
+            if resultat_complet and not budget.allows(budget.typical_stage_s()):
+                resultat_complet += "\n(Températures suivantes ignorées : budget de temps épuisé)\n"
+                complete = False
+                break
+            with budget.stage():
+                resultat_complet += _ask_at_temperature(question, temp)
 
+    # Une réponse tronquée par la deadline n'est pas mise en cache
+    if complete and cache_enabled():
+        question_cache.store(question, resultat_complet)
     return resultat_complet
 
-# Un seul appel ici, comme demandé
-print(ask_chef("What are some quick and easy meals I can make for dinner?"))
-langfuse.flush()
\ No newline at end of file
+
+def _ask_at_temperature(question: str, temp: float) -> str:
+    tracing.update_current_trace(
+        name=f"{GROUP_NAME}, Partie 1",
+        tags=[GROUP_NAME, "Partie 1"],
+        metadata={
+            "type":"ask_chef",
+            "temperature": temp,
+        }
+    )
+
+    response = groq_client.chat.completions.create(
+        model="openai/gpt-oss-120b",
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a specialized french chef with a deep knowledge of seasonal ingredients and traditional recipes. You provide concise and practical cooking advice based on the user's question."
+            },
+            {"role": "user", "content": question}
+        ],
+        temperature=temp  # On utilise la variable temp (un chiffre) de la boucle
+    )
+    
+    # Bloc ajouté au résultat final
+    return f"\n--- Temperature {temp} ---\n{response.choices[0].message.content}\n"
+
+if __name__ == "__main__":
+    # Un seul appel ici, comme demandé
+    print(ask_chef("What are some quick and easy meals I can make for dinner?"))
+    tracing.flush()
\ No newline at end of file
@@ -1,59 +1,170 @@
 import os
 import json
+import time
 from dotenv import load_dotenv
-from groq import Groq
-from langfuse import observe, get_client
+from llm_gateway import make_groq_client
+import tracing
+from tracing import observe
+import deadline
+from plan_stream import StepStream, StepStreamParser, print_stream_report, streaming_enabled
 
 GROUP_NAME = "GROUPE_NOA_NIELS"
 
+MODEL = "openai/gpt-oss-120b"
+FAST_MODEL = "llama-3.1-8b-instant"  # Repli quand le budget de temps devient court
+
 load_dotenv()
-groq_client = Groq()
-langfuse = get_client()
+groq_client = make_groq_client()
 
 @observe(name="plan_weekly_menu") 
-def plan_weekly_menu(constraints: str) -> dict:
+def plan_weekly_menu(constraints: str, deadline_s: float = None, stream_plan: bool = None) -> dict:
+    """`deadline_s` : budget de latence total. Quand il devient court, on saute des étapes,
+    on passe au petit modèle, puis on renvoie le meilleur menu partiel (status "partial").
+    `stream_plan` : exécute chaque étape dès qu'elle sort du plan en streaming
+    (par défaut : $CHEFBOT_STREAM_PLAN, voir plan_stream.py)."""
+
+    if stream_plan is None:
+        stream_plan = streaming_enabled()
     
-    langfuse.update_current_trace(
+    tracing.update_current_trace(
         name=f"{GROUP_NAME}, Partie 2 - Menu",
         tags=[GROUP_NAME, "Partie 2", "Chef Planner"],
         metadata={
-            "constraints": constraints
+            "constraints": constraints,
+            "deadline_s": deadline_s,
+            "stream_plan": stream_plan,
         }
     )
 
-    try:
-        # --- Étape 1 : Planification (avec Retry) ---
-        print("1. Planification en cours...")
-        plan_data = _plan_steps(constraints)
-        
-        steps = plan_data.get("steps", [])
-
-        # --- Étape 2 : Exécution ---
-        step_results = []
-        for i, step in enumerate(steps):
-            print(f"2.{i+1} Exécution : {step}")
-            result = _execute_step(step, i, context=step_results)
-            step_results.append(result)
-
-        # --- Étape 3 : Synthèse ---
-        print("3. Synthèse du menu...")
-        final_menu = _synthesize_menu(constraints, step_results)
-
-        return {
-            "constraints": constraints,
-            "plan": steps,
-            "step_results": step_results,
-            "final_answer": final_menu,
-            "status": "success"
-        }
+    step_results = []
+    degraded = []
+    with deadline.scope(deadline_s) as budget:
+        try:
+            # --- Étape 1 : Planification (avec Retry) ---
+            print("1. Planification en cours...")
+            if stream_plan:
+                # Étapes 1 et 2 confondues : l'exécution commence pendant la génération du plan
+                steps = _run_streamed_plan(constraints, step_results, degraded, budget)
+            else:
+                with budget.stage():
+                    plan_data = _plan_steps(constraints)
+
+                steps = plan_data.get("steps", [])
+
+                # --- Étape 2 : Exécution ---
+                _execute_steps(steps, step_results, degraded, budget, total=len(steps))
+
+            # --- Étape 3 : Synthèse ---
+            if step_results and not budget.allows(budget.typical_stage_s()):
+                degraded.append("synthèse remplacée par les résultats des étapes")
+                final_menu, status = _partial_menu(step_results), "partial"
+            else:
+                model = budget.pick_model(MODEL, FAST_MODEL)
+                if model != MODEL and f"modèle {model}" not in degraded:
+                    degraded.append(f"modèle {model}")
+                print("3. Synthèse du menu...")
+                final_menu = _synthesize_menu(constraints, step_results, model=model)
+                status = "success"
+
+            if degraded:
+                print(f"[DEADLINE] Mode dégradé : {', '.join(degraded)}")
+                tracing.update_current_span(metadata={"degraded": degraded})
+
+            return {
+                "constraints": constraints,
+                "plan": steps,
+                "step_results": step_results,
+                "final_answer": final_menu,
+                "status": status,
+                "degraded": degraded,
+            }
+
+        except Exception as e:
+            # Budget dépassé en cours d'appel : mieux vaut un menu partiel qu'une erreur
+            if budget.expired() and step_results:
+                degraded.append(f"interrompu : {e}")
+                return {
+                    "constraints": constraints,
+                    "step_results": step_results,
+                    "final_answer": _partial_menu(step_results),
+                    "status": "partial",
+                    "degraded": degraded,
+                }
+            # Gestion d'erreur robuste au niveau parent
+            tracing.update_current_span(
+                level="ERROR",
+                status_message=f"Erreur critique dans le planificateur : {str(e)}"
+            )
+            return {"status": "error", "error": str(e)}
+
+
+def _execute_steps(steps, step_results: list, degraded: list, budget, total: int = None, stream=None) -> bool:
+    """Exécute les étapes dans l'ordre, chacune avec les résultats précédents en contexte.
+    Renvoie False si le budget a obligé à sauter la fin du plan."""
+    for step in steps:
+        i = len(step_results)
+        # On garde toujours de quoi faire la synthèse après cette étape
+        if step_results and not budget.allows(2 * budget.typical_stage_s()):
+            degraded.append(f"étapes {i+1} à {total} sautées" if total else f"étapes {i+1} et suivantes sautées")
+            return False
+        model = budget.pick_model(MODEL, FAST_MODEL)
+        if model != MODEL and f"modèle {model}" not in degraded:
+            degraded.append(f"modèle {model}")
+        print(f"2.{i+1} Exécution : {step}")
+        start = time.perf_counter()
+        with budget.stage():
+            result = _execute_step(step, i, context=step_results, model=model)
+        if stream is not None:
+            stream.record_step(start, time.perf_counter())
+        step_results.append(result)
+    return True
+
+
+def _run_streamed_plan(constraints: str, step_results: list, degraded: list, budget) -> list:
+    """Plan en streaming : chaque étape est exécutée dès que sa chaîne JSON se ferme. Renvoie le plan."""
+    def produce(on_step):
+        with budget.stage():
+            return _plan_steps_streaming(constraints, on_step)
+
+    stream = StepStream(produce)
+    completed = _execute_steps(stream, step_results, degraded, budget, stream=stream)
+    report = stream.report()
+    print_stream_report(report)
+    tracing.update_current_span(metadata={"plan_stream": report})
+
+    if not completed or stream.error is None:
+        return stream.plan.get("steps", []) if stream.plan is not None else list(stream.steps)
+
+    # Flux inutilisable (JSON invalide, erreur d'API) : plan bufferisé avec son retry,
+    # en gardant les étapes déjà exécutées qui s'y retrouvent à l'identique et dans le même ordre
+    print(f"[STREAM] Plan en streaming inutilisable ({stream.error}), repli en mode bufferisé")
+    with budget.stage():
+        steps = _plan_steps(constraints).get("steps", [])
+    keep = 0
+    while keep < min(len(steps), len(step_results)) and step_results[keep]["step"] == steps[keep]:
+        keep += 1
+    del step_results[keep:]
+    _execute_steps(steps[keep:], step_results, degraded, budget, total=len(steps))
+    return steps
+
+
+def _partial_menu(results: list) -> str:
+    """Meilleure réponse disponible sans synthèse : les résultats bruts des étapes terminées."""
+    parts = "\n\n".join(f"## {r['step']}\n{r['output']}" for r in results)
+    return f"(Menu partiel : budget de temps épuisé avant la synthèse)\n\n{parts}"
 
-    except Exception as e:
-        # Gestion d'erreur robuste au niveau parent
-        langfuse.update_current_span(
-            level="ERROR",
-            status_message=f"Erreur critique dans le planificateur : {str(e)}"
-        )
-        return {"status": "error", "error": str(e)}
+
+def _build_plan_messages(constraints: str) -> list:
+    return [
+        {
+            "role": "system",
+            # Texte inchangé (indentation comprise) : les cassettes enregistrées restent valides
+            "content": """You are a methodical Chef. Break down the task of creating a weekly menu into 3 to 4 logical steps.
+                        RETURN ONLY JSON format: {"steps": ["step description 1", "step description 2", ...]}
+                        Do not add markdown formatting."""
+        },
+        {"role": "user", "content": f"Constraints for the menu: {constraints}"}
+    ]
 
 
 @observe(name="planning", as_type="generation")
@@ -65,16 +176,8 @@ def _plan_steps(constraints: str) -> dict:
     for attempt in range(max_retries):
         try:
             response = groq_client.chat.completions.create(
-                model="openai/gpt-oss-120b",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a methodical Chef. Break down the task of creating a weekly menu into 3 to 4 logical steps.
-                        RETURN ONLY JSON format: {"steps": ["step description 1", "step description 2", ...]}
-                        Do not add markdown formatting."""
-                    },
-                    {"role": "user", "content": f"Constraints for the menu: {constraints}"}
-                ],
+                model=MODEL,
+                messages=_build_plan_messages(constraints),
                 temperature=0.2,
                 response_format={"type": "json_object"}
             )
@@ -84,7 +187,7 @@ def _plan_steps(constraints: str) -> dict:
 
         except json.JSONDecodeError as e:
             # Log l'erreur dans Langfuse sans casser le programme immédiatement
-            langfuse.update_current_span(
+            tracing.update_current_span(
                 level="ERROR",
                 status_message=f"JSON invalide (Tentative {attempt+1}/{max_retries}): {str(e)}"
             )
@@ -95,22 +198,43 @@ def _plan_steps(constraints: str) -> dict:
                 raise e
 
 
-@observe(name="execute_step", as_type="generation")
-def _execute_step(step: str, index: int, context: list) -> dict:
+@observe(name="planning", as_type="generation")
+def _plan_steps_streaming(constraints: str, on_step) -> dict:
+    """Même plan que `_plan_steps`, lu en streaming : `on_step` reçoit chaque étape dès qu'elle est complète."""
+    parser = StepStreamParser()
+    # Le mode JSON de Groq ne se combine pas avec le streaming : le parseur tolère du texte autour de l'objet
+    response = groq_client.chat.completions.create(
+        model=MODEL,
+        messages=_build_plan_messages(constraints),
+        temperature=0.2,
+        stream=True
+    )
+    for chunk in response:
+        if chunk.choices and chunk.choices[0].delta.content:
+            for step in parser.feed(chunk.choices[0].delta.content):
+                on_step(step)
+    return parser.finish()
+
+
+def _build_step_messages(step: str, context: list) -> list:
     context_str = "\n".join([f"- Résultat précédent ({r['step']}): {r['output']}" for r in context])
-    
+    return [
+        {
+            "role": "system",
+            "content": "You are a Chef executing a specific part of menu planning. Be concise and practical."
+        },
+        {
+            "role": "user", 
+            "content": f"Previous work:\n{context_str}\n\nCURRENT TASK: {step}\nExecute this task now."
+        }
+    ]
+
+
+@observe(name="execute_step", as_type="generation")
+def _execute_step(step: str, index: int, context: list, model: str = MODEL) -> dict:
     response = groq_client.chat.completions.create(
-        model="openai/gpt-oss-120b",
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a Chef executing a specific part of menu planning. Be concise and practical."
-            },
-            {
-                "role": "user", 
-                "content": f"Previous work:\n{context_str}\n\nCURRENT TASK: {step}\nExecute this task now."
-            }
-        ],
+        model=model,
+        messages=_build_step_messages(step, context),
         temperature=0.5
     )
 
@@ -121,22 +245,25 @@ def _execute_step(step: str, index: int, context: list) -> dict:
     }
 
 
-@observe(name="synthesis", as_type="generation")
-def _synthesize_menu(constraints: str, results: list) -> str:
+def _build_synthesis_messages(constraints: str, results: list) -> list:
     full_context = "\n".join([f"Step {r['step']}: {r['output']}" for r in results])
+    return [
+        {
+            "role": "system",
+            "content": "You are a Chef. Based on all the planning steps, generate the final clear Weekly Menu presentation."
+        },
+        {
+            "role": "user", 
+            "content": f"Customer Constraints: {constraints}\n\nPlanning Data:\n{full_context}\n\nPlease output the Final Weekly Menu nicely formatted."
+        }
+    ]
+
 
+@observe(name="synthesis", as_type="generation")
+def _synthesize_menu(constraints: str, results: list, model: str = MODEL) -> str:
     response = groq_client.chat.completions.create(
-        model="openai/gpt-oss-120b",
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a Chef. Based on all the planning steps, generate the final clear Weekly Menu presentation."
-            },
-            {
-                "role": "user", 
-                "content": f"Customer Constraints: {constraints}\n\nPlanning Data:\n{full_context}\n\nPlease output the Final Weekly Menu nicely formatted."
-            }
-        ],
+        model=model,
+        messages=_build_synthesis_messages(constraints, results),
         temperature=0.5
     )
     
@@ -144,15 +271,16 @@ def _synthesize_menu(constraints: str, results: list) -> str:
 
 
 # --- Exécution ---
-print("\n--- Lancement du Chef Planificateur (Mode Robuste) ---")
-resultat = plan_weekly_menu("Menu végétarien pour 2 personnes, budget serré, incluant des restes pour le midi")
-
-if resultat['status'] == 'success':
-    print("PLAN GÉNÉRÉ :")
-    print(resultat['plan'])
-    print("MENU FINAL :")
-    print(resultat['final_answer'])
-else:
-    print(f"Erreur Fatale : {resultat.get('error')}")
-
-langfuse.flush()
\ No newline at end of file
+if __name__ == "__main__":
+    print("\n--- Lancement du Chef Planificateur (Mode Robuste) ---")
+    resultat = plan_weekly_menu("Menu végétarien pour 2 personnes, budget serré, incluant des restes pour le midi")
+
+    if resultat['status'] == 'success':
+        print("PLAN GÉNÉRÉ :")
+        print(resultat['plan'])
+        print("MENU FINAL :")
+        print(resultat['final_answer'])
+    else:
+        print(f"Erreur Fatale : {resultat.get('error')}")
+
+    tracing.flush()
\ No newline at end of file
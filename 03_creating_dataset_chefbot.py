@@ -1,13 +1,13 @@
 from dotenv import load_dotenv
 from langfuse import observe, get_client, Evaluation
-from groq import Groq
+from llm_gateway import make_groq_client
 import json
 from datetime import datetime
 from typing import Callable
 
 load_dotenv()
 
-groq_client = Groq()
+groq_client = make_groq_client()
 
 GROUP_NAME="GROUPE_NOA_NIELS"
 # =============================================================================
@@ -117,4 +117,6 @@ def create_sentiment_dataset():
 
     print(f"✓ Created dataset with {len(test_cases)} test cases")
     return dataset
-create_sentiment_dataset()
+
+if __name__ == "__main__":
+    create_sentiment_dataset()
@@ -1,11 +1,14 @@
 import json
 from datetime import datetime
 from dotenv import load_dotenv
-from groq import Groq
-from langfuse import observe, get_client, Evaluation
+from llm_gateway import make_groq_client
+from langfuse import get_client, Evaluation
+import tracing
+from tracing import observe
+from results_store import RunConfig, content_hash, get_results_store
 GROUP_NAME="GROUPE_NOA_NIELS"
 load_dotenv()
-groq_client = Groq()
+groq_client = make_groq_client()
 langfuse = get_client()
 
 # =============================================================================
@@ -78,8 +81,8 @@ def llm_evaluator(**kwargs) -> list:
 # =============================================================================
 
 @observe(name="chefbot_full_experiment")
-def run_full_experiment():
-    langfuse.update_current_trace(
+def run_full_experiment(force: bool = False):
+    tracing.update_current_trace(
             name=f"{GROUP_NAME}, Partie 3",
             tags=[GROUP_NAME, "Partie 3"],
             metadata={
@@ -88,13 +91,30 @@ def run_full_experiment():
         )
     dataset = langfuse.get_dataset("chefbot-menu-eval-niels-noa")
 
-    langfuse.run_experiment(
-        name=f"chefbot-full-eval-{datetime.now().strftime('%H%M%S')}",
-        data=dataset.items,
+    # Pas encore de modèle derrière chef_bot_task : c'est son code qui fait office de prompt
+    store = get_results_store()
+    config = RunConfig(
+        experiment="menu-eval",
+        model_id="chef_bot_task",
+        prompt_hash=content_hash(chef_bot_task),
+        evaluator_version=content_hash(rule_evaluator, llm_judge_task, llm_evaluator),
+    )
+    items = dataset.items if force else store.pending(config, dataset.items)
+    if len(items) < len(dataset.items):
+        print(f"[RÉSULTATS] {len(dataset.items) - len(items)} item(s) déjà notés pour cette configuration : sautés.")
+    if not items:
+        return
+
+    run_name = f"chefbot-full-eval-{datetime.now().strftime('%H%M%S')}"
+    results = langfuse.run_experiment(
+        name=run_name,
+        data=items,
         task=lambda item: chef_bot_task(item.input["constraints"]),
         evaluators=[rule_evaluator, llm_evaluator], # Les deux évaluateurs tournent en parallèle
         description="Comparaison Rules vs LLM Judge"
     )
+    store.record_experiment(config, results, run_name=run_name)
 
-run_full_experiment()
-langfuse.flush()
+if __name__ == "__main__":
+    run_full_experiment()
+    tracing.flush()
@@ -1,9 +1,15 @@
+import datetime as dt
 import json
 import os
-import re
 from dotenv import load_dotenv
-from groq import Groq
-from langfuse import observe, get_client
+from llm_gateway import install_litellm_gateway, make_groq_client
+import tracing
+from tracing import observe
+import deadline
+from ingredient_kb import get_kb, month_name, parse_month, split_names
+from costing import get_engine
+from reservation_store import WEEKDAYS, format_date, get_reservation_store, parse_date
+from fast_path import FastPathRouter, fast_path_enabled, print_fast_path_report
 from smolagents import CodeAgent, LiteLLMModel, tool
 
 # --- CONFIGURATION ---
@@ -11,7 +17,10 @@ GROUP_NAME = "GROUPE_NOA_NIELS"
 load_dotenv()
 
 # 1. Client pour la boucle manuelle (Partie 4.2)
-groq_client = Groq()
+groq_client = make_groq_client()
+MANUAL_MODEL = "llama-3.3-70b-versatile"
+FAST_MODEL = "llama-3.1-8b-instant"  # Repli quand le budget de temps devient court
+install_litellm_gateway()  # Pool HTTP partagé, fusion des requêtes, cassette si $CHEFBOT_CASSETTE
 
 # 2. Modèle pour Smolagents (Partie 4.3)
 # On utilise LiteLLM pour connecter Smolagents à Groq
@@ -19,27 +28,28 @@ model = LiteLLMModel(
     model_id="groq/llama-3.3-70b-versatile",
     api_key=os.environ.get("GROQ_API_KEY")
 )
-langfuse = get_client()
 
 # =============================================================================
 # DEFINITION DES OUTILS "CHEF" (Compatible Smolagents & Manuel)
 # =============================================================================
 
 @tool
-def get_seasonal_products(month: str) -> str:
+def get_seasonal_products(month: str, region: str = "France") -> str:
     """
     Returns the list of seasonal ingredients for a specific month in France.
     
     Args:
-        month: The month name (e.g., 'March', 'June').
+        month: The month name (e.g., 'March', 'June', 'mars') or number.
+        region: 'France' (national average), 'Sud' (Provence, Occitanie) or 'Nord' (Bretagne, Normandie).
     """
-    data = {
-        "March": "Asparagus, Spinach, Radish, Lemon, Kiwi",
-        "June": "Strawberry, Zucchini, Tomato, Cherry, Apricot",
-        "October": "Pumpkin, Mushroom, Apple, Pear, Grapes",
-        "December": "Chestnut, Truffle, Scallop, Clementine",
-    }
-    return data.get(month, f"No data available for {month}")
+    kb = get_kb()
+    try:
+        region_key = kb.region(region)
+        products = kb.seasonal(month, region_key)
+    except ValueError:
+        return f"No data available for {month} ({region})"
+    names = ", ".join(kb.names[i].capitalize() for i in products)
+    return f"{month_name(parse_month(month))} ({region_key.capitalize()}): {names}"
 
 @tool
 def calculate_food_cost(price_per_kg: float, weight_kg: float) -> str:
@@ -56,23 +66,108 @@ def calculate_food_cost(price_per_kg: float, weight_kg: float) -> str:
     except Exception as e:
         return f"Error in calculation: {e}"
 
+@tool
+def cost_recipe(recipe: str, servings: int = 1) -> str:
+    """
+    Costs a whole recipe in one call from its bill of materials (quantities for one serving).
+    
+    Args:
+        recipe: Comma-separated lines 'quantity unit ingredient' (e.g., '200 g salmon, 1 tbsp olive oil, 1 lemon').
+        servings: Number of servings to cost.
+    """
+    try:
+        cost = get_engine().cost_recipe(recipe, servings=float(servings or 1))
+    except ValueError as e:
+        return f"Error in recipe: {e}"
+    result = f"{cost.per_person:.2f}€ per serving, {cost.total:.2f}€ for {cost.persons:g} serving(s)"
+    if cost.missing:
+        result += f" (not costed: {', '.join(cost.missing)})"
+    return result
+
+def _reservations_for(date: str) -> str:
+    # Plusieurs formats acceptés (15/03/2025, 2025-03-15, 15 mars 2025...), normalisés une seule fois
+    try:
+        return get_reservation_store().day(date).describe()
+    except ValueError:
+        return f"ERROR: invalid date '{date}'. Expected DD/MM/YYYY (or YYYY-MM-DD, '15 March 2025')."
+
 @tool
 def get_reservations(date: str) -> str:
     """
     Get restaurant table reservations for a specific date.
     
     Args:
-        date: The date to check in format 'DD/MM/YYYY'.
+        date: The date to check, e.g. 'DD/MM/YYYY', 'YYYY-MM-DD' or '15 March 2025'.
     """
-    # Outil "Fragile" qui impose un format strict
-    if not re.match(r"^\d{2}/\d{2}/\d{4}$", date):
-        return f"ERROR: invalid date format '{date}'. Expected DD/MM/YYYY."
+    return _reservations_for(date)
 
-    fake_bookings = {
-        "15/03/2025": "FULL SERVICE: 45 covers (VIP table booked)",
-        "16/03/2025": "Light service: 12 covers",
-    }
-    return fake_bookings.get(date, f"No reservations found for {date}")
+@tool
+def get_reservations_range(start_date: str, end_date: str = "") -> str:
+    """
+    Get reservations for every day of a period in one call (e.g. a week of staffing), with totals and peak service.
+    
+    Args:
+        start_date: First day, e.g. '10/03/2025' or '2025-03-10'.
+        end_date: Last day, included. Defaults to a full week from start_date.
+    """
+    store = get_reservation_store()
+    try:
+        end_date = end_date or parse_date(start_date) + dt.timedelta(days=6)
+        days = store.days(start_date, end_date)
+    except ValueError as e:
+        return f"ERROR: {e}"
+    total = sum(d.covers for d in days)
+    lines = [
+        f"Reservations {format_date(days[0].day)} -> {format_date(days[-1].day)} ({len(days)} days): "
+        f"{total} covers, {sum(d.bookings for d in days)} bookings"
+    ]
+    for d in days:
+        services = ", ".join(f"{service} {covers}" for service, covers in d.services)
+        lines.append(f"- {WEEKDAYS[d.day.weekday()][:3].capitalize()} {format_date(d.day)}: "
+                     f"{d.describe() if d.bookings else 'no reservations'}"
+                     f"{f' ({services})' if services else ''}")
+    busiest = max(days, key=lambda d: d.covers)
+    peak = store.peak(days[0].day, days[-1].day)
+    if peak:
+        lines.append(f"Peak service: {format_date(peak[0])} {peak[1]}, {peak[2]} covers | "
+                     f"busiest day: {format_date(busiest.day)}, {busiest.covers} covers")
+    return "\n".join(lines)
+
+# =============================================================================
+# VARIANTES PAR LOT (une seule invocation pour un menu ou une semaine)
+# =============================================================================
+
+@tool
+def get_seasonal_products_batch(months: list[str], region: str = "France") -> dict:
+    """
+    Returns the seasonal ingredients of several months in one call.
+    
+    Args:
+        months: The month names or numbers (e.g., ['March', 'avril', '5']).
+        region: 'France' (national average), 'Sud' (Provence, Occitanie) or 'Nord' (Bretagne, Normandie).
+    """
+    kb = get_kb()
+    try:
+        region_key = kb.region(region)
+    except ValueError:
+        return {"error": f"No data available for region {region}"}
+    results = {}
+    for month in split_names(months):
+        try:
+            results[month] = [kb.names[i].capitalize() for i in kb.seasonal(month, region_key)]
+        except ValueError:
+            results[month] = f"No data available for {month}"
+    return {"region": region_key.capitalize(), "months": results}
+
+@tool
+def get_reservations_batch(dates: list[str]) -> dict:
+    """
+    Get restaurant table reservations for several dates in one call.
+    
+    Args:
+        dates: The dates to check, each in format 'DD/MM/YYYY'.
+    """
+    return {date: _reservations_for(date) for date in split_names(dates)}
 
 # =============================================================================
 # PARTIE 4.2 : BOUCLE MANUELLE (Sans Framework)
@@ -85,7 +180,14 @@ manual_tools_schema = [
         "function": {
             "name": "get_seasonal_products",
             "description": "Get seasonal ingredients for a month.",
-            "parameters": {"type": "object", "properties": {"month": {"type": "string"}}, "required": ["month"]}
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "month": {"type": "string"},
+                    "region": {"type": "string", "description": "France, Sud or Nord"}
+                },
+                "required": ["month"]
+            }
         }
     },
     {
@@ -103,6 +205,21 @@ manual_tools_schema = [
             }
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "cost_recipe",
+            "description": "Cost a whole recipe (one serving per line) for N servings.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "recipe": {"type": "string", "description": "e.g. '200 g salmon, 1 tbsp olive oil, 1 lemon'"},
+                    "servings": {"type": "integer"}
+                },
+                "required": ["recipe"]
+            }
+        }
+    },
     {
         "type": "function",
         "function": {
@@ -110,6 +227,48 @@ manual_tools_schema = [
             "description": "Get reservations for a date.",
             "parameters": {"type": "object", "properties": {"date": {"type": "string", "description": "DD/MM/YYYY"}}, "required": ["date"]}
         }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_reservations_range",
+            "description": "Get reservations for every day of a period (default: one week), with totals and peak service.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "start_date": {"type": "string", "description": "DD/MM/YYYY"},
+                    "end_date": {"type": "string", "description": "DD/MM/YYYY, included (optional)"}
+                },
+                "required": ["start_date"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_seasonal_products_batch",
+            "description": "Get seasonal ingredients for several months at once.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "months": {"type": "array", "items": {"type": "string"}},
+                    "region": {"type": "string", "description": "France, Sud or Nord"}
+                },
+                "required": ["months"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_reservations_batch",
+            "description": "Get reservations for several dates at once.",
+            "parameters": {
+                "type": "object",
+                "properties": {"dates": {"type": "array", "items": {"type": "string", "description": "DD/MM/YYYY"}}},
+                "required": ["dates"]
+            }
+        }
     }
 ]
 
@@ -117,18 +276,61 @@ manual_tools_schema = [
 TOOL_REGISTRY = {
     "get_seasonal_products": get_seasonal_products,
     "calculate_food_cost": calculate_food_cost,
+    "cost_recipe": cost_recipe,
     "get_reservations": get_reservations,
+    "get_reservations_range": get_reservations_range,
+    "get_seasonal_products_batch": get_seasonal_products_batch,
+    "get_reservations_batch": get_reservations_batch,
 }
 
+# Consultations directes ("seasonal products for March?") servies sans aller-retour LLM
+fast_path = FastPathRouter.from_env(TOOL_REGISTRY)
+
+def _dispatch_tool_call(tool_call) -> str:
+    """Exécute un appel d'outil demandé par le modèle et renvoie le résultat texte."""
+    fn_name = tool_call.function.name
+    args = json.loads(tool_call.function.arguments)
+    print(f"[MANUAL] Tool Call: {fn_name}({args})")
+    
+    func = TOOL_REGISTRY.get(fn_name)
+    if func:
+        result = func(**args)
+        # Les outils par lot renvoient un dict : JSON pour le modèle
+        result = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
+    else:
+        result = f"Error: Tool {fn_name} not found"
+        
+    print(f"   -> Result: {result}")
+    return result
+
+
+def _partial_answer(messages: list) -> str:
+    """Meilleure réponse disponible quand le budget est épuisé : les résultats d'outils déjà obtenus."""
+    results = [m["content"] for m in messages if isinstance(m, dict) and m.get("role") == "tool"]
+    if not results:
+        return "Error: Deadline reached before any tool result"
+    return "(Réponse partielle : budget de temps épuisé)\n" + "\n".join(f"- {r}" for r in results)
+
+
 @observe(name="manual_loop")
-def run_manual_loop(question: str):
+def run_manual_loop(question: str, deadline_s: float = None):
+    """`deadline_s` : budget de latence. S'il ne couvre plus un tour de boucle, on renvoie
+    les résultats d'outils déjà obtenus ; sous la moitié du budget, on passe au petit modèle."""
     print(f"[MANUAL CHEF] Question: {question}")
     
-    langfuse.update_current_trace(
+    tracing.update_current_trace(
         name=f"{GROUP_NAME}, Partie 4.2 - Manual Loop",
         tags=[GROUP_NAME, "Partie 4.2", "Manual"],
     )
 
+    if fast_path_enabled():
+        fast = fast_path.serve(question)
+        if fast is not None:
+            tracing.update_current_trace(metadata={"fast_path": [f"{r.intent}:{r.tool}" for r in fast.routes]})
+            print(f"[FAST PATH] {', '.join(f'{r.tool}({r.args})' for r in fast.routes)}")
+            print(f"[MANUAL] Réponse finale : {fast.text}")
+            return fast.text
+
     messages = [
     {
         "role": "system", 
@@ -136,13 +338,23 @@ def run_manual_loop(question: str):
     },
     {"role": "user", "content": question}
 ]
+    with deadline.scope(deadline_s) as budget:
+        return _manual_loop(messages, budget)
+
+
+def _manual_loop(messages: list, budget) -> str:
     for i in range(5):
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=messages,
-            tools=manual_tools_schema,
-            tool_choice="auto"
-        )
+        if i > 0 and not budget.allows(budget.typical_stage_s()):
+            print(f"[DEADLINE] {budget.remaining():.1f}s restantes : réponse partielle après {i} tour(s)")
+            return _partial_answer(messages)
+
+        with budget.stage():
+            response = groq_client.chat.completions.create(
+                model=budget.pick_model(MANUAL_MODEL, FAST_MODEL),
+                messages=messages,
+                tools=manual_tools_schema,
+                tool_choice="auto"
+            )
         msg = response.choices[0].message
         
         # Si pas d'appel d'outil, c'est fini
@@ -166,22 +378,10 @@ def run_manual_loop(question: str):
 
         # Exécuter les outils
         for tool_call in msg.tool_calls:
-            fn_name = tool_call.function.name
-            args = json.loads(tool_call.function.arguments)
-            print(f"[MANUAL] Tool Call: {fn_name}({args})")
-            
-            func = TOOL_REGISTRY.get(fn_name)
-            if func:
-                result = str(func(**args)) 
-            else:
-                result = f"Error: Tool {fn_name} not found"
-                
-            print(f"   -> Result: {result}")
-
             messages.append({
                 "role": "tool",
                 "tool_call_id": tool_call.id,
-                "content": result
+                "content": _dispatch_tool_call(tool_call)
             })
             
     return "Error: Max iterations reached"
@@ -192,23 +392,26 @@ def run_manual_loop(question: str):
 # =============================================================================
 
 @observe(name="smolagents_loop")
-def run_smolagents_loop(question: str):
+def run_smolagents_loop(question: str, deadline_s: float = None):
     print(f"[SMOLAGENTS CHEF] Question: {question}")
     
-    langfuse.update_current_trace(
+    tracing.update_current_trace(
         name=f"{GROUP_NAME}, Partie 4.3 - Smolagents",
         tags=[GROUP_NAME, "Partie 4.3", "SmolAgents"],
     )
 
     # Création de l'agent
     agent = CodeAgent(
-        tools=[get_seasonal_products, calculate_food_cost, get_reservations],
+        tools=[get_seasonal_products, calculate_food_cost, cost_recipe, get_reservations, get_reservations_range,
+               get_seasonal_products_batch, get_reservations_batch],
         model=model,
         max_steps=5,
         add_base_tools=False
     )
+    deadline.attach(agent)  # Réponse finale anticipée si le budget ne couvre plus une étape
 
-    result = agent.run(question)
+    with deadline.scope(deadline_s):
+        result = agent.run(question)
     
     print(f"[SMOLAGENTS] Réponse finale : {result}")
     return result
@@ -222,8 +425,9 @@ if __name__ == "__main__":
     # Scénario Chef : On veut les ingrédients de Mars ET vérifier les résas pour le 15 Mars
     task = "What represent the seasonal products for March? Also, check the reservations for 15/03/2025."
     
-    # 1. Execution Manuelle
+    # 1. Execution Manuelle (consultation directe : servie par la voie rapide, sans LLM)
     run_manual_loop(task)
+    print_fast_path_report(fast_path)
 
     print("\n" + "="*50 + "\n")
 
@@ -235,4 +439,4 @@ if __name__ == "__main__":
     print("- La boucle manuelle nécessite de définir les schémas JSON et gérer l'historique des messages 'tool'.")
     print("- Smolagents génère automatiquement le code Python pour appeler les outils, simplifiant grandement l'implémentation.")
     
-    langfuse.flush()
\ No newline at end of file
+    tracing.flush()
\ No newline at end of file
@@ -1,10 +1,17 @@
 import os
 from dotenv import load_dotenv
+from llm_gateway import install_litellm_gateway
 from smolagents import CodeAgent, Tool, LiteLLMModel, tool
 import datetime
+from menu_catalogue import get_catalogue
+from adaptive_planning import AdaptivePlanningPolicy
+from order_ledger import OrderLedgerTool, get_ledger
+from costing import evaluate_expression
+import deadline
 
 # Chargement des variables d'environnement
 load_dotenv()
+install_litellm_gateway()  # Pool HTTP partagé, fusion des requêtes, cassette si $CHEFBOT_CASSETTE
 
 # Configuration du modèle (Groq via LiteLLM pour smolagents)
 # On utilise un modèle performant pour la planification
@@ -41,27 +48,18 @@ class MenuDatabaseTool(Tool):
         }
         self.output_type = "string"
         
-        # Base de données (10 plats min)
-        self.menu_data = [
-            {"nom": "Salade César", "prix": 12, "prep": "10min", "allergenes": ["gluten", "lait"], "categorie": "entrée"},
-            {"nom": "Soupe à l'oignon", "prix": 9, "prep": "15min", "allergenes": ["gluten"], "categorie": "entrée"},
-            {"nom": "Carpaccio de Boeuf", "prix": 14, "prep": "10min", "allergenes": [], "categorie": "entrée"},
-            {"nom": "Burger Classique", "prix": 18, "prep": "20min", "allergenes": ["gluten", "lait", "oeuf"], "categorie": "plat"},
-            {"nom": "Risotto aux Champignons", "prix": 19, "prep": "25min", "allergenes": ["lait"], "categorie": "plat"},
-            {"nom": "Pavé de Saumon", "prix": 22, "prep": "20min", "allergenes": ["poisson"], "categorie": "plat"},
-            {"nom": "Curry de Légumes (Vegan)", "prix": 16, "prep": "20min", "allergenes": [], "categorie": "plat"},
-            {"nom": "Steak Frites", "prix": 24, "prep": "15min", "allergenes": [], "categorie": "plat"},
-            {"nom": "Fondant au Chocolat", "prix": 8, "prep": "15min", "allergenes": ["gluten", "lait", "oeuf"], "categorie": "dessert"},
-            {"nom": "Salade de Fruits", "prix": 7, "prep": "10min", "allergenes": [], "categorie": "dessert"},
-            {"nom": "Sorbet Citron", "prix": 6, "prep": "5min", "allergenes": [], "categorie": "dessert"},
-        ]
+        # Base de données partagée : chargée une fois par processus (data/menu.json ou SQLite)
+        # et rechargée à chaud quand la source change
+        self.catalogue = get_catalogue()
         super().__init__()
 
     def forward(self, category: str = None, max_price: float = None, exclude_allergen: str = None) -> str:
         """Filtre le menu selon les critères."""
+        # On lit un instantané immuable : un rechargement pendant l'appel ne change rien ici
+        snapshot = self.catalogue.snapshot()
         results = []
         
-        for item in self.menu_data:
+        for item in snapshot.dishes:
             # Filtre Catégorie
             if category and category.lower() not in item["categorie"].lower():
                 continue
@@ -86,11 +84,12 @@ class MenuDatabaseTool(Tool):
                     if "boeuf" in item["nom"].lower() or "burger" in item["nom"].lower() or "steak" in item["nom"].lower() or "saumon" in item["nom"].lower():
                         continue
 
-            results.append(f"- {item['nom']} ({item['categorie']}) : {item['prix']}€ | Allergènes: {', '.join(item['allergenes']) if item['allergenes'] else 'Aucun'}")
+            results.append(f"- {item['nom']} ({item['categorie']}) : {item['prix']:g}€ | Allergènes: {', '.join(item['allergenes']) if item['allergenes'] else 'Aucun'}")
 
         if not results:
-            return "Aucun plat ne correspond à vos critères."
+            return f"Aucun plat ne correspond à vos critères. (menu v{snapshot.version})"
         
+        results.append(f"(menu v{snapshot.version})")
         return "\n".join(results)
 
 # Outil simple de calcul (via décorateur @tool)
@@ -101,13 +100,14 @@ def calculate(expression: str) -> str:
     Args:
         expression: L'expression mathématique (ex: '12 + 16 + 8').
     """
+    # Évaluation sur l'arbre syntaxique (sans eval) : seuls nombres et opérateurs passent
     try:
-        allowed = set("0123456789+-*/.() ")
-        if not all(c in allowed for c in expression):
-            return "Erreur: caractères non autorisés."
-        return str(eval(expression))
-    except Exception as e:
+        result = evaluate_expression(expression)
+    except ValueError as e:
+        return f"Erreur: {e}."
+    except (ArithmeticError, OverflowError) as e:
         return f"Erreur de calcul: {e}"
+    return str(round(result, 2) if isinstance(result, float) else result)
 
 # =============================================================================
 # 5.2 - AGENT AVEC PLANIFICATION
@@ -116,23 +116,41 @@ def calculate(expression: str) -> str:
 # Instanciation de l'outil base de données
 menu_tool = MenuDatabaseTool()
 
+# Note de commande de la session : l'addition se lit directement, sans recalcul
+ledger = get_ledger("maitre_hotel_ia")
+order_tool = OrderLedgerTool(ledger)
+
 # Création de l'agent
 agent = CodeAgent(
-    tools=[menu_tool, calculate],
+    tools=[menu_tool, order_tool, calculate],
     model=model,
     name="maitre_hotel_ia",
     description="Un serveur intelligent capable de créer des menus sur mesure.",
-    planning_interval=2, # L'agent va re-planifier toutes les 2 étapes
+    instructions=(
+        "Quand le client choisit un plat, ajoute-le à la note avec order_ledger(action='ajouter', dish=...). "
+        "Pour l'addition, appelle order_ledger(action='total') au lieu de recalculer les prix."
+    ),
 )
 
+# Planification adaptative : au lieu de re-planifier toutes les 2 étapes (planning_interval=2),
+# l'agent ne re-planifie que si la tâche est complexe, si un outil échoue / ne renvoie rien,
+# ou si la progression stagne
+planning_policy = AdaptivePlanningPolicy(fixed_interval=2)
+planning_policy.attach(agent)
+deadline.attach(agent)  # Réponse finale anticipée si le budget de la requête ne couvre plus une étape
+
 # Système de logging manuel (Livrable .txt)
 class FileLogger:
     def __init__(self, filename):
         self.filename = filename
-        with open(self.filename, "w", encoding="utf-8") as f:
-            f.write(f"--- TRACE D'EXECUTION {datetime.datetime.now()} ---\n\n")
-    
+        self._started = False
+
     def log(self, role, content):
+        # Le fichier n'est (re)créé qu'au premier message : importer le module n'écrit rien
+        if not self._started:
+            with open(self.filename, "w", encoding="utf-8") as f:
+                f.write(f"--- TRACE D'EXECUTION {datetime.datetime.now()} ---\n\n")
+            self._started = True
         timestamp = datetime.datetime.now().strftime("%H:%M:%S")
         entry = f"[{timestamp}] [{role.upper()}]\n{content}\n{'-'*40}\n"
         print(entry) # Affichage console
@@ -141,7 +159,7 @@ class FileLogger:
 
 logger = FileLogger("run_restaurant_trace.txt")
 
-def run_agent_interaction(user_input, reset_memory=False):
+def run_agent_interaction(user_input, reset_memory=False, deadline_s=None):
     logger.log("user", user_input)
     
     # Si reset=False, l'agent garde l'historique (CodeAgent le gère nativement si on ne le recrée pas, 
@@ -153,10 +171,22 @@ def run_agent_interaction(user_input, reset_memory=False):
         # ou en passant par des méthodes spécifiques.
         # Pour cet exercice, on assume que la méthode .run() nettoie si on ne gère pas l'état manuellement,
         # MAIS smolagents garde l'état en mode chat. 
-        pass 
+        # Nouvelle session : on repart aussi d'une note de commande vide
+        ledger.clear()
 
-    response = agent.run(user_input)
+    planning_policy.prepare(user_input)
+    # reset=False garde l'historique entre les tours du dialogue (5.3)
+    with deadline.scope(deadline_s):
+        response = agent.run(user_input, reset=reset_memory)
     logger.log("agent", str(response))
+
+    planning = planning_policy.report()
+    logger.log(
+        "planning",
+        f"{planning['planning_calls']} appel(s) de planification "
+        f"(intervalle fixe : {planning['fixed_interval_calls']}, économisés : {planning['planning_calls_saved']}) "
+        f"| raisons : {planning['reasons'] or 'aucune'}"
+    )
     return response
 
 # =============================================================================
@@ -174,14 +204,14 @@ if __name__ == "__main__":
         "On est 3. Un vegetarien, un sans gluten, et moi je mange de tout. "
         "Budget max 60 euros pour le groupe. Proposez-nous un menu complet (Entrée + Plat ou Plat + Dessert chacun)."
     )
-    run_agent_interaction(request_complex)
+    run_agent_interaction(request_complex, reset_memory=True)
 
     # SCENARIO 5.3 : Mode Conversationnel
     print("\n--- 5.3 DIALOGUE CONVERSATIONNEL ---")
     
     # Tour 1 : Demande de suggestions
     print("\n[Tour 1]")
-    run_agent_interaction("J'aimerais juste un dessert pas cher.")
+    run_agent_interaction("J'aimerais juste un dessert pas cher.", reset_memory=True)
 
     # Tour 2 : Changement d'avis
     print("\n[Tour 2]")
@@ -190,5 +220,7 @@ if __name__ == "__main__":
     # Tour 3 : L'addition
     print("\n[Tour 3]")
     run_agent_interaction("Ok je prends ça. C'est combien ?")
+    print(f"\nNote de la table :\n{ledger.summary()}")
 
+    print(f"\nAppels de planification économisés sur la session : {planning_policy.total_saved()}")
     print(f"\nTrace sauvegardée dans 'run_restaurant_trace.txt'")
\ No newline at end of file
@@ -1,26 +1,54 @@
 import os
+import re
 import time
 from dotenv import load_dotenv
-from smolagents import CodeAgent, LiteLLMModel, tool
-from langfuse import observe, get_client
+from llm_gateway import install_litellm_gateway
+from smolagents import CodeAgent, tool
+import tracing
+from tracing import observe
 import litellm
+from fan_out import FanOutTool
+from model_routing import enable_escalation, print_routing_report, routed_model
+from instrumentation import MetricsCollector
+import deadline
+from ingredient_kb import get_kb, split_names
+from costing import get_engine
 
 # --- CONFIGURATION ---
 GROUP_NAME = "GROUPE_NOA_NIELS"
 load_dotenv()
+install_litellm_gateway()  # Pool HTTP partagé, fusion des requêtes, cassette si $CHEFBOT_CASSETTE
 
 litellm.callbacks = ["langfuse_otel"]
 
-model = LiteLLMModel(
-    model_id="groq/llama-3.3-70b-versatile",
-    api_key=os.environ.get("GROQ_API_KEY")
-)
-langfuse = get_client()
+# Mesure locale (sans Langfuse) des tokens, appels LLM, outils et secondes par agent
+metrics = MetricsCollector()
+metrics.install_litellm_hook()
+
+# Chaque agent a son propre modèle (voir ROUTING_TABLE dans model_routing.py) :
+# 8B instantané pour les sous-agents, 70B pour le manager, escalade automatique en cas d'échec
 
 # =============================================================================
 # OUTILS ULTRA-OPTIMISÉS (Token Savers)
 # =============================================================================
 
+def _dietary_line(profile) -> str:
+    if not profile.ingredients:
+        return f"{profile.dish}: unknown dish, no known ingredient in its name. Ask for the recipe."
+    if not profile.known:
+        # Recette inconnue : allergènes minimum, régimes exclus seulement, jamais de "OK"
+        return (
+            f"{profile.dish} (guessed from name): {', '.join(profile.ingredients)}"
+            f" | allergens at least: {', '.join(profile.allergens) or 'none detected'}"
+            f" | NOT: {', '.join(profile.excluded) or 'none detected'}"
+            f" | recipe unknown: ask for it before confirming any diet or absence of allergen."
+        )
+    return (
+        f"{profile.dish}: {', '.join(profile.ingredients)}"
+        f" | allergens: {', '.join(profile.allergens) or 'none'}"
+        f" | OK: {', '.join(profile.diets) or 'none'} | NOT: {', '.join(profile.excluded) or 'none'}"
+    )
+
 @tool
 def check_dietary_info(dish: str) -> str:
     """
@@ -29,8 +57,38 @@ def check_dietary_info(dish: str) -> str:
     Args:
         dish: Dish name.
     """
-    # Version compressée
-    return f"Analysis for {dish}: Check ingredients manually. Assume Soup/Salad/Risotto are safe if Vegetarian. Steak/Fish are NOT Vegetarian."
+    # Version compressée, calculée depuis la base d'ingrédients (aucun raisonnement LLM nécessaire)
+    return _dietary_line(get_kb().dish_profile(dish))
+
+def _dietary_record(profile) -> dict:
+    if not profile.ingredients:
+        return {"error": "unknown dish, no known ingredient in its name. Ask for the recipe."}
+    if not profile.known:
+        return {
+            "ingredients": list(profile.ingredients),
+            "allergens_at_least": list(profile.allergens),
+            "not": list(profile.excluded),
+            "guessed": True,
+            "note": "recipe unknown: ask for it before confirming any diet or absence of allergen.",
+        }
+    return {
+        "ingredients": list(profile.ingredients),
+        "allergens": list(profile.allergens),
+        "ok": list(profile.diets),
+        "not": list(profile.excluded),
+        "guessed": False,
+    }
+
+@tool
+def check_dietary_info_batch(dishes: list[str]) -> dict:
+    """
+    Check allergens of a whole menu in one call.
+    
+    Args:
+        dishes: Dish names.
+    """
+    # Un seul appel pour tout le menu : {plat: allergènes, régimes OK / NOT}
+    return {profile.dish: _dietary_record(profile) for profile in get_kb().dish_profiles(split_names(dishes))}
 
 @tool
 def check_fridge() -> str:
@@ -54,6 +112,15 @@ def get_menu_ideas(preference: str) -> str:
     4. Dessert: Fruit Salad (Veg, GF, Nut-free)
     """
 
+_PERSONS = re.compile(r"(\d+)\s*(?:people|persons|guests|personnes|pers\b|couverts|convives)", re.IGNORECASE)
+_BUDGET = re.compile(r"budget\D{0,12}?(\d+(?:[.,]\d+)?)\s*€|(\d+(?:[.,]\d+)?)\s*€\s*budget", re.IGNORECASE)
+
+def _find_number(pattern, text: str):
+    match = pattern.search(text)
+    if match is None:
+        return None
+    return float(next(g for g in match.groups() if g).replace(",", "."))
+
 @tool
 def calculate_total_cost(menu_description: str) -> str:
     """
@@ -62,7 +129,20 @@ def calculate_total_cost(menu_description: str) -> str:
     Args:
         menu_description: Description of the full menu.
     """
-    return "Total Estimated Cost: 95€ (fits within 120€ budget)."
+    # Plats reconnus dans la description, chiffrés en un seul calcul vectorisé
+    kb = get_kb()
+    dishes = [kb.dish_names[i] for i in kb.find_dishes(menu_description)]
+    if not dishes:
+        return "No known dish found. List the dishes by name (e.g. 'Vegetable Soup, Mushroom Risotto')."
+    persons = _find_number(_PERSONS, menu_description) or 1
+    cost = get_engine().cost_dishes(dishes, persons=persons)
+    detail = ", ".join(f"{d.dish} {d.per_portion:.2f}€" for d in cost.dishes)
+    result = f"Total Estimated Cost: {cost.total:.2f}€ for {persons:g} people ({cost.per_person:.2f}€/person: {detail})"
+    budget = _find_number(_BUDGET, menu_description)
+    if budget:
+        verdict = "fits within" if cost.total <= budget else "EXCEEDS"
+        result += f" ({verdict} {budget:g}€ budget)"
+    return result + "."
 
 # =============================================================================
 # AGENTS (Strict & Rapides)
@@ -70,8 +150,8 @@ def calculate_total_cost(menu_description: str) -> str:
 
 # On réduit max_steps à 2 pour qu'ils aillent droit au but
 nutritionist = CodeAgent(
-    tools=[check_dietary_info],
-    model=model,
+    tools=[check_dietary_info, check_dietary_info_batch],
+    model=routed_model("nutritionist"),
     name="nutritionist",
     description="Validates dietary constraints.",
     max_steps=2
@@ -79,7 +159,7 @@ nutritionist = CodeAgent(
 
 chef_agent = CodeAgent(
     tools=[check_fridge, get_menu_ideas],
-    model=model,
+    model=routed_model("chef_agent"),
     name="chef_agent",
     description="Proposes the full menu.",
     max_steps=2
@@ -87,40 +167,49 @@ chef_agent = CodeAgent(
 
 budget_agent = CodeAgent(
     tools=[calculate_total_cost],
-    model=model,
+    model=routed_model("budget_agent"),
     name="budget_agent",
     description="Validates budget.",
     max_steps=2
 )
 
+for sub_agent in (nutritionist, chef_agent, budget_agent):
+    enable_escalation(sub_agent)
+    deadline.attach(sub_agent)
+
 # =============================================================================
 # MANAGER
 # =============================================================================
 
 def build_restaurant_manager():
+    # Les vérifications nutrition et budget sont indépendantes une fois le menu connu :
+    # le manager peut les lancer en parallèle avec delegate_parallel
+    fan_out = FanOutTool([chef_agent, nutritionist, budget_agent])
+
     manager = CodeAgent(
-        tools=[], 
-        model=model,
+        tools=[fan_out], 
+        model=routed_model("restaurant_manager"),
         managed_agents=[chef_agent, nutritionist, budget_agent], 
         name="restaurant_manager",
         description="Manager.",
         max_steps=6 
     )
-    return manager
+    return deadline.attach(enable_escalation(manager))
 
 # =============================================================================
 # EXECUTION
 # =============================================================================
 
 @observe(name="run_restaurant_scenario")
-def run_scenario():
+def run_scenario(deadline_s=None):
     manager = build_restaurant_manager()
+    metrics.attach(manager)
     
     # Prompt conçu pour limiter la verbosité
     system_instructions = """
     RULES:
     1. Delegate to 'chef_agent' to get a FULL MENU in ONE shot.
-    2. Delegate to 'budget_agent' to check cost.
+    2. Then check diet AND cost in ONE step: delegate_parallel(tasks={"nutritionist": "...", "budget_agent": "..."}).
     3. Call agents with ONE string argument only.
     4. Be extremely concise.
     """
@@ -134,7 +223,8 @@ def run_scenario():
     print(f"REQUÊTE ENVOYÉE :\n{user_request}\n")
     print("Le Manager démarre (Version Optimisée)...\n")
     
-    result = manager.run(full_task)
+    with metrics.run("restaurant_scenario"), deadline.scope(deadline_s):
+        result = manager.run(full_task)
     return result
 
 if __name__ == "__main__":
@@ -152,4 +242,14 @@ if __name__ == "__main__":
         print(f"\nERREUR : {e}")
         print("Si c'est une erreur 429 ou RateLimit, attendez 60 secondes.")
 
-    langfuse.flush()
\ No newline at end of file
+    print("\nCOÛT PAR AGENT :")
+    print_routing_report()
+
+    # Export des métriques locales (JSON + texte Prometheus)
+    metrics.write_json("metrics_multi_agent.json")
+    metrics.write_prometheus("metrics_multi_agent.prom")
+    print("\nMÉTRIQUES PAR AGENT :")
+    for agent_name, agent_metrics in metrics.totals().items():
+        print(f"- {agent_name}: {agent_metrics}")
+
+    tracing.flush()
\ No newline at end of file
@@ -9,6 +9,9 @@ Ce script :
 1. Crée un dataset de scénarios culinaires complexes.
 2. Définit un Juge LLM expert en gastronomie.
 3. Lance une comparaison entre deux modèles (ex: Llama-3.3-70B vs Llama-3.1-8B).
+
+Les scores sont aussi gardés en local (results_store) : une relance ne rejoue que
+les items pas encore notés pour ce modèle, ce prompt et ce juge.
 """
 
 import os
@@ -17,8 +20,15 @@ import litellm
 from datetime import datetime
 from dotenv import load_dotenv
 from smolagents import CodeAgent, LiteLLMModel, tool
-from langfuse import observe, get_client, Evaluation
-from groq import Groq
+from langfuse import get_client, Evaluation
+import tracing
+from tracing import observe
+from llm_gateway import install_litellm_gateway, make_groq_client
+import deadline
+from ingredient_kb import get_kb
+from costing import get_engine
+from recipe_index import get_index
+from results_store import RunConfig, content_hash, get_results_store, item_hash, print_comparison_report
 
 load_dotenv()
 
@@ -26,7 +36,8 @@ load_dotenv()
 litellm.callbacks = ["langfuse_otel"]
 
 # Client pour le Juge
-groq_client = Groq()
+groq_client = make_groq_client()
+install_litellm_gateway()  # Pool HTTP partagé, fusion des requêtes, cassette si $CHEFBOT_CASSETTE
 
 # =============================================================================
 # OUTILS DU CHEF (Simulation du système pour l'évaluation)
@@ -39,8 +50,24 @@ def get_ingredient_prices(ingredients: str) -> str:
     Args:
         ingredients: Liste des ingrédients séparés par des virgules.
     """
-    # Simulation simple de prix
-    return "Prix moyens estimés: Viande (20€/kg), Légumes (4€/kg), Poisson (25€/kg), Épices (variable)."
+    # Prix au kilo de la base d'ingrédients, en un seul lot
+    prices = get_kb().prices(ingredients)
+    known = [f"{name} ({price:.2f}€/kg)" for name, price in prices.items() if price is not None]
+    unknown = [name for name, price in prices.items() if price is None]
+    result = "Prix moyens: " + (", ".join(known) if known else "aucun ingrédient connu")
+    if unknown:
+        result += f". Inconnus: {', '.join(unknown)}"
+    return result + "."
+
+@tool
+def estimate_menu_cost(dishes: str, persons: int) -> str:
+    """
+    Chiffre le coût matière d'un menu complet pour un groupe, en un seul appel.
+    Args:
+        dishes: Plats du menu séparés par des virgules (ex: "Salade César, Pavé de Saumon, Sorbet Citron").
+        persons: Nombre de convives.
+    """
+    return get_engine().cost_dishes(dishes, persons=int(persons)).summary()
 
 @tool
 def search_recipes(criteria: str) -> str:
@@ -49,7 +76,19 @@ def search_recipes(criteria: str) -> str:
     Args:
         criteria: Les critères de recherche (ex: "entrée végétarienne sans gluten").
     """
-    return f"Suggestions trouvées pour '{criteria}': Salade de quinoa, Soupe de courge, Risotto aux champignons."
+    # Recherche BM25 dans l'index local ; régime, allergènes, type de plat et coût sont lus dans les critères
+    result = get_index().search(criteria, k=5)
+    if not result.hits:
+        return f"Aucune recette pour '{criteria}' (filtres: {result.filters.describe()})."
+    lines = [f"Recettes pour '{criteria}' (filtres: {result.filters.describe()}, {result.matches} correspondance(s)):"]
+    for hit in result.hits:
+        cost = f"~{hit.cost:.2f}€/portion" if hit.cost is not None else "coût inconnu"
+        lines.append(
+            f"- {hit.nom} ({hit.categorie}, {cost}) | régimes: {', '.join(hit.diets) or 'aucun'}"
+            f" | allergènes: {', '.join(hit.allergens) or 'aucun'}"
+            f"{'' if hit.allergens_known else ' (au moins ; ingrédient inconnu, vérifier la recette)'}"
+        )
+    return "\n".join(lines)
 
 # =============================================================================
 # 7.1 - DATASET DE SCÉNARIOS
@@ -128,30 +167,36 @@ def create_chef_dataset():
 # CONSTRUCTION DE L'AGENT (Configurable)
 # =============================================================================
 
+CHEF_INSTRUCTIONS = """Tu es un Chef Exécutif de renommée mondiale.
+        Ta mission : Créer des menus complets qui respectent STRICTEMENT les contraintes des clients (allergies, budget, préférences).
+        1. Analyse la demande.
+        2. Vérifie les contraintes spéciales (Allergies = Priorité Absolue).
+        3. Propose un menu détaillé.
+        4. Estime le coût global.
+        Sois créatif mais réaliste."""
+
 def build_chef_agent(model_id: str):
     """Construit l'agent Chef avec un modèle spécifique pour la comparaison."""
     
     model = LiteLLMModel(model_id=model_id, api_key=os.environ.get("GROQ_API_KEY"))
     
-    return CodeAgent(
-        tools=[get_ingredient_prices, search_recipes],
+    agent = CodeAgent(
+        tools=[get_ingredient_prices, estimate_menu_cost, search_recipes],
         model=model,
         name="ChefBot_Manager",
         description="Orchestrateur de cuisine qui crée des menus adaptés.",
-        instructions="""Tu es un Chef Exécutif de renommée mondiale.
-        Ta mission : Créer des menus complets qui respectent STRICTEMENT les contraintes des clients (allergies, budget, préférences).
-        1. Analyse la demande.
-        2. Vérifie les contraintes spéciales (Allergies = Priorité Absolue).
-        3. Propose un menu détaillé.
-        4. Estime le coût global.
-        Sois créatif mais réaliste.""",
+        instructions=CHEF_INSTRUCTIONS,
         max_steps=5, # Limité pour éviter les boucles infinies lors du test
     )
+    # Sous une deadline (deadline.scope), l'agent rend sa réponse finale avant l'échéance
+    return deadline.attach(agent)
 
 # =============================================================================
 # 7.2 - JUGE LLM (Critères Gastronomiques)
 # =============================================================================
 
+JUDGE_MODEL = "llama-3.3-70b-versatile"  # Le juge doit être performant
+
 CHEF_JUDGE_PROMPT = """Tu es un Critique Gastronomique expert (Guide Michelin).
 Tu évalues la réponse d'un Chef IA à une demande client.
 
@@ -186,7 +231,7 @@ def judge_chef_response(question: str, response: str, expected: dict) -> dict:
     
     try:
         result = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile", # Le juge doit être performant
+            model=JUDGE_MODEL,
             messages=[
                 {"role": "system", "content": CHEF_JUDGE_PROMPT},
                 {"role": "user", "content": (
@@ -207,14 +252,31 @@ def judge_chef_response(question: str, response: str, expected: dict) -> dict:
 # 7.3 - EXÉCUTION ET COMPARAISON (CORRIGÉ V2)
 # =============================================================================
 
-def run_experiment(model_id: str, experiment_suffix: str):
-    """Lance l'évaluation complète sur un modèle donné."""
+def run_experiment(model_id: str, experiment_suffix: str, force: bool = False):
+    """Lance l'évaluation complète sur un modèle donné.
+    Les items déjà notés en local pour cette configuration sont sautés (sauf `force`)."""
     
     print(f"\n--- Lancement Expérience : {experiment_suffix} ({model_id}) ---")
     
     client = get_client()
     dataset = client.get_dataset("chefbot-multiagent-eval")
+
+    # Clé locale : modèle + prompt de l'agent + juge (modèle et grille)
+    store = get_results_store()
+    config = RunConfig(
+        experiment="boss",
+        model_id=model_id,
+        prompt_hash=content_hash(CHEF_INSTRUCTIONS),
+        evaluator_version=content_hash(JUDGE_MODEL, CHEF_JUDGE_PROMPT),
+    )
+    items = dataset.items if force else store.pending(config, dataset.items)
+    if len(items) < len(dataset.items):
+        print(f"[RÉSULTATS] {len(dataset.items) - len(items)} item(s) déjà notés pour cette configuration : sautés.")
+    if not items:
+        return None
+
     agent = build_chef_agent(model_id)
+    judge_errors = set()
 
     # --- CORRECTION 1 : La tâche doit accepter l'argument 'item' ---
     def task(item):
@@ -236,6 +298,9 @@ def run_experiment(model_id: str, experiment_suffix: str):
         )
         
         print(f"  > Juge ({experiment_suffix}): Note Budget={scores.get('budget', 0)}/1.0")
+        if scores.get("explanation") == "Erreur Juge":
+            # Notes à 0 par défaut : on ne les garde pas en local, l'item sera rejoué
+            judge_errors.add(item_hash({"input": input, "expected_output": expected_output}))
 
         return [
             Evaluation(name="respect_contraintes", value=scores.get("respect_contraintes", 0)),
@@ -246,17 +311,19 @@ def run_experiment(model_id: str, experiment_suffix: str):
         ]
 
     # Lancement de l'expérience
+    run_name = f"chef-eval-{experiment_suffix}"
     results = client.run_experiment(
-        name=f"chef-eval-{experiment_suffix}",
-        data=dataset.items,
+        name=run_name,
+        data=items,
         task=task,
         evaluators=[culinary_evaluator],
         description=f"Évaluation du ChefBot avec {model_id}",
         metadata={
             "agent_model": model_id,
-            "judge_model": "llama-3.3-70b-versatile",
+            "judge_model": JUDGE_MODEL,
         },
     )
+    store.record_experiment(config, results, run_name=run_name, skip=judge_errors)
     
     print(f"Expérience '{experiment_suffix}' terminée.")
     return results
@@ -284,7 +351,10 @@ if __name__ == "__main__":
         experiment_suffix="Model-8B"
     )
     
+    # Comparaison locale : écarts de scores avec IC bootstrap (items appariés)
+    print_comparison_report(get_results_store(), "boss")
+
     # Pour finir, on force l'envoi des traces
-    get_client().flush()
+    tracing.flush()
     print("TOUTES LES ÉVALUATIONS SONT TERMINÉES.")
     print("Allez sur votre Dashboard Langfuse pour comparer les scores 'Model-70B' vs 'Model-8B'.")
\ No newline at end of file
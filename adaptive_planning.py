@@ -0,0 +1,154 @@
+"""
+Planification adaptative pour les CodeAgent (Partie 5.2)
+=======================================================
+Avec `planning_interval=2`, smolagents paie un appel LLM de planification toutes
+les deux étapes, même pour un tour trivial ("C'est combien ?"). Cette politique
+pilote `agent.planning_interval` depuis les step callbacks et ne déclenche une
+re-planification que lorsqu'elle est utile :
+
+- au début d'une tâche qui semble complexe (plusieurs contraintes, budget, convives...) ;
+- après une étape en erreur ou un outil qui renvoie une erreur / un résultat vide ;
+- quand la progression stagne (mêmes observations ou même code plusieurs fois de suite).
+
+Le rapport de fin de run compare le nombre d'appels de planification avec celui
+qu'aurait coûté l'intervalle fixe.
+"""
+
+import re
+import unicodedata
+
+from smolagents.memory import ActionStep, PlanningStep
+
+# Mots-clés qui signalent une contrainte à respecter (comparés sans accents)
+COMPLEXITY_KEYWORDS = (
+    "vegetarien", "vegan", "sans gluten", "gluten", "allerg", "budget", "max",
+    "chacun", "personnes", "menu complet", "entree", "plat", "dessert", "on est",
+    "regime", "halal", "diabet",
+)
+
+EMPTY_RESULT_MARKERS = (
+    "aucun plat ne correspond", "no data available", "no reservations found", "not found",
+)
+ERROR_MARKERS = ("error", "erreur")
+
+
+def _fold(text: str) -> str:
+    """Minuscules sans accents, pour des comparaisons robustes."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def task_complexity(task: str) -> int:
+    """Score heuristique de complexité d'une demande (0 = triviale)."""
+    folded = _fold(task)
+    score = sum(1 for keyword in COMPLEXITY_KEYWORDS if keyword in folded)
+    if len(re.findall(r"\d+", folded)) >= 2:
+        score += 1
+    if len(folded.split()) > 25:
+        score += 1
+    return score
+
+
+class AdaptivePlanningPolicy:
+    """Décide, étape par étape, si la prochaine étape doit être précédée d'une planification."""
+
+    def __init__(self, fixed_interval: int = 2, complexity_threshold: int = 3, stall_steps: int = 2):
+        self.fixed_interval = fixed_interval
+        self.complexity_threshold = complexity_threshold
+        self.stall_steps = stall_steps
+        self.agent = None
+        self.history = []
+        self._reset_run()
+
+    def _reset_run(self):
+        self.action_steps = 0
+        self.planning_calls = 0
+        self.reasons = []
+        self._last_signature = None
+        self._stalled = 0
+
+    # --- Branchement sur l'agent ---------------------------------------------
+
+    def attach(self, agent):
+        """Enregistre la politique sur un agent (remplace l'intervalle fixe)."""
+        self.agent = agent
+        agent.planning_interval = None
+        agent.step_callbacks.register(PlanningStep, self._on_planning_step)
+        agent.step_callbacks.register(ActionStep, self._on_action_step)
+        return agent
+
+    def prepare(self, task: str):
+        """À appeler avant chaque `agent.run` : décide de la planification initiale."""
+        self._reset_run()
+        if task_complexity(task) >= self.complexity_threshold:
+            self.reasons.append((1, "tâche complexe"))
+            self._schedule_next(1)
+        else:
+            self._schedule_next(None)
+
+    def _schedule_next(self, step_number):
+        # smolagents planifie à l'étape N si (N - 1) % planning_interval == 0 :
+        # un intervalle égal au numéro de l'étape courante déclenche donc l'étape suivante.
+        if self.agent is not None:
+            self.agent.planning_interval = step_number
+
+    # --- Callbacks -----------------------------------------------------------
+
+    def _on_planning_step(self, memory_step, agent=None):
+        self.planning_calls += 1
+
+    def _on_action_step(self, memory_step, agent=None):
+        self.action_steps += 1
+        reason = None if memory_step.is_final_answer else self._replan_reason(memory_step)
+        if reason:
+            self.reasons.append((memory_step.step_number + 1, reason))
+            self._schedule_next(memory_step.step_number)
+        else:
+            self._schedule_next(None)
+
+    def _replan_reason(self, step) -> str:
+        if step.error is not None:
+            return f"erreur d'étape ({type(step.error).__name__})"
+
+        observations = _fold(step.observations or "")
+        # On ignore les en-têtes ajoutés par smolagents pour juger du contenu réel
+        content = observations.replace("execution logs:", "").replace("last output from code snippet:", "").strip()
+        if not content or content == "none" or any(m in content for m in EMPTY_RESULT_MARKERS):
+            return "résultat d'outil vide"
+        if any(m in content for m in ERROR_MARKERS):
+            return "erreur renvoyée par un outil"
+
+        signature = (step.code_action, observations)
+        if signature == self._last_signature:
+            self._stalled += 1
+        else:
+            self._stalled = 0
+        self._last_signature = signature
+        if self._stalled >= self.stall_steps - 1:
+            return "progression bloquée"
+        return None
+
+    # --- Rapport -------------------------------------------------------------
+
+    def fixed_interval_calls(self, action_steps: int = None) -> int:
+        """Nombre d'appels de planification qu'aurait fait `planning_interval=fixed_interval`."""
+        steps = self.action_steps if action_steps is None else action_steps
+        if steps <= 0:
+            return 0
+        return 1 + (steps - 1) // self.fixed_interval
+
+    def report(self) -> dict:
+        """Résumé du dernier run (et mémorisé dans `history`)."""
+        fixed = self.fixed_interval_calls()
+        summary = {
+            "action_steps": self.action_steps,
+            "planning_calls": self.planning_calls,
+            "fixed_interval_calls": fixed,
+            "planning_calls_saved": fixed - self.planning_calls,
+            "reasons": list(self.reasons),
+        }
+        self.history.append(summary)
+        return summary
+
+    def total_saved(self) -> int:
+        return sum(run["planning_calls_saved"] for run in self.history)
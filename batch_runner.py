@@ -0,0 +1,236 @@
+"""
+Exécution par lots d'un fichier JSONL, avec reprise sur checkpoint
+=================================================================
+Une ligne = une tâche :
+    {"id": "q1", "kind": "ask",   "input": "What can I cook with leftover rice?"}
+    {"id": "m1", "kind": "plan",  "input": "Menu végétarien pour 2 personnes"}
+    {"id": "a1", "kind": "agent", "input": "On est 3, budget 60€, un végétarien"}
+("question", "constraints" ou "task" peuvent remplacer "kind" + "input" ;
+"deadline_s" optionnel donne un budget de latence à la tâche, voir deadline.py.)
+
+    python batch_runner.py data/batch_example.jsonl -o results.jsonl --concurrency 4
+    python -m chefbot batch data/batch_example.jsonl -o results.jsonl
+
+- Le fichier est lu en flux (une ligne à la fois) et au plus `2 x concurrency`
+  tâches sont en cours : la mémoire ne dépend pas de la taille du fichier.
+- Chaque résultat est ajouté à la sortie dès qu'il est prêt (ordre de fin).
+- Le checkpoint garde un "watermark" (toutes les lignes avant cet offset sont
+  faites) et les offsets terminés au-delà. Relancer la même commande reprend
+  là où le job s'est arrêté.
+- Les erreurs 429 sont réessayées avec backoff exponentiel. Si elles persistent,
+  le job s'arrête proprement (code 2) sans marquer la ligne : elle sera refaite
+  à la reprise. Les autres erreurs sont écrites dans la sortie et la ligne est
+  marquée faite.
+
+Une ligne peut être écrite deux fois si le processus meurt entre l'écriture du
+résultat et celle du checkpoint (au moins une fois) : le champ "offset" permet de dédoublonner.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+KINDS = {"ask": "question", "plan": "constraints", "agent": "task"}
+
+
+class RateLimited(Exception):
+    """Limite de débit toujours atteinte après tous les essais."""
+
+
+# =============================================================================
+# CHECKPOINT
+# =============================================================================
+
+class Checkpoint:
+    def __init__(self, path: str, input_path: str):
+        self.path = path
+        self.input_path = os.path.abspath(input_path)
+        self.watermark = 0
+        self._done = {}  # offset de début -> offset de la ligne suivante
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("input") != self.input_path:
+                raise ValueError(f"Le checkpoint {path} concerne un autre fichier : {state.get('input')}")
+            self.watermark = state["watermark"]
+            self._done = {start: end for start, end in state["done"]}
+
+    def is_done(self, offset: int) -> bool:
+        with self._lock:
+            return offset < self.watermark or offset in self._done
+
+    def mark(self, start: int, end: int):
+        with self._lock:
+            self._done[start] = end
+            # Le watermark avance tant que les lignes suivantes sont terminées
+            while self.watermark in self._done:
+                self.watermark = self._done.pop(self.watermark)
+            self._save()
+
+    def _save(self):
+        state = {"input": self.input_path, "watermark": self.watermark, "done": sorted(self._done.items())}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+
+# =============================================================================
+# TÂCHES
+# =============================================================================
+
+def parse_task(line: str) -> tuple:
+    """Retourne (kind, input, id, deadline_s) pour une ligne JSONL."""
+    task = json.loads(line)
+    kind = task.get("kind")
+    if kind is None:
+        kind = next((k for k, field in KINDS.items() if field in task), None)
+    if kind not in KINDS:
+        raise ValueError(f"Type de tâche inconnu : {kind!r} (attendu : {', '.join(KINDS)})")
+    value = task.get("input", task.get(KINDS[kind]))
+    if not value:
+        raise ValueError("Tâche sans entrée")
+    return kind, value, task.get("id"), task.get("deadline_s")
+
+
+_agent_lock = threading.Lock()
+
+
+def run_task(kind: str, value: str, deadline_s: float = None):
+    import chefbot
+
+    if kind == "ask":
+        return chefbot.ask_chef(value, deadline_s=deadline_s)
+    if kind == "plan":
+        result = chefbot.plan_weekly_menu(value, deadline_s=deadline_s)
+        if result.get("status") == "error":
+            # plan_weekly_menu capture ses erreurs : on les remonte pour pouvoir réessayer les 429
+            raise RuntimeError(result.get("error"))
+        return result
+    # Le maître d'hôtel (05_restau) est un agent unique : une seule session à la fois
+    with _agent_lock:
+        return chefbot.run_agent_interaction(value, reset_memory=True, deadline_s=deadline_s)
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    while exc is not None:
+        status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+        message = str(exc).lower()
+        if status == 429 or "ratelimit" in type(exc).__name__.lower() or "rate limit" in message or "429" in message:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def with_retries(func, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 30.0):
+    for attempt in range(max_retries + 1):
+        try:
+            return func(), attempt + 1
+        except Exception as e:
+            if not is_rate_limited(e):
+                raise
+            if attempt == max_retries:
+                raise RateLimited(str(e)) from e
+            delay = min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+            print(f"[BATCH] 429, nouvel essai dans {delay:.1f}s ({attempt + 1}/{max_retries})")
+            time.sleep(delay)
+
+
+# =============================================================================
+# RUNNER
+# =============================================================================
+
+def run_batch(input_path: str, output_path: str, checkpoint_path: str = None, concurrency: int = 4,
+              max_retries: int = 5, base_delay: float = 1.0, task_runner=run_task) -> dict:
+    checkpoint = Checkpoint(checkpoint_path or f"{output_path}.checkpoint.json", input_path)
+    stats = {"ok": 0, "error": 0, "skipped": 0, "rate_limited": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+    slots = threading.BoundedSemaphore(2 * concurrency)
+    started = time.perf_counter()
+
+    def process(start: int, end: int, raw: bytes, out):
+        try:
+            t0 = time.perf_counter()
+            record = {"offset": start}
+            try:
+                kind, value, task_id, deadline_s = parse_task(raw.decode("utf-8"))
+                record.update(id=task_id, kind=kind)
+                output, attempts = with_retries(lambda: task_runner(kind, value, deadline_s), max_retries, base_delay)
+                record.update(status="ok", output=output, attempts=attempts)
+            except RateLimited as e:
+                # Ligne non marquée : elle sera refaite à la reprise
+                with lock:
+                    stats["rate_limited"] += 1
+                print(f"[BATCH] Limite de débit persistante à l'offset {start}, arrêt du job : {e}")
+                stop.set()
+                return
+            except Exception as e:
+                record.update(status="error", error=f"{type(e).__name__}: {e}")
+            record["duration_s"] = round(time.perf_counter() - t0, 3)
+
+            line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+            with lock:
+                out.write(line)
+                out.flush()
+                stats[record["status"]] += 1
+            checkpoint.mark(start, end)
+        finally:
+            slots.release()
+
+    with open(input_path, "rb") as f, open(output_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Tout ce qui précède le watermark est déjà fait
+        f.seek(checkpoint.watermark)
+        offset = checkpoint.watermark
+        for raw in iter(f.readline, b""):
+            start, offset = offset, offset + len(raw)
+            if checkpoint.is_done(start):
+                stats["skipped"] += 1
+                continue
+            if not raw.strip():
+                checkpoint.mark(start, offset)
+                continue
+            slots.acquire()
+            if stop.is_set():
+                slots.release()
+                break
+            pool.submit(process, start, offset, raw, out)
+
+    stats["elapsed_s"] = round(time.perf_counter() - started, 2)
+    stats["completed"] = not stop.is_set()
+    stats["watermark"] = checkpoint.watermark
+    return stats
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("input", help="Fichier JSONL de tâches (ask / plan / agent)")
+    parser.add_argument("-o", "--output", required=True, help="Fichier JSONL de résultats (ajout)")
+    parser.add_argument("--checkpoint", default=None, help="Défaut : <output>.checkpoint.json")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-retries", type=int, default=5, help="Essais supplémentaires sur erreur 429")
+
+
+def run_from_args(args) -> int:
+    stats = run_batch(args.input, args.output, args.checkpoint, args.concurrency, args.max_retries)
+    print(f"[BATCH] {json.dumps(stats, ensure_ascii=False)}")
+    if not stats["completed"]:
+        print("[BATCH] Job interrompu : relancez la même commande pour reprendre.")
+        return 2
+    return 0
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Exécution par lots d'un fichier JSONL de tâches ChefBot")
+    add_arguments(parser)
+    return run_from_args(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
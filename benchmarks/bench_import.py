@@ -0,0 +1,83 @@
+"""
+Temps de démarrage à froid du paquet `chefbot`
+=============================================
+Chaque mesure lance un interpréteur neuf pour `import chefbot` et
+`python -m chefbot --help`, et vérifie qu'aucune dépendance lourde n'a été importée.
+
+    python benchmarks/bench_import.py                 # échoue si la médiane dépasse la cible
+    python benchmarks/bench_import.py --target-ms 150 --runs 20
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from harness import benchmark
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("smolagents", "litellm", "langfuse", "groq", "dotenv", "openai", "httpx")
+DEFAULT_TARGET_MS = 200.0
+
+COMMANDS = {
+    "import_chefbot": [sys.executable, "-c", "import chefbot"],
+    "cli_help": [sys.executable, "-m", "chefbot", "--help"],
+}
+
+
+def cold_start(command: list):
+    subprocess.run(command, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+
+
+def heavy_modules_loaded() -> list:
+    code = (
+        "import sys, chefbot, chefbot.cli; chefbot.cli.build_parser(); "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return [m for m in output.strip().split(",") if m]
+
+
+@benchmark("cold_start", params=list(COMMANDS), repeat=5, number=1)
+def bench_cold_start(command: str):
+    return lambda: cold_start(COMMANDS[command])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de démarrage à froid de chefbot")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS, help="Médiane maximale acceptée")
+    args = parser.parse_args()
+
+    # Référence : l'interpréteur seul, pour situer le surcoût propre au paquet
+    commands = {"python_baseline": [sys.executable, "-c", "pass"], **COMMANDS}
+    medians = {}
+    for name, command in commands.items():
+        cold_start(command)  # préchauffe le cache disque / .pyc
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            cold_start(command)
+            timings.append((time.perf_counter() - start) * 1e3)
+        medians[name] = statistics.median(timings)
+        print(f"{name:<16} median={medians[name]:>8.1f} ms  min={min(timings):>8.1f} ms")
+
+    failures = []
+    leaked = heavy_modules_loaded()
+    if leaked:
+        failures.append(f"dépendances lourdes importées au démarrage : {', '.join(leaked)}")
+    for name in COMMANDS:
+        if medians[name] > args.target_ms:
+            failures.append(f"{name} : {medians[name]:.1f} ms > cible {args.target_ms:.0f} ms")
+
+    if failures:
+        for failure in failures:
+            print(f"ÉCHEC - {failure}")
+        sys.exit(1)
+    print(f"OK - démarrage sous la cible de {args.target_ms:.0f} ms, aucune dépendance lourde importée")
+
+
+if __name__ == "__main__":
+    main()
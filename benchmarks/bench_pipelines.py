@@ -0,0 +1,185 @@
+"""
+Benchmarks des étapes des pipelines (contre les substituts hors-ligne)
+=====================================================================
+- rule_evaluator (03_evaluation) sur de gros lots de sorties ;
+- MenuDatabaseTool.forward (05_restau) pour des catalogues de taille croissante ;
+- construction des prompts de _execute_step / _synthesize_menu (02) selon le nombre d'étapes ;
+- dispatch des outils de run_manual_loop (04) ;
+- requêtes par lots sur la base d'ingrédients (prix, saisons, profils de plats) ;
+- chiffrage vectorisé d'un menu complet et d'une recette libre (costing) ;
+- recherche BM25 + filtres dans l'index des recettes (corpus réel, puis synthétique de 30 000 recettes) ;
+- plan_weekly_menu de bout en bout contre le serveur LLM factice (latence simulée).
+"""
+
+import json
+import os
+import random
+import tempfile
+from types import SimpleNamespace
+
+from chefbot import load_script
+from harness import benchmark
+
+WORDS = (
+    "salade pois chiches feta concombre citron quinoa lentilles tofu poivrons riz poulet avocat "
+    "noix sucre miel pain blanc pates completes oeufs legumineuses sesame arachide creme beurre"
+).split()
+
+
+def _random_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+@benchmark("rule_evaluator", params=[100, 1_000, 10_000], repeat=3, number=1)
+def bench_rule_evaluator(n_outputs: int):
+    evaluation = load_script("03_evaluation.py")
+    rng = random.Random(0)
+    cases = [
+        (
+            _random_text(rng, 120),
+            {"must_avoid": rng.sample(WORDS, 4), "must_include": rng.sample(WORDS, 4)},
+        )
+        for _ in range(n_outputs)
+    ]
+
+    def run():
+        for output, expected in cases:
+            evaluation.rule_evaluator(output=output, expected_output=expected)
+    return run
+
+
+@benchmark("menu_database_forward", params=[11, 1_000, 10_000, 100_000], repeat=3)
+def bench_menu_forward(n_dishes: int):
+    from menu_catalogue import get_catalogue
+
+    restau = load_script("05_restau.py")
+    rng = random.Random(0)
+    categories = ["entrée", "plat", "dessert", "boisson"]
+    allergens = ["gluten", "lait", "oeuf", "poisson", "fruits à coque"]
+    dishes = [
+        {
+            "nom": f"Plat {i} {rng.choice(WORDS)}",
+            "prix": rng.randint(5, 40),
+            "prep": f"{rng.randint(5, 40)}min",
+            "allergenes": rng.sample(allergens, rng.randint(0, 2)),
+            "categorie": rng.choice(categories),
+        }
+        for i in range(n_dishes)
+    ]
+    path = os.path.join(tempfile.mkdtemp(prefix="chefbot-bench-"), "menu.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dishes, f, ensure_ascii=False)
+
+    tool = restau.MenuDatabaseTool()
+    tool.catalogue = get_catalogue(path)
+    return lambda: tool.forward(category="plat", max_price=25, exclude_allergen="gluten")
+
+
+def _step_results(n_steps: int) -> list:
+    rng = random.Random(0)
+    return [
+        {"step_index": i, "step": f"Étape {i} : {_random_text(rng, 8)}", "output": _random_text(rng, 150)}
+        for i in range(n_steps)
+    ]
+
+
+@benchmark("execute_step_prompt", params=[4, 16, 64, 256])
+def bench_execute_step_prompt(n_steps: int):
+    planning = load_script("02_planification.py")
+    context = _step_results(n_steps)
+    return lambda: planning._build_step_messages("Établir la liste de courses", context)
+
+
+@benchmark("synthesize_menu_prompt", params=[4, 16, 64, 256])
+def bench_synthesize_prompt(n_steps: int):
+    planning = load_script("02_planification.py")
+    results = _step_results(n_steps)
+    return lambda: planning._build_synthesis_messages("Menu végétarien pour 2 personnes", results)
+
+
+@benchmark("manual_loop_tool_dispatch", params=["get_seasonal_products", "calculate_food_cost", "get_reservations", "get_reservations_range", "unknown"])
+def bench_tool_dispatch(tool_name: str):
+    outils = load_script("04_outils.py")
+    arguments = {
+        "get_seasonal_products": {"month": "March"},
+        "calculate_food_cost": {"price_per_kg": 12.5, "weight_kg": 0.8},
+        "get_reservations": {"date": "15/03/2025"},
+        "get_reservations_range": {"start_date": "10/03/2025", "end_date": "16/03/2025"},
+        "unknown": {},
+    }[tool_name]
+    tool_call = SimpleNamespace(
+        id="call_bench",
+        function=SimpleNamespace(name=tool_name, arguments=json.dumps(arguments)),
+    )
+    return lambda: outils._dispatch_tool_call(tool_call)
+
+
+@benchmark("ingredient_kb_batch", params=[1, 10, 100])
+def bench_ingredient_kb(batch_size: int):
+    from ingredient_kb import get_kb
+
+    kb = get_kb()
+    rng = random.Random(0)
+    names = [rng.choice(kb.names_fr) for _ in range(batch_size)]
+    dishes = [rng.choice(kb.dish_names) for _ in range(batch_size)]
+
+    def run():
+        kb.prices(names)
+        kb.in_season(names, "mars", "provence")
+        kb.dish_profiles(dishes)
+    return run
+
+
+@benchmark("menu_costing", params=[3, 15, 150])
+def bench_menu_costing(n_dishes: int):
+    from costing import get_engine
+
+    engine = get_engine()
+    dishes = [engine.kb.dish_names[i % len(engine.kb.dish_names)] for i in range(n_dishes)]
+    recipe = ", ".join(f"{10 + i} g {engine.kb.names_fr[i % len(engine.kb.names_fr)]}" for i in range(n_dishes))
+
+    def run():
+        engine.cost_dishes(dishes, persons=12)
+        engine.cost_recipe(recipe, servings=12)
+    return run
+
+
+def _synthetic_corpus(path: str, n_recipes: int):
+    """Corpus de `n_recipes` recettes obtenues en recombinant les recettes de data/recipes.jsonl."""
+    from recipe_index import DEFAULT_RECIPES_PATH
+
+    with open(DEFAULT_RECIPES_PATH, encoding="utf-8") as f:
+        base = [json.loads(line) for line in f if line.strip()]
+    pool = [line for recipe in base for line in recipe["ingredients"]]
+    rng = random.Random(0)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n_recipes):
+            recipe = dict(rng.choice(base))
+            recipe["id"] = f"s{i}"
+            recipe["nom"] = f"{recipe['nom']} {i}"
+            recipe["ingredients"] = recipe["ingredients"] + rng.sample(pool, 2)
+            f.write(json.dumps(recipe, ensure_ascii=False) + "\n")
+
+
+@benchmark("recipe_search", params=[None, 30_000])
+def bench_recipe_search(n_recipes):
+    from recipe_index import RecipeIndex
+
+    if n_recipes is None:
+        index = RecipeIndex.open()
+    else:
+        corpus = os.path.join(tempfile.mkdtemp(prefix="chefbot-recipes-"), "recipes.jsonl")
+        _synthetic_corpus(corpus, n_recipes)
+        index = RecipeIndex.open(corpus)
+    queries = ["entrée végétarienne sans gluten", "plat vegan aux pois chiches", "saumon sans sésame moins de 5€", "chocolat"]
+
+    def run():
+        for query in queries:
+            index.search(query, k=5)
+    return run
+
+
+@benchmark("plan_weekly_menu_e2e", params=[None], repeat=3, number=1)
+def bench_plan_weekly_menu(_):
+    planning = load_script("02_planification.py")
+    return lambda: planning.plan_weekly_menu("Menu végétarien pour 2 personnes, budget serré")
@@ -0,0 +1,49 @@
+"""
+Surcoût du traçage par appel (tracing.observe)
+=============================================
+Une "requête" = un point d'entrée décoré qui appelle 3 fonctions décorées
+imbriquées et met à jour la trace, comme plan_weekly_menu. On compare :
+- raw       : mêmes fonctions sans décorateur (référence) ;
+- off       : CHEFBOT_TRACING=off ;
+- unsampled : taux 0, chemin rapide des traces non échantillonnées ;
+- sampled   : taux 1, spans exportés par lots dans un fichier JSONL.
+"""
+
+import os
+import tempfile
+
+import tracing
+from harness import benchmark
+
+
+def _pipeline(decorate):
+    @decorate(name="bench_step", as_type="generation")
+    def step(i: int) -> int:
+        tracing.update_current_span(metadata={"step": i})
+        return i * 2
+
+    @decorate(name="bench_entry")
+    def entry(n: int) -> int:
+        tracing.update_current_trace(tags=["bench"], metadata={"n": n})
+        return sum(step(i) for i in range(3))
+
+    return entry
+
+
+def _no_decorator(**_):
+    return lambda func: func
+
+
+@benchmark("tracing_overhead", params=["raw", "off", "unsampled", "sampled"])
+def bench_tracing(mode: str):
+    if mode == "raw":
+        entry = _pipeline(_no_decorator)
+    else:
+        path = os.path.join(tempfile.mkdtemp(prefix="chefbot-bench-"), "traces.jsonl")
+        tracing.configure(
+            exporter="off" if mode == "off" else "file",
+            default_rate=0.0 if mode == "unsampled" else 1.0,
+            path=path,
+        )
+        entry = _pipeline(tracing.observe)
+    return lambda: entry(1)
@@ -0,0 +1,110 @@
+"""
+Mini-harnais de benchmarks
+=========================
+Chaque benchmark est une fonction `bench(param) -> callable` enregistrée avec
+`@benchmark(nom, params=[...])` : la fonction prépare les données pour une
+taille donnée et renvoie l'appel à chronométrer. Le harnais mesure plusieurs
+répétitions, garde min / médiane / moyenne par appel et écrit le tout en JSON.
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime
+
+BENCHMARKS = []
+
+
+def benchmark(name: str, params: list = (None,), repeat: int = 5, number: int = None, target_s: float = 0.2):
+    """Enregistre un benchmark. `number` = appels par répétition (calibré automatiquement si None)."""
+    def decorator(setup):
+        BENCHMARKS.append({
+            "name": name, "setup": setup, "params": list(params),
+            "repeat": repeat, "number": number, "target_s": target_s,
+        })
+        return setup
+    return decorator
+
+
+def _calibrate(func, target_s: float) -> int:
+    # Double le nombre d'appels jusqu'à ce qu'une répétition dure au moins target_s
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= target_s or number >= 1 << 20:
+            return number
+        number *= 2
+
+
+def measure(func, repeat: int = 5, number: int = None, target_s: float = 0.2) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        number = number or _calibrate(func, target_s)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            timings.append((time.perf_counter() - start) / number)
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.fmean(timings),
+        "ops_per_s": 1.0 / min(timings) if min(timings) > 0 else float("inf"),
+    }
+
+
+def run_benchmarks(selected: list = None) -> list:
+    results = []
+    for bench in BENCHMARKS:
+        if selected and not any(s in bench["name"] for s in selected):
+            continue
+        for param in bench["params"]:
+            with contextlib.redirect_stdout(io.StringIO()):
+                func = bench["setup"](param)
+            stats = measure(func, bench["repeat"], bench["number"], bench["target_s"])
+            result = {"name": bench["name"], "param": param, **stats}
+            results.append(result)
+            label = bench["name"] if param is None else f"{bench['name']}[{param}]"
+            print(f"{label:<48} median={stats['median_s'] * 1e3:>10.4f} ms  min={stats['min_s'] * 1e3:>10.4f} ms  (x{stats['number']})")
+    return results
+
+
+def save_results(results: list, directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    payload = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+
+def compare(results: list, baseline_path: str, threshold: float = 0.2) -> list:
+    """Liste les régressions : meilleur temps plus lent que la référence de plus de `threshold` (20 %)."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["name"], json.dumps(r["param"])): r for r in json.load(f)["results"]}
+
+    regressions = []
+    for result in results:
+        reference = baseline.get((result["name"], json.dumps(result["param"])))
+        if reference is None or reference["min_s"] == 0:
+            continue
+        ratio = result["min_s"] / reference["min_s"]
+        status = "REGRESSION" if ratio > 1 + threshold else "ok"
+        label = result["name"] if result["param"] is None else f"{result['name']}[{result['param']}]"
+        print(f"{label:<48} x{ratio:>6.2f}  {status}")
+        if status == "REGRESSION":
+            regressions.append({"name": result["name"], "param": result["param"], "ratio": ratio})
+    return regressions
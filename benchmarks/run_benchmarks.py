@@ -0,0 +1,56 @@
+"""
+Lance la suite de benchmarks hors-ligne et enregistre les résultats en JSON.
+
+    python benchmarks/run_benchmarks.py                                # tout
+    python benchmarks/run_benchmarks.py --only rule_evaluator menu     # sous-ensemble
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/bench-XXXX.json
+
+Les appels LLM partent vers le serveur factice (mock_llm_server) démarré en
+local avec une latence simulée : aucun réseau ni clé API n'est nécessaire.
+Avec --compare, le script sort en erreur si un temps minimal régresse de plus de --threshold.
+"""
+
+import argparse
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path[:0] = [BENCH_DIR, ROOT]
+
+from harness import compare, run_benchmarks, save_results  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks ChefBot")
+    parser.add_argument("--only", nargs="*", default=None, help="Filtre sur le nom des benchmarks")
+    parser.add_argument("--latency", default="fixed:0.02", help="Latence simulée du serveur LLM factice")
+    parser.add_argument("--results-dir", default=os.path.join(BENCH_DIR, "results"))
+    parser.add_argument("--compare", default=None, help="Fichier de résultats de référence")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # Le serveur factice doit tourner avant l'import des scripts (clients créés à l'import)
+    from cassette import LatencyModel
+    from mock_llm_server import MockLLMConfig, point_clients_to, start_server
+
+    server, base_url = start_server(MockLLMConfig.from_script(latency=LatencyModel.parse(args.latency)))
+    point_clients_to(base_url)
+
+    import bench_import  # noqa: F401  (enregistre les benchmarks)
+    import bench_pipelines  # noqa: F401
+    import bench_tracing  # noqa: F401
+
+    results = run_benchmarks(args.only)
+    path = save_results(results, args.results_dir)
+    print(f"\nRésultats enregistrés dans {path}")
+    server.shutdown()
+
+    if args.compare:
+        print(f"\nComparaison avec {args.compare} (seuil {args.threshold:.0%}) :")
+        if compare(results, args.compare, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Enregistrement / rejeu des appels LLM (cassettes)
+================================================
+Couche placée sous le client `groq.Groq` et sous `litellm.completion` (utilisé
+par `LiteLLMModel` de smolagents). En mode "record", chaque couple
+requête / réponse est écrit une fois dans un fichier cassette (JSONL) ; en mode
+"replay", les réponses sont rejouées à l'identique, sans réseau ni clé API,
+avec une latence simulée optionnelle.
+
+Configuration par variables d'environnement :
+    CHEFBOT_CASSETTE=cassettes/chefbot.jsonl
+    CHEFBOT_CASSETTE_MODE=replay          # record | replay | auto (rejoue, sinon enregistre)
+    CHEFBOT_CASSETTE_LATENCY=lognormal:0.8,0.4   # ou fixed:0.5 ; médiane en secondes, sigma
+
+Les requêtes identiques (même modèle, messages, outils, paramètres) sont
+rejouées dans l'ordre où elles ont été enregistrées.
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+
+CASSETTE_ENV = "CHEFBOT_CASSETTE"
+MODE_ENV = "CHEFBOT_CASSETTE_MODE"
+LATENCY_ENV = "CHEFBOT_CASSETTE_LATENCY"
+
+# Seuls ces paramètres identifient une requête (jamais la clé API ni l'URL)
+REQUEST_KEYS = (
+    "model", "messages", "tools", "tool_choice", "temperature", "top_p", "max_tokens",
+    "response_format", "stop", "seed", "n",
+)
+
+
+class CassetteMiss(KeyError):
+    """Aucune réponse enregistrée pour cette requête en mode replay."""
+
+
+class LatencyModel:
+    """Latence simulée au rejeu : fixe ou log-normale (médiane, sigma)."""
+
+    def __init__(self, kind: str = "none", median: float = 0.0, sigma: float = 0.0, seed: int = None):
+        if kind == "lognormal" and median <= 0:
+            raise ValueError(f"Latence log-normale : la médiane doit être > 0 (reçu {median:g})")
+        if median < 0 or sigma < 0:
+            raise ValueError(f"Latence invalide : médiane {median:g}, sigma {sigma:g}")
+        self.kind = kind
+        self.median = median
+        self.sigma = sigma
+        self._random = random.Random(seed)
+
+    @classmethod
+    def parse(cls, spec: str, seed: int = None) -> "LatencyModel":
+        """Lit une spécification du type 'fixed:0.5' ou 'lognormal:0.8,0.4'."""
+        if not spec or spec == "none":
+            return cls()
+        kind, _, params = spec.partition(":")
+        values = [float(v) for v in params.split(",") if v]
+        if kind in ("fixed", "lognormal") and not values:
+            raise ValueError(f"Latence sans valeur : {spec} (ex. 'fixed:0.5', 'lognormal:0.8,0.4')")
+        if kind == "fixed":
+            return cls("fixed", values[0])
+        if kind == "lognormal":
+            return cls("lognormal", values[0], values[1] if len(values) > 1 else 0.5, seed=seed)
+        raise ValueError(f"Latence inconnue : {spec}")
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.median
+        if self.kind == "lognormal":
+            return self._random.lognormvariate(math.log(self.median), self.sigma)
+        return 0.0
+
+    def sleep(self):
+        delay = self.sample()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+def _to_jsonable(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, dict):
+        return {k: _to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def normalize_request(kwargs: dict) -> dict:
+    return {key: _to_jsonable(kwargs[key]) for key in REQUEST_KEYS if kwargs.get(key) is not None}
+
+
+def request_key(request: dict) -> str:
+    canonical = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Fichier JSONL de couples requête / réponse."""
+
+    def __init__(self, path: str, mode: str = "replay", latency: LatencyModel = None):
+        if mode not in ("record", "replay", "auto"):
+            raise ValueError(f"Mode de cassette inconnu : {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency or LatencyModel()
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._cursors = {}
+        self.stats = {"replayed": 0, "recorded": 0, "misses": 0}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry["response"])
+
+    def _append(self, key: str, source: str, request: dict, response: dict):
+        self._entries.setdefault(key, []).append(response)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "source": source, "request": request, "response": response}, ensure_ascii=False) + "\n")
+
+    def _next_recorded(self, key: str):
+        responses = self._entries.get(key)
+        if not responses:
+            return None
+        # Requêtes identiques : on rejoue les réponses dans l'ordre, puis on boucle
+        cursor = self._cursors.get(key, 0)
+        self._cursors[key] = cursor + 1
+        return responses[cursor % len(responses)]
+
+    def play(self, source: str, kwargs: dict, call_upstream) -> dict:
+        """Retourne la réponse (dict) pour la requête, en rejouant ou en appelant l'API."""
+        request = normalize_request(kwargs)
+        key = request_key(request)
+
+        if self.mode in ("replay", "auto"):
+            with self._lock:
+                response = self._next_recorded(key)
+                if response is not None:
+                    self.stats["replayed"] += 1
+                elif self.mode == "replay":
+                    self.stats["misses"] += 1
+            if response is not None:
+                self.latency.sleep()
+                return response
+            if self.mode == "replay":
+                raise CassetteMiss(f"Aucune réponse enregistrée dans {self.path} pour {request.get('model')} ({key[:12]})")
+
+        response = _to_jsonable(call_upstream())
+        with self._lock:
+            self._append(key, source, request, response)
+            self.stats["recorded"] += 1
+        return response
+
+
+# =============================================================================
+# CLIENT GROQ
+# =============================================================================
+
+class _CassetteCompletions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        from groq.types.chat import ChatCompletion
+
+        if kwargs.get("stream"):
+            raise ValueError("Les cassettes ne gèrent pas les réponses en streaming.")
+        response = self._owner.cassette.play(
+            "groq", kwargs, lambda: self._owner.real_client.chat.completions.create(**kwargs)
+        )
+        return ChatCompletion.model_validate(response)
+
+
+class _CassetteChat:
+    def __init__(self, owner):
+        self.completions = _CassetteCompletions(owner)
+
+
+class CassetteGroqClient:
+    """Remplace `Groq()` : même interface `chat.completions.create`, réponses issues de la cassette.
+
+    Le vrai client n'est créé qu'au premier enregistrement : le rejeu fonctionne sans clé API.
+    """
+
+    def __init__(self, cassette: Cassette, client_factory=None):
+        self.cassette = cassette
+        self._client_factory = client_factory
+        self._real_client = None
+        self.chat = _CassetteChat(self)
+
+    @property
+    def real_client(self):
+        if self._real_client is None:
+            if self._client_factory is None:
+                from groq import Groq
+                self._client_factory = Groq
+            self._real_client = self._client_factory()
+        return self._real_client
+
+
+# =============================================================================
+# LITELLM (LiteLLMModel de smolagents)
+# =============================================================================
+
+_litellm_original_completion = None
+
+
+def install_litellm_cassette(cassette: Cassette):
+    """Remplace `litellm.completion` (appelé par LiteLLMModel) par sa version cassette."""
+    global _litellm_original_completion
+    import litellm
+
+    if _litellm_original_completion is None:
+        _litellm_original_completion = litellm.completion
+    upstream = _litellm_original_completion
+
+    def completion(*args, **kwargs):
+        if kwargs.get("stream"):
+            raise ValueError("Les cassettes ne gèrent pas les réponses en streaming.")
+        response = cassette.play("litellm", kwargs, lambda: upstream(*args, **kwargs))
+        return litellm.ModelResponse(**response)
+
+    litellm.completion = completion
+    return cassette
+
+
+def uninstall_litellm_cassette():
+    global _litellm_original_completion
+    import litellm
+
+    if _litellm_original_completion is not None:
+        litellm.completion = _litellm_original_completion
+        _litellm_original_completion = None
+
+
+# =============================================================================
+# CONFIGURATION PAR L'ENVIRONNEMENT
+# =============================================================================
+
+_env_cassette = None
+
+
+def cassette_from_env():
+    """Cassette partagée décrite par $CHEFBOT_CASSETTE (None si la variable est absente)."""
+    global _env_cassette
+    path = os.environ.get(CASSETTE_ENV)
+    if not path:
+        return None
+    if _env_cassette is None or _env_cassette.path != path:
+        _env_cassette = Cassette(
+            path,
+            mode=os.environ.get(MODE_ENV, "replay"),
+            latency=LatencyModel.parse(os.environ.get(LATENCY_ENV, "none")),
+        )
+    return _env_cassette
+
+
+class LazyClient:
+    """Client Groq construit au premier accès à un attribut (ex: `client.chat`), pas à l'import du script."""
+
+    def __init__(self, client_factory=None):
+        self._client_factory = client_factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    if self._client_factory is None:
+                        from groq import Groq
+                        self._client_factory = Groq
+                    self._client = self._client_factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+
+def make_groq_client(client_factory=None):
+    """Client Groq à utiliser : passe par la cassette si $CHEFBOT_CASSETTE est défini."""
+    cassette = cassette_from_env()
+    if cassette is not None:
+        return CassetteGroqClient(cassette, client_factory)
+    return LazyClient(client_factory)
+
+
+def install_litellm_cassette_from_env():
+    """Branche la cassette sous litellm si $CHEFBOT_CASSETTE est défini."""
+    cassette = cassette_from_env()
+    if cassette is not None:
+        install_litellm_cassette(cassette)
+    return cassette
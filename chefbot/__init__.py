@@ -0,0 +1,46 @@
+"""
+ChefBot : accès importable aux pipelines du dépôt
+================================================
+    import chefbot
+    chefbot.ask_chef("Quick dinner ideas?")      # charge 01_chefbot.py au premier appel
+    chefbot.plan_weekly_menu("Menu végétarien pour 2 personnes")
+
+L'import du paquet est quasi instantané : aucun script n'est exécuté, aucune
+dépendance lourde (smolagents, litellm, langfuse, groq) n'est importée et aucun
+client n'est créé tant qu'un point d'entrée n'est pas utilisé.
+"""
+
+from chefbot._scripts import load_script
+
+# Nom public -> (script, attribut)
+_ENTRY_POINTS = {
+    "ask_chef": ("chefbot", "ask_chef"),
+    "plan_weekly_menu": ("planification", "plan_weekly_menu"),
+    "create_menu_eval_dataset": ("dataset", "create_sentiment_dataset"),
+    "run_full_experiment": ("evaluation", "run_full_experiment"),
+    "rule_evaluator": ("evaluation", "rule_evaluator"),
+    "run_manual_loop": ("outils", "run_manual_loop"),
+    "run_smolagents_loop": ("outils", "run_smolagents_loop"),
+    "run_agent_interaction": ("restau", "run_agent_interaction"),
+    "run_scenario": ("multi_agent", "run_scenario"),
+    "build_restaurant_manager": ("multi_agent", "build_restaurant_manager"),
+    "create_chef_dataset": ("boss", "create_chef_dataset"),
+    "build_chef_agent": ("boss", "build_chef_agent"),
+    "judge_chef_response": ("boss", "judge_chef_response"),
+    "run_experiment": ("boss", "run_experiment"),
+}
+
+__all__ = ["load_script", *_ENTRY_POINTS]
+
+
+def __getattr__(name):
+    if name in _ENTRY_POINTS:
+        script, attribute = _ENTRY_POINTS[name]
+        value = getattr(load_script(script), attribute)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module 'chefbot' has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_ENTRY_POINTS))
@@ -0,0 +1,3 @@
+from chefbot.cli import main
+
+main()
@@ -0,0 +1,54 @@
+"""
+Chargement paresseux des scripts numérotés (01_chefbot.py, 02_planification.py, ...).
+
+Les noms de fichiers commencent par un chiffre et ne sont donc pas importables
+avec `import` : on passe par importlib. Chaque script n'est exécuté qu'une fois,
+au premier accès, ce qui repousse les imports lourds (smolagents, litellm,
+langfuse, groq) et la création des clients jusqu'au premier usage réel.
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = {
+    "chefbot": "01_chefbot.py",
+    "planification": "02_planification.py",
+    "dataset": "03_creating_dataset_chefbot.py",
+    "evaluation": "03_evaluation.py",
+    "outils": "04_outils.py",
+    "restau": "05_restau.py",
+    "multi_agent": "06_multi-agent.py",
+    "boss": "07_boss.py",
+}
+
+_modules = {}
+_lock = threading.RLock()
+
+
+def load_script(filename: str):
+    """Importe un script numéroté (ex: '02_planification.py' ou 'planification') comme module, une seule fois."""
+    filename = SCRIPTS.get(filename, filename)
+    with _lock:
+        if filename not in _modules:
+            # Les scripts importent les modules utilitaires placés à la racine du dépôt
+            if ROOT not in sys.path:
+                sys.path.insert(0, ROOT)
+            name = "chefbot.scripts." + os.path.splitext(filename)[0].replace("-", "_")
+            spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, filename))
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[name] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                del sys.modules[name]
+                raise
+            _modules[filename] = module
+        return _modules[filename]
+
+
+def is_loaded(filename: str) -> bool:
+    return SCRIPTS.get(filename, filename) in _modules
@@ -0,0 +1,191 @@
+"""
+CLI unique de ChefBot
+=====================
+    python -m chefbot ask "What can I cook with leftover rice?"
+    python -m chefbot plan "Menu végétarien pour 2 personnes, budget serré" --deadline 10
+    python -m chefbot tools "Seasonal products for March?" --smolagents
+    python -m chefbot restau "On est 3, budget 60€" "Ajoutez un dessert"
+    python -m chefbot multi-agent
+    python -m chefbot evaluate
+    python -m chefbot create-dataset chef
+    python -m chefbot boss --model groq/llama-3.1-8b-instant --suffix Model-8B
+    python -m chefbot results report --experiment boss
+    python -m chefbot batch data/batch_example.jsonl -o results.jsonl --concurrency 4
+
+Seul argparse est importé au démarrage : le script visé (et ses dépendances
+lourdes) n'est chargé qu'une fois la sous-commande choisie, `--help` reste donc instantané.
+"""
+
+import argparse
+import json
+import sys
+
+
+def _flush_traces():
+    # Uniquement si un script a effectivement été chargé
+    if "tracing" in sys.modules:
+        import tracing
+        tracing.flush()
+
+
+def _print(result):
+    if isinstance(result, (dict, list)):
+        print(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+    else:
+        print(result)
+
+
+def cmd_ask(args):
+    import chefbot
+    _print(chefbot.ask_chef(args.question, deadline_s=args.deadline))
+
+
+def cmd_plan(args):
+    import chefbot
+    result = chefbot.plan_weekly_menu(args.constraints, deadline_s=args.deadline)
+    if args.json:
+        _print(result)
+    elif result["status"] in ("success", "partial"):
+        print("PLAN GÉNÉRÉ :")
+        print(result.get("plan"))
+        print("MENU FINAL :")
+        print(result["final_answer"])
+    else:
+        print(f"Erreur Fatale : {result.get('error')}")
+        return 1
+
+
+def cmd_tools(args):
+    import chefbot
+    run = chefbot.run_smolagents_loop if args.smolagents else chefbot.run_manual_loop
+    _print(run(args.question, deadline_s=args.deadline))
+
+
+def cmd_restau(args):
+    import chefbot
+    # Premier tour = nouvelle session, les suivants gardent l'historique (comme le scénario 5.3)
+    for turn, message in enumerate(args.messages):
+        chefbot.run_agent_interaction(message, reset_memory=(turn == 0), deadline_s=args.deadline)
+
+
+def cmd_multi_agent(args):
+    import chefbot
+    _print(chefbot.run_scenario(deadline_s=args.deadline))
+
+
+def cmd_evaluate(args):
+    import chefbot
+    chefbot.run_full_experiment(force=args.force)
+
+
+def cmd_create_dataset(args):
+    import chefbot
+    if args.dataset == "menu-eval":
+        chefbot.create_menu_eval_dataset()
+    else:
+        chefbot.create_chef_dataset()
+
+
+def cmd_boss(args):
+    import chefbot
+    chefbot.run_experiment(model_id=args.model, experiment_suffix=args.suffix, force=args.force)
+
+
+def cmd_results(args):
+    from chefbot._scripts import ROOT
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import results_store
+    return results_store.main(args.results_args)
+
+
+def cmd_batch(args):
+    import batch_runner
+    return batch_runner.run_from_args(args)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="chefbot", description="Points d'entrée ChefBot")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ask", help="Question simple au chef (01_chefbot)")
+    p.add_argument("question")
+    _add_deadline_argument(p)
+    p.set_defaults(func=cmd_ask)
+
+    p = sub.add_parser("plan", help="Planification de menu en plusieurs étapes (02_planification)")
+    p.add_argument("constraints")
+    p.add_argument("--json", action="store_true", help="Affiche le résultat complet en JSON")
+    _add_deadline_argument(p)
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser("tools", help="Boucle d'outils (04_outils)")
+    p.add_argument("question")
+    p.add_argument("--smolagents", action="store_true", help="CodeAgent smolagents au lieu de la boucle manuelle")
+    _add_deadline_argument(p)
+    p.set_defaults(func=cmd_tools)
+
+    p = sub.add_parser("restau", help="Dialogue avec le maître d'hôtel (05_restau)")
+    p.add_argument("messages", nargs="+", help="Un message par tour de dialogue")
+    _add_deadline_argument(p)
+    p.set_defaults(func=cmd_restau)
+
+    p = sub.add_parser("multi-agent", help="Scénario multi-agents du restaurant (06_multi-agent)")
+    _add_deadline_argument(p)
+    p.set_defaults(func=cmd_multi_agent)
+
+    p = sub.add_parser("evaluate", help="Expérience Langfuse règles + juge LLM (03_evaluation)")
+    _add_force_argument(p)
+    p.set_defaults(func=cmd_evaluate)
+
+    p = sub.add_parser("create-dataset", help="Création d'un dataset Langfuse")
+    p.add_argument("dataset", choices=["menu-eval", "chef"], help="menu-eval (03) ou chef (07_boss)")
+    p.set_defaults(func=cmd_create_dataset)
+
+    p = sub.add_parser("boss", help="Expérience agent + juge sur le dataset du chef (07_boss)")
+    p.add_argument("--model", default="groq/llama-3.3-70b-versatile")
+    p.add_argument("--suffix", default="Model-70B", help="Suffixe du nom de l'expérience")
+    _add_force_argument(p)
+    p.set_defaults(func=cmd_boss)
+
+    p = sub.add_parser("results", help="Résultats d'expériences gardés en local (results_store)")
+    p.add_argument("results_args", nargs=argparse.REMAINDER, help="list | report --experiment boss [--baseline MODELE]")
+    p.set_defaults(func=cmd_results)
+
+    p = sub.add_parser("batch", help="Fichier JSONL de tâches ask / plan / agent, avec reprise (batch_runner)")
+    _add_batch_arguments(p)
+    p.set_defaults(func=cmd_batch)
+
+    return parser
+
+
+def _add_deadline_argument(parser: argparse.ArgumentParser):
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDES",
+                        help="Budget de latence : au-delà, réponse dégradée ou partielle")
+
+
+def _add_force_argument(parser: argparse.ArgumentParser):
+    parser.add_argument("--force", action="store_true",
+                        help="Rejoue aussi les items déjà notés en local pour cette configuration")
+
+
+def _add_batch_arguments(parser: argparse.ArgumentParser):
+    # batch_runner n'importe que la bibliothèque standard : sans coût au démarrage
+    from chefbot._scripts import ROOT
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import batch_runner
+    batch_runner.add_arguments(parser)
+
+
+def main(argv: list = None):
+    args = build_parser().parse_args(argv)
+    try:
+        status = args.func(args)
+    finally:
+        _flush_traces()
+    sys.exit(status or 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Chiffrage des recettes et des menus (coût matière)
+==================================================
+Prérequis:
+    pip install numpy
+
+Une recette est une liste de lignes (ingrédient, quantité, unité) : une
+"nomenclature". Les unités sont normalisées en kilogrammes (masse, volume via
+la masse volumique de l'ingrédient, pièces via leur poids moyen), puis le coût
+de toutes les lignes est calculé d'un bloc avec NumPy sur la table des prix de
+la base d'ingrédients (ingredient_kb).
+
+Les plats connus de la base ont leur recette pour une portion : leur coût par
+portion est précalculé, et chiffrer un menu de 12 couverts est une seule
+opération vectorisée au lieu d'une douzaine d'appels d'outils.
+
+    engine = get_engine()
+    engine.cost_dishes("Salade César, Pavé de Saumon, Sorbet Citron", persons=12)
+    engine.cost_recipe("200 g saumon, 2 c. à soupe huile d'olive, 1 citron", servings=2)
+
+Le module fournit aussi `evaluate_expression`, un évaluateur arithmétique sûr
+(arbre syntaxique, sans `eval`) pour l'outil `calculate` de la Partie 5.
+"""
+
+import ast
+import math
+import operator
+import re
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from ingredient_kb import IngredientKB, fold, get_kb, split_names
+
+# =============================================================================
+# UNITÉS
+# =============================================================================
+
+MASS, VOLUME, PIECE = 0, 1, 2
+
+# Unité (sans accents, minuscules) -> (type, facteur vers kg ou vers litre)
+UNITS = {
+    "kg": (MASS, 1.0), "kilo": (MASS, 1.0), "kilos": (MASS, 1.0), "kilogramme": (MASS, 1.0), "kilogrammes": (MASS, 1.0),
+    "g": (MASS, 1e-3), "gr": (MASS, 1e-3), "gramme": (MASS, 1e-3), "grammes": (MASS, 1e-3), "gram": (MASS, 1e-3), "grams": (MASS, 1e-3),
+    "mg": (MASS, 1e-6),
+    "lb": (MASS, 0.45359), "lbs": (MASS, 0.45359), "oz": (MASS, 0.02835),
+    "l": (VOLUME, 1.0), "litre": (VOLUME, 1.0), "litres": (VOLUME, 1.0), "liter": (VOLUME, 1.0), "liters": (VOLUME, 1.0),
+    "dl": (VOLUME, 0.1), "cl": (VOLUME, 0.01), "ml": (VOLUME, 0.001),
+    "c a s": (VOLUME, 0.015), "c a soupe": (VOLUME, 0.015), "cas": (VOLUME, 0.015), "cuillere a soupe": (VOLUME, 0.015), "cuilleres a soupe": (VOLUME, 0.015),
+    "tbsp": (VOLUME, 0.015), "tablespoon": (VOLUME, 0.015), "tablespoons": (VOLUME, 0.015),
+    "c a c": (VOLUME, 0.005), "c a cafe": (VOLUME, 0.005), "cac": (VOLUME, 0.005), "cuillere a cafe": (VOLUME, 0.005), "cuilleres a cafe": (VOLUME, 0.005),
+    "tsp": (VOLUME, 0.005), "teaspoon": (VOLUME, 0.005), "teaspoons": (VOLUME, 0.005),
+    "tasse": (VOLUME, 0.25), "tasses": (VOLUME, 0.25), "cup": (VOLUME, 0.25), "cups": (VOLUME, 0.25),
+    "piece": (PIECE, 1.0), "pieces": (PIECE, 1.0), "pc": (PIECE, 1.0), "pcs": (PIECE, 1.0), "x": (PIECE, 1.0),
+    "unite": (PIECE, 1.0), "unites": (PIECE, 1.0), "unit": (PIECE, 1.0), "units": (PIECE, 1.0),
+    "gousse": (PIECE, 1.0), "gousses": (PIECE, 1.0), "clove": (PIECE, 1.0), "cloves": (PIECE, 1.0),
+}
+_MAX_UNIT_WORDS = max(len(unit.split()) for unit in UNITS)
+# Liaison entre l'unité et l'ingrédient ("200 g de saumon", "2 cups of rice")
+_LINKS = ("de", "d", "of")
+# Masse volumique quand la base n'en donne pas (eau)
+DEFAULT_DENSITY = 1.0
+
+_QUANTITY = re.compile(r"^\s*(\d+(?:[.,]\d+)?(?:\s*/\s*\d+)?)\s*(.*)$")
+_TRAILING_QUANTITY = re.compile(r"^(.*?)[\s:]+(\d+(?:[.,]\d+)?(?:\s*/\s*\d+)?)\s*([^\d]*)$")
+
+
+def _number(text: str) -> float:
+    text = text.replace(",", ".").replace(" ", "")
+    if "/" in text:
+        num, den = text.split("/")
+        return float(num) / float(den)
+    return float(text)
+
+
+def _split_unit(text: str):
+    """'g de saumon' -> ('g', 'saumon') ; 'oeufs' -> ('', 'oeufs')."""
+    words = fold(text).split()
+    for size in range(min(_MAX_UNIT_WORDS, len(words)), 0, -1):
+        unit = " ".join(words[:size])
+        if unit in UNITS and len(words) > size:
+            rest = words[size:]
+            if rest[0] in _LINKS and len(rest) > 1:
+                rest = rest[1:]
+            return unit, " ".join(rest)
+    if words and words[0] in _LINKS:
+        words = words[1:]
+    return "", " ".join(words)
+
+
+def parse_line(line: str) -> tuple:
+    """'200 g de saumon', '3 oeufs', 'saumon: 200g' -> (ingrédient, quantité, unité). ValueError si illisible."""
+    match = _QUANTITY.match(line)
+    if match:
+        unit, name = _split_unit(match.group(2))
+        if name:
+            return name, _number(match.group(1)), unit
+    match = _TRAILING_QUANTITY.match(line.strip())
+    if match and match.group(1).strip():
+        unit = fold(match.group(3))
+        if not unit or unit in UNITS:
+            return match.group(1).strip(), _number(match.group(2)), unit
+    raise ValueError(f"Ligne de recette illisible : {line!r} (attendu 'quantité unité ingrédient')")
+
+
+def parse_recipe(recipe) -> list:
+    """Texte ('200 g saumon, 1 citron') ou liste de lignes / de tuples -> liste de (ingrédient, quantité, unité)."""
+    if isinstance(recipe, str):
+        recipe = split_names(recipe)
+    return [tuple(line) if not isinstance(line, str) else parse_line(line) for line in recipe]
+
+
+# =============================================================================
+# MOTEUR DE CHIFFRAGE
+# =============================================================================
+
+@dataclass(frozen=True)
+class DishCost:
+    dish: str
+    servings: float
+    per_portion: float
+    total: float
+    missing: tuple = ()  # Lignes non chiffrées (ingrédient inconnu ou unité non convertible)
+
+
+@dataclass(frozen=True)
+class MenuCost:
+    dishes: tuple
+    persons: float
+    total: float
+    per_person: float
+    missing: tuple = ()
+
+    def summary(self) -> str:
+        lines = [f"- {d.dish}: {d.per_portion:.2f}€/portion x {d.servings:g} = {d.total:.2f}€" for d in self.dishes]
+        lines.append(f"Total: {self.total:.2f}€ pour {self.persons:g} personne(s), soit {self.per_person:.2f}€/personne")
+        if self.missing:
+            lines.append(f"Non chiffré: {', '.join(self.missing)}")
+        return "\n".join(lines)
+
+
+class CostingEngine:
+    """Table des prix (NumPy) construite une fois à partir de la base d'ingrédients."""
+
+    def __init__(self, kb: IngredientKB):
+        self.kb = kb
+        self.prices = np.frombuffer(kb.price_per_kg, dtype=np.float64)
+        self.piece_kg = np.frombuffer(kb.piece_kg, dtype=np.float64)
+        density = np.frombuffer(kb.density, dtype=np.float64)
+        self.density = np.where(density > 0, density, DEFAULT_DENSITY)
+
+        # Coût d'une portion de chaque plat connu : toutes les lignes de toutes les recettes d'un coup
+        portions = [[(kb.names[i], quantity, unit) for i, quantity, unit in portion] for portion in kb.dish_portions]
+        self.dish_portion_cost, incomplete = self.cost_recipes(portions)
+        if incomplete.any():
+            raise ValueError("Recette de plat non convertible en kg (poids par pièce manquant ?)")
+
+    def cost_recipes(self, recipes: list):
+        """Coût d'une portion de chaque recette (listes de (ingrédient, quantité, unité)), en un seul passage.
+
+        Retourne (coûts, incomplètes) : deux tableaux alignés sur `recipes` ; une recette est
+        incomplète si une de ses lignes n'a pas pu être chiffrée (elle est alors comptée à 0)."""
+        recipe_ids, ingredient_ids, quantities, units = [], [], [], []
+        for recipe_id, recipe in enumerate(recipes):
+            for ingredient, quantity, unit in recipe:
+                recipe_ids.append(recipe_id)
+                ingredient_id = self.kb.lookup(ingredient)
+                ingredient_ids.append(-1 if ingredient_id is None else ingredient_id)
+                quantities.append(quantity)
+                units.append(unit)
+        recipe_ids = np.array(recipe_ids, dtype=np.intp)
+        ingredient_ids = np.array(ingredient_ids, dtype=np.intp)
+        kinds, factors = self._units(units)
+        costs = self._line_costs(np.maximum(ingredient_ids, 0), np.array(quantities, dtype=np.float64), kinds, factors)
+        costs[ingredient_ids < 0] = np.nan
+
+        failed = np.isnan(costs)
+        totals = np.bincount(recipe_ids, weights=np.where(failed, 0.0, costs), minlength=len(recipes))
+        incomplete = np.bincount(recipe_ids, weights=failed, minlength=len(recipes)) > 0
+        return totals, incomplete
+
+    @staticmethod
+    def _units(units: list):
+        kinds, factors = [], []
+        for unit in units:
+            # Sans unité : des pièces ; unité inconnue : ligne non convertible (NaN)
+            kind, factor = UNITS.get(fold(unit), (-1, np.nan)) if unit else (PIECE, 1.0)
+            kinds.append(kind)
+            factors.append(factor)
+        return np.array(kinds, dtype=np.int8), np.array(factors, dtype=np.float64)
+
+    def _line_costs(self, ingredient_ids, quantities, kinds, factors):
+        """Coût de chaque ligne en € (NaN si la quantité ne se convertit pas en kg)."""
+        piece_kg = np.where(self.piece_kg[ingredient_ids] > 0, self.piece_kg[ingredient_ids], np.nan)
+        kg_per_unit = np.select(
+            [kinds == MASS, kinds == VOLUME, kinds == PIECE],
+            [factors, factors * self.density[ingredient_ids], factors * piece_kg],
+            default=np.nan,
+        )
+        return quantities * kg_per_unit * self.prices[ingredient_ids]
+
+    def cost_dishes(self, dishes, persons: Optional[float] = None, servings: Optional[list] = None) -> MenuCost:
+        """Chiffre des plats connus ; chaque plat est servi à `persons` personnes sauf `servings` explicites.
+
+        Avec `servings` et sans `persons`, le coût par personne est calculé sur max(servings) convives."""
+        names = split_names(dishes)
+        if servings is not None and len(servings) != len(names):
+            raise ValueError(f"{len(servings)} nombres de portions pour {len(names)} plats")
+        if persons is None:
+            persons = max(servings) if servings else 1
+        ids = [self.kb.dish_id(name) for name in names]
+        known = [i for i in ids if i is not None]
+        missing = tuple(name for name, i in zip(names, ids) if i is None)
+
+        portions = np.full(len(known), float(persons)) if servings is None else np.array(
+            [s for s, i in zip(servings, ids) if i is not None], dtype=np.float64)
+        per_portion = self.dish_portion_cost[known] if known else np.zeros(0)
+        totals = per_portion * portions
+        return self._menu(
+            [DishCost(self.kb.dish_names[i], float(s), float(p), float(t))
+             for i, s, p, t in zip(known, portions, per_portion, totals)],
+            persons, missing,
+        )
+
+    def cost_recipe(self, recipe, servings: float = 1, name: str = "Recette") -> MenuCost:
+        """Chiffre une nomenclature libre pour `servings` portions (quantités données pour une portion)."""
+        lines = parse_recipe(recipe)
+        if not lines:
+            raise ValueError("aucune ligne d'ingrédient dans la recette")
+        ids = [self.kb.lookup(ingredient) for ingredient, _, _ in lines]
+        known = [n for n, i in enumerate(ids) if i is not None]
+        missing = [lines[n][0] for n, i in enumerate(ids) if i is None]
+
+        costs = np.zeros(0)
+        if known:
+            kinds, factors = self._units([lines[n][2] for n in known])
+            costs = self._line_costs(
+                np.array([ids[n] for n in known], dtype=np.intp),
+                np.array([lines[n][1] for n in known], dtype=np.float64),
+                kinds, factors,
+            )
+            missing += [f"{lines[n][0]} ({lines[n][2] or 'pièce'})" for n, c in zip(known, costs) if np.isnan(c)]
+        per_portion = float(np.nansum(costs))
+        dish = DishCost(name, float(servings), per_portion, per_portion * servings, tuple(missing))
+        return self._menu([dish], servings, tuple(missing))
+
+    @staticmethod
+    def _menu(dishes: list, persons: float, missing: tuple) -> MenuCost:
+        total = float(sum(d.total for d in dishes))
+        return MenuCost(
+            dishes=tuple(dishes),
+            persons=float(persons),
+            total=total,
+            per_person=total / persons if persons else 0.0,
+            missing=missing,
+        )
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(kb: Optional[IngredientKB] = None) -> CostingEngine:
+    """Moteur partagé pour une base d'ingrédients (par défaut la base partagée)."""
+    kb = kb or get_kb()
+    engine = _engines.get(id(kb))
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(id(kb))
+            if engine is None:
+                engine = _engines[id(kb)] = CostingEngine(kb)
+    return engine
+
+
+# =============================================================================
+# CALCULATRICE SÛRE
+# =============================================================================
+
+_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+    ast.USub: operator.neg, ast.UAdd: operator.pos,
+}
+MAX_EXPONENT = 100
+MAX_RESULT_BITS = 4096  # taille maximale d'un résultat entier (puissances imbriquées, produits en chaîne)
+
+
+def evaluate_expression(expression: str) -> float:
+    """Évalue une expression arithmétique (+ - * / // % ** et parenthèses) sans `eval`.
+
+    Lève ValueError pour tout le reste (noms, appels, attributs...) et pour les
+    résultats démesurés (puissances imbriquées : le calcul ne doit pas bloquer le processus)."""
+    def bounded(value):
+        if isinstance(value, complex):
+            # (-8) ** 0.5 : racine d'un nombre négatif
+            raise ValueError("résultat non réel")
+        if isinstance(value, int) and value.bit_length() > MAX_RESULT_BITS:
+            raise ValueError("résultat trop grand")
+        return value
+
+    def visit(node):
+        if isinstance(node, ast.Expression):
+            return visit(node.body)
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return bounded(node.value)
+        if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+            left, right = visit(node.left), visit(node.right)
+            if isinstance(node.op, ast.Pow):
+                # Taille du résultat estimée avant le calcul : |left| ** right tient sur right * log2|left| bits
+                if abs(right) > MAX_EXPONENT or (abs(left) > 1 and abs(right) * math.log2(abs(left)) > MAX_RESULT_BITS):
+                    raise ValueError("exposant trop grand")
+            return bounded(_OPERATORS[type(node.op)](left, right))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _OPERATORS:
+            return bounded(_OPERATORS[type(node.op)](visit(node.operand)))
+        raise ValueError(f"élément non autorisé : {type(node).__name__}")
+
+    try:
+        tree = ast.parse(expression.replace("€", "").replace(",", "."), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"expression invalide ({e.msg})") from None
+    try:
+        return visit(tree)
+    except OverflowError:
+        raise ValueError("résultat trop grand") from None
@@ -0,0 +1,157 @@
+"""
+Budget de latence par requête (deadline) et dégradation progressive
+==================================================================
+    from deadline import scope
+
+    with scope(8.0) as budget:          # 8 s pour toute la requête
+        ...
+        if not budget.allows(budget.typical_stage_s()):
+            ...                          # plus le temps pour une étape de plus : on dégrade
+
+La deadline vit dans un ContextVar : elle suit la requête à travers les
+fonctions appelées sans changer leurs signatures. Un `scope` imbriqué ne peut
+que raccourcir le budget. Sans deadline, `scope(None)` renvoie un budget
+illimité : toutes les vérifications passent.
+
+Consommateurs :
+- la passerelle LLM borne le timeout HTTP de chaque appel au temps restant ;
+- plan_weekly_menu / run_manual_loop / ask_chef sautent des étapes, passent
+  au petit modèle ou renvoient la meilleure réponse partielle ;
+- `attach(agent)` arrête un CodeAgent à temps pour qu'il produise sa réponse finale.
+"""
+
+import contextvars
+import math
+import statistics
+import time
+from contextlib import contextmanager
+
+# Part du budget en dessous de laquelle on bascule sur le petit modèle
+DOWNGRADE_FRACTION = 0.5
+# Timeout minimal laissé à un appel LLM, même budget épuisé
+MIN_CALL_TIMEOUT_S = 1.0
+
+
+class DeadlineExceeded(TimeoutError):
+    """Le budget de temps de la requête est épuisé."""
+
+
+class Deadline:
+    def __init__(self, budget_s: float = None):
+        self.budget_s = budget_s
+        self.start = time.monotonic()
+        self.expires_at = math.inf if budget_s is None else self.start + budget_s
+        self._stage_durations = []
+
+    @property
+    def unlimited(self) -> bool:
+        return self.budget_s is None
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def fraction_left(self) -> float:
+        return 1.0 if self.unlimited else self.remaining() / self.budget_s if self.budget_s else 0.0
+
+    def allows(self, estimated_s: float) -> bool:
+        """Reste-t-il assez de temps pour une étape d'environ `estimated_s` secondes ?"""
+        return self.remaining() >= estimated_s
+
+    def check(self, stage: str = ""):
+        if self.expired():
+            raise DeadlineExceeded(f"Budget de {self.budget_s:.1f}s épuisé{f' ({stage})' if stage else ''}")
+
+    @contextmanager
+    def stage(self):
+        """Chronomètre une étape pour estimer la durée des suivantes."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._stage_durations.append(time.monotonic() - start)
+
+    def typical_stage_s(self, default: float = 0.0) -> float:
+        return statistics.median(self._stage_durations) if self._stage_durations else default
+
+    def pick_model(self, model: str, fallback: str) -> str:
+        """Petit modèle quand il reste moins de DOWNGRADE_FRACTION du budget."""
+        return model if self.fraction_left() >= DOWNGRADE_FRACTION else fallback
+
+    def call_timeout(self, default: float = None):
+        """Timeout à donner à un appel HTTP : le temps restant (au moins MIN_CALL_TIMEOUT_S)."""
+        if self.unlimited:
+            return default
+        timeout = max(MIN_CALL_TIMEOUT_S, self.remaining())
+        return timeout if default is None else min(default, timeout)
+
+
+_current = contextvars.ContextVar("chefbot_deadline", default=None)
+
+
+def current() -> Deadline:
+    """Deadline de la requête en cours (None hors de tout `scope`)."""
+    return _current.get()
+
+
+@contextmanager
+def scope(budget_s: float = None):
+    parent = _current.get()
+    if budget_s is None:
+        # Pas de nouveau budget : on hérite (ou budget illimité), sans toucher au contexte
+        yield parent or Deadline()
+        return
+    deadline = Deadline(budget_s)
+    if parent is not None and parent.expires_at < deadline.expires_at:
+        deadline = parent
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+# =============================================================================
+# CODEAGENTS (smolagents)
+# =============================================================================
+
+def attach(agent, reserve_s: float = None):
+    """Termine un CodeAgent avant la deadline : quand le temps restant ne couvre plus une étape
+    (+ la réponse finale), la boucle s'arrête et smolagents rédige la réponse finale avec ce qu'il a.
+
+    La boucle de smolagents compare `step_number` à un max_steps figé au début du run :
+    on avance donc `step_number` jusqu'à ce max_steps pour sortir proprement.
+    """
+    from smolagents import ActionStep
+
+    run = agent.run
+
+    def run_with_deadline(task, *args, **kwargs):
+        agent._deadline_max_steps = kwargs.get("max_steps") or agent.max_steps
+        planning_interval = agent.planning_interval
+        try:
+            return run(task, *args, **kwargs)
+        finally:
+            agent.planning_interval = planning_interval
+
+    def on_action_step(step, agent=agent):
+        deadline = current()
+        if deadline is None or deadline.unlimited:
+            return
+        durations = [
+            s.timing.duration for s in [*agent.memory.steps, step]
+            if isinstance(s, ActionStep) and s.timing and s.timing.duration is not None
+        ]
+        step_s = statistics.median(durations[-5:]) if durations else 0.0
+        # Réserve : une étape de plus pour la réponse finale
+        needed = step_s + (step_s if reserve_s is None else reserve_s)
+        if not deadline.allows(needed) and agent.step_number < agent._deadline_max_steps:
+            print(f"[DEADLINE] {deadline.remaining():.1f}s restantes : arrêt après l'étape {step.step_number}")
+            agent.step_number = agent._deadline_max_steps
+            agent.planning_interval = None
+
+    agent.run = run_with_deadline
+    agent.step_callbacks.register(ActionStep, on_action_step)
+    return agent
@@ -0,0 +1,74 @@
+"""
+Délégation parallèle (fan-out) pour le manager multi-agent (Partie 6)
+====================================================================
+Un CodeAgent manager appelle ses agents gérés un par un : le chemin critique
+est la somme de leurs latences. L'outil `delegate_parallel` permet au manager
+d'envoyer plusieurs sous-tâches indépendantes en une seule étape ; les agents
+tournent en parallèle (threads) et toutes les réponses reviennent ensemble.
+Le chemin critique devient le maximum des latences.
+"""
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from smolagents import Tool
+
+
+class FanOutTool(Tool):
+    def __init__(self, agents: list, max_workers: int = None):
+        self.name = "delegate_parallel"
+        self.agents = {agent.name: agent for agent in agents}
+        self.description = (
+            "Envoie des sous-tâches INDÉPENDANTES à plusieurs agents en même temps et renvoie toutes leurs réponses. "
+            "Argument : un dictionnaire {nom_agent: tâche}. "
+            f"Agents disponibles : {', '.join(self.agents)}. "
+            "Renvoie un dictionnaire {nom_agent: réponse}."
+        )
+        self.inputs = {
+            "tasks": {
+                "type": "object",
+                "description": "Dictionnaire {nom_agent: tâche en une phrase}, un agent au plus une fois.",
+            }
+        }
+        self.output_type = "object"
+        self.max_workers = max_workers or len(self.agents)
+        self.last_timings = {}
+        super().__init__()
+
+    def _run_one(self, name: str, task: str):
+        start = time.perf_counter()
+        try:
+            answer = self.agents[name](task=task)
+        except Exception as e:
+            # Un agent en échec ne doit pas faire perdre les réponses des autres
+            answer = f"Erreur de l'agent {name}: {e}"
+        return answer, time.perf_counter() - start
+
+    def forward(self, tasks: dict) -> dict:
+        unknown = [name for name in tasks if name not in self.agents]
+        if unknown:
+            return {name: f"Erreur: agent inconnu. Agents disponibles : {', '.join(self.agents)}" for name in unknown}
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tasks)) or 1) as pool:
+            # Chaque agent garde le contexte de l'appelant (deadline, trace en cours)
+            futures = {
+                name: pool.submit(contextvars.copy_context().run, self._run_one, name, str(task))
+                for name, task in tasks.items()
+            }
+            outcomes = {name: future.result() for name, future in futures.items()}
+        wall = time.perf_counter() - start
+
+        answers = {name: answer for name, (answer, _) in outcomes.items()}
+        latencies = {name: round(elapsed, 3) for name, (_, elapsed) in outcomes.items()}
+        self.last_timings = {
+            "latencies_s": latencies,
+            "sequential_s": round(sum(latencies.values()), 3),
+            "parallel_s": round(wall, 3),
+        }
+        print(
+            f"[FAN-OUT] {len(tasks)} agents en parallèle : {self.last_timings['parallel_s']}s "
+            f"(séquentiel : {self.last_timings['sequential_s']}s) {latencies}"
+        )
+        return answers
@@ -0,0 +1,496 @@
+"""
+Voie rapide : consultations directes servies sans LLM
+=====================================================
+"Seasonal products for March?" ou "reservations for 15/03/2025?" traversent
+toute la boucle manuelle (04_outils.py) : un aller-retour 70B pour choisir
+l'outil, un second pour reformuler son résultat. Ici, un routeur local :
+
+- découpe la question en propositions ("...March? Also, check...") ;
+- classe chaque proposition (Bayes naïf multinomial entraîné sur quelques
+  dizaines d'exemples FR/EN : saison, réservations, coût matière, autre) ;
+- extrait les arguments par règles (mois, région, dates, prix au kilo, poids) ;
+- appelle la fonction de TOOL_REGISTRY et met le résultat en forme.
+
+La voie rapide est active par défaut : une erreur de routage donne une réponse
+fausse que plus aucun LLM ne rattrape. Repli sur la boucle LLM dès qu'une
+proposition :
+- est incertaine (probabilité sous le seuil, classe "autre") ;
+- contient une demande ouverte ou une action (recette, menu, annuler, réserver,
+  déplacer...) ou un critère que l'outil ne sait pas appliquer (vegan, sauf,
+  plus de 10 couverts...) ;
+- garde des mots inattendus une fois retirés le vocabulaire de l'intention et
+  les arguments extraits ;
+- a un argument manquant ou ambigu (plusieurs prix ou poids) ;
+ou que l'outil renvoie une erreur. Aucune réponse mixte : tout par la voie
+rapide, ou tout par le LLM.
+
+Configuration :
+    CHEFBOT_FAST_PATH=0                  désactive la voie rapide
+    CHEFBOT_FAST_PATH_THRESHOLD=0.8      probabilité minimale de la classe retenue
+"""
+
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from ingredient_kb import MONTHS, fold, get_kb, month_name, parse_month
+from reservation_store import format_date, parse_date
+
+INTENTS = ("seasonal", "reservations", "food_cost", "other")
+
+# Exemples d'entraînement du classifieur (après normalisation : <month>, <num>, <date>, <eur>)
+TRAINING = [
+    ("seasonal", "What are the seasonal products for March?"),
+    ("seasonal", "What represent the seasonal products for March"),
+    ("seasonal", "Which vegetables are in season in June?"),
+    ("seasonal", "Seasonal ingredients in April in Provence"),
+    ("seasonal", "What fruits are in season in October?"),
+    ("seasonal", "List the seasonal produce for May and June"),
+    ("seasonal", "Produits de saison en mars ?"),
+    ("seasonal", "Quels légumes sont de saison en novembre ?"),
+    ("seasonal", "Quels sont les fruits de saison en juillet dans le sud ?"),
+    ("seasonal", "Products in season for December in the north"),
+    ("seasonal", "What's in season in February?"),
+    ("seasonal", "Liste des produits de saison pour avril"),
+    ("seasonal", "Seasonal products for May?"),
+    ("seasonal", "Seasonal produce in September"),
+    ("seasonal", "Produits de saison du mois de janvier"),
+    ("reservations", "Check the reservations for 15/03/2025"),
+    ("reservations", "Also, check the reservations for 15/03/2025"),
+    ("reservations", "How many covers are booked on 2025-03-14?"),
+    ("reservations", "Any bookings for tomorrow?"),
+    ("reservations", "Reservations for 15 March 2025"),
+    ("reservations", "How many tables are reserved for Saturday 15 March?"),
+    ("reservations", "Show the reservations from 10/03/2025 to 16/03/2025"),
+    ("reservations", "Reservations for the week of 10/03/2025"),
+    ("reservations", "Combien de couverts le 15/03/2025 ?"),
+    ("reservations", "Réservations pour demain"),
+    ("reservations", "Vérifie les réservations du 14 mars 2025"),
+    ("reservations", "Quelles réservations du 10/03/2025 au 16/03/2025 ?"),
+    ("reservations", "Is the restaurant full on 15/03/2025?"),
+    ("reservations", "Any reservations tomorrow?"),
+    ("reservations", "Bookings for 12/03/2025"),
+    ("reservations", "Combien de couverts réservés le 14/03/2025 ?"),
+    ("reservations", "Réservations d'aujourd'hui"),
+    ("food_cost", "Cost of 0.3 kg of salmon at 24€/kg"),
+    ("food_cost", "Calculate the food cost for 2.5 kg at 12 euros per kg"),
+    ("food_cost", "How much do 500 g of butter cost at 9€ per kg?"),
+    ("food_cost", "Price of 1.2 kg at 18.50 €/kg"),
+    ("food_cost", "Combien coûtent 2 kg de tomates à 3,20 € le kilo ?"),
+    ("food_cost", "Calcule le coût de 750 g de boeuf à 28 €/kg"),
+    ("food_cost", "Total cost: 4 kg of potatoes at 1.10 eur/kg"),
+    ("other", "Suggest a menu with seasonal products for March"),
+    ("other", "What should I cook tonight with the seasonal vegetables?"),
+    ("other", "Give me a recipe for a spring risotto"),
+    ("other", "Plan the staff for a busy Saturday service"),
+    ("other", "Which sauce pairs well with salmon?"),
+    ("other", "Propose un menu végétarien pour 4 personnes"),
+    ("other", "Idée de dessert avec des fraises ?"),
+    ("other", "How do I keep asparagus crisp when roasting?"),
+    ("other", "Write a welcome message for our guests"),
+    ("other", "Cost a full recipe of beef bourguignon for 6 people"),
+    ("other", "Why are tomatoes better in summer?"),
+    ("other", "Conseille-moi un vin pour le dîner de samedi"),
+    ("other", "Hello chef, how are you?"),
+    ("other", "Cancel the reservations for 15/03/2025"),
+    ("other", "Book a table for 4 on 15/03/2025"),
+    ("other", "Move the reservation from 15/03/2025 to 16/03/2025"),
+    ("other", "Is it too late to reserve for 15/03/2025?"),
+    ("other", "Annule la réservation du 15/03/2025"),
+    ("other", "Réserver une table pour 2 demain soir"),
+    ("other", "Which seasonal products for March are vegan?"),
+    ("other", "Seasonal products for March except fish"),
+    ("other", "Reservations for 15/03/2025 with more than 10 covers"),
+    ("other", "2 kg at 3 €/kg plus 1 kg at 5 €/kg"),
+]
+
+# Demandes ouvertes, actions et critères : toujours pour le LLM, quelle que soit la classe prédite
+OPEN_ENDED = frozenset("""
+suggest suggestion recommend recipe recette menu cook cuisiner prepare preparer pair pairs accord idea idee
+propose proposer conseil conseille advice why pourquoi explain explique write ecris plan
+cancel book booking move delete remove add change modify update reserve reserver annuler annule annulez supprimer
+supprime deplacer deplace decaler ajouter ajoute modifier changer
+except sauf sans without only seulement uniquement more than less fewer plus moins least over under above below
+vegan vegane vegetarian vegetarien vegetarienne gluten lactose halal allergen allergy allergie allergene
+""".split())
+
+# Vocabulaire attendu de chaque intention, en plus des arguments extraits : tout autre mot -> repli LLM
+_COMMON_WORDS = frozenset("""
+what which whats s are is the a an for of in on at me show list give tell please check get any there do does we
+have i can you us all and
+quel quels quelle quelles est sont le la les l des de du d en pour un une y a il on nous avons donne moi montre
+liste verifie verifier voir et
+""".split())
+_INTENT_WORDS = {
+    "seasonal": frozenset("""
+        seasonal season seasons products product produce ingredients ingredient represent available month region
+        saison saisons produits produit ingredients mois region disponibles dans
+    """.split()),
+    "reservations": frozenset("""
+        reservations reservation reserved bookings booked covers cover tables full restaurant service services
+        many how day date week from to until between
+        reservees couverts combien complet jour semaine au jusqu entre
+        monday tuesday wednesday thursday friday saturday sunday
+        lundi mardi mercredi jeudi vendredi samedi dimanche
+    """.split()),
+    "food_cost": frozenset("""
+        cost costs price total calculate food how much
+        cout coute coutent prix calcule calculer combien matiere
+    """.split()),
+}
+_RANGE_CONNECTORS = frozenset({"to", "au", "until", "jusqu", "a"})
+_WEEK_WORDS = frozenset({"week", "semaine"})
+
+_MONTH_WORDS = {word: number for number, names in enumerate(MONTHS, start=1) for word in names}
+_RELATIVE_DATES = ("aujourd hui", "today", "tomorrow", "demain", "yesterday", "hier")
+_MONTH_RE = "|".join(sorted(_MONTH_WORDS, key=len, reverse=True))
+_DATE = re.compile(
+    r"\b\d{4} \d{1,2} \d{1,2}\b"                                                  # 2025-03-15
+    r"|\b\d{1,2} \d{1,2} \d{2,4}\b"                                               # 15/03/2025
+    rf"|\b\d{{1,2}}(?:er|st|nd|rd|th)? (?:{_MONTH_RE})(?: \d{{4}})?\b"            # 15 mars 2025
+    rf"|\b(?:{_MONTH_RE}) \d{{1,2}}(?:st|nd|rd|th)?(?: \d{{4}})?\b"               # March 15, 2025
+    rf"|\b(?:{'|'.join(_RELATIVE_DATES)})\b"
+)
+_NUMBER = r"(\d+(?:[.,]\d+)?)"
+_PRICE = re.compile(rf"{_NUMBER}\s*(?:€|eur(?:o|os)?)\s*(?:/|per|par|le|the|a)?\s*(?:kg|kilo(?:gram(?:me)?)?s?)\b")
+_WEIGHT = re.compile(rf"{_NUMBER}\s*(kg|kilos?|g|grammes?|grams?)\b(?!\s*(?:€|eur))")
+_CLAUSE_SPLIT = re.compile(r"[?!.;]+(?:\s+|$)|\n+|\b(?:also|then|aussi|ensuite|puis)\b\s*,?", re.IGNORECASE)
+
+
+def _number(text: str) -> float:
+    return float(text.replace(",", "."))
+
+
+def tokens(text: str) -> list:
+    """Mots du classifieur : mois, nombres, dates relatives et euros remplacés par une étiquette."""
+    folded = fold(text.replace("€", " eur "))
+    for relative in _RELATIVE_DATES:
+        folded = re.sub(rf"\b{relative}\b", "<date>", folded)
+    result = []
+    for word in folded.replace("<date>", " <date> ").split():
+        if word in _MONTH_WORDS:
+            word = "<month>"
+        elif word.isdigit():
+            word = "<num>"
+        elif word in ("eur", "euro", "euros"):
+            word = "<eur>"
+        result.append(word)
+    return result
+
+
+def split_clauses(question: str) -> list:
+    """'...for March? Also, check the reservations...' -> une proposition par demande."""
+    # Les points décimaux (0.3 kg) et les dates (15.03.2025) ne coupent pas
+    protected = re.sub(r"(?<=\d)[.](?=\d)", "\x00", question)
+    parts = (p.replace("\x00", ".").strip(" ,") for p in _CLAUSE_SPLIT.split(protected))
+    return [p for p in parts if re.search(r"\w", p)]
+
+
+class NaiveBayesClassifier:
+    """Bayes naïf multinomial, lissage de Laplace. Quelques dizaines d'exemples suffisent ici."""
+
+    def __init__(self, examples=TRAINING, alpha: float = 1.0):
+        self.alpha = alpha
+        self._counts = {intent: Counter() for intent in INTENTS}
+        docs = Counter()
+        for intent, text in examples:
+            self._counts[intent].update(tokens(text))
+            docs[intent] += 1
+        self.vocabulary = set().union(*self._counts.values())
+        self._priors = {intent: math.log(docs[intent] / len(examples)) for intent in INTENTS}
+        self._totals = {intent: sum(c.values()) for intent, c in self._counts.items()}
+
+    def predict_proba(self, text: str) -> dict:
+        words = [w for w in tokens(text) if w in self.vocabulary]
+        size = len(self.vocabulary)
+        scores = {
+            intent: self._priors[intent] + sum(
+                math.log((self._counts[intent][w] + self.alpha) / (self._totals[intent] + self.alpha * size))
+                for w in words
+            )
+            for intent in INTENTS
+        }
+        best = max(scores.values())
+        exp = {intent: math.exp(score - best) for intent, score in scores.items()}
+        total = sum(exp.values())
+        return {intent: value / total for intent, value in exp.items()}
+
+    def predict(self, text: str) -> tuple:
+        proba = self.predict_proba(text)
+        intent = max(proba, key=proba.get)
+        return intent, proba[intent]
+
+
+# =============================================================================
+# EXTRACTION DES ARGUMENTS
+# =============================================================================
+
+def extract_months(text: str) -> list:
+    words = fold(text).split()
+    months = []
+    for i, word in enumerate(words):
+        # "May I..." n'est pas un mois
+        if word == "may" and i + 1 < len(words) and words[i + 1] in ("i", "we", "you"):
+            continue
+        if word in _MONTH_WORDS and _MONTH_WORDS[word] not in months:
+            months.append(_MONTH_WORDS[word])
+    return months
+
+
+def extract_region(text: str) -> Optional[str]:
+    kb = get_kb()
+    words = fold(text).split()
+    for size in (3, 2, 1):
+        for i in range(len(words) - size + 1):
+            try:
+                return kb.region(" ".join(words[i:i + size]))
+            except ValueError:
+                continue
+    return None
+
+
+def _date_matches(folded: str) -> list:
+    """[(date, match)] des dates valides d'un texte déjà replié, sans doublon."""
+    matches = []
+    for match in _DATE.finditer(folded):
+        try:
+            day = parse_date(match.group(0))
+        except ValueError:
+            continue
+        if all(day != seen for seen, _ in matches):
+            matches.append((day, match))
+    return matches
+
+
+def extract_dates(text: str) -> list:
+    return [day for day, _ in _date_matches(fold(text))]
+
+
+def extract_date_range(text: str) -> Optional[tuple]:
+    """(début, fin ou None) si la proposition demande une période, sinon None.
+
+    Deux dates forment une période seulement si un connecteur les sépare ('du X au Y',
+    'from X to Y', 'between X and Y') ; une date seule avec 'week' / 'semaine' = sa semaine."""
+    folded = fold(text)
+    matches = _date_matches(folded)
+    if len(matches) == 1 and _WEEK_WORDS & set(folded.split()):
+        return matches[0][0], None
+    if len(matches) != 2:
+        return None
+    (first, m1), (second, m2) = matches
+    between = folded[m1.end():m2.start()].split()
+    before = folded[:m1.start()].split()[-1:]
+    if len(between) == 1 and (between[0] in _RANGE_CONNECTORS
+                              or (between[0] in ("and", "et") and before and before[0] in ("between", "entre"))):
+        return first, second
+    return None
+
+
+def extract_cost(text: str) -> Optional[tuple]:
+    """(prix au kilo, poids en kg) d'une proposition, None s'il en manque un ou s'il y en a plusieurs."""
+    lowered = text.lower()
+    prices = _PRICE.findall(lowered)
+    weights = _WEIGHT.findall(_PRICE.sub(" ", lowered))
+    if len(prices) != 1 or len(weights) != 1:
+        return None
+    amount, unit = weights[0]
+    kg = _number(amount)
+    if unit.startswith("g"):
+        kg /= 1000
+    return _number(prices[0]), kg
+
+
+def leftover_words(text: str, intent: str) -> list:
+    """Mots qui ne sont ni du vocabulaire de l'intention ni un argument extrait."""
+    kb = get_kb()
+    lowered = text.lower()
+    if intent == "food_cost":
+        lowered = _WEIGHT.sub(" ", _PRICE.sub(" ", lowered))
+    folded = fold(lowered)
+    if intent == "reservations":
+        folded = _DATE.sub(" ", folded)
+    words = folded.split()
+    if intent == "seasonal":
+        # Mois et région sont les arguments de l'outil
+        words = [w for w in words if w not in _MONTH_WORDS]
+        for size in (3, 2, 1):
+            i = 0
+            while i <= len(words) - size:
+                try:
+                    kb.region(" ".join(words[i:i + size]))
+                except ValueError:
+                    i += 1
+                    continue
+                del words[i:i + size]
+    allowed = _COMMON_WORDS | _INTENT_WORDS[intent]
+    # Coût matière : le nom de l'ingrédient est informatif (s'il est connu de la base)
+    return [w for w in words if w not in allowed and not (intent == "food_cost" and kb.lookup(w) is not None)]
+
+
+# =============================================================================
+# ROUTEUR
+# =============================================================================
+
+@dataclass(frozen=True)
+class Route:
+    """Appel d'outil déterministe pour une proposition de la question."""
+    clause: str
+    intent: str
+    confidence: float
+    tool: str
+    args: dict
+
+
+@dataclass(frozen=True)
+class FastAnswer:
+    text: str
+    routes: tuple
+
+
+class FastPathRouter:
+    """Sert les consultations directes via TOOL_REGISTRY ; None = la question part dans la boucle LLM."""
+
+    def __init__(self, registry: dict, threshold: float = 0.8, classifier: NaiveBayesClassifier = None):
+        self.registry = registry
+        self.threshold = threshold
+        self.classifier = classifier or NaiveBayesClassifier()
+        self._lock = threading.Lock()
+        self.stats = {"questions": 0, "served": 0, "fallbacks": 0}
+        self.intents = Counter()
+        self.reasons = Counter()
+
+    @classmethod
+    def from_env(cls, registry: dict) -> "FastPathRouter":
+        return cls(registry, threshold=float(os.environ.get("CHEFBOT_FAST_PATH_THRESHOLD", 0.8)))
+
+    def _route_clause(self, clause: str):
+        """Route de la proposition, ou la raison du repli (str)."""
+        if OPEN_ENDED & set(fold(clause).split()):
+            return "open_ended"
+        intent, confidence = self.classifier.predict(clause)
+        if intent == "other":
+            return "other"
+        if confidence < self.threshold:
+            return "low_confidence"
+        if leftover_words(clause, intent):
+            return "unexpected_words"
+
+        if intent == "seasonal":
+            months = extract_months(clause)
+            region = extract_region(clause) or "France"
+            if len(months) == 1:
+                return Route(clause, intent, confidence, "get_seasonal_products",
+                             {"month": str(months[0]), "region": region})
+            if months:
+                return Route(clause, intent, confidence, "get_seasonal_products_batch",
+                             {"months": [str(m) for m in months], "region": region})
+        elif intent == "reservations":
+            period = extract_date_range(clause)
+            if period:
+                return Route(clause, intent, confidence, "get_reservations_range",
+                             {"start_date": format_date(period[0]),
+                              "end_date": format_date(period[1]) if period[1] else ""})
+            dates = extract_dates(clause)
+            if len(dates) == 1:
+                return Route(clause, intent, confidence, "get_reservations", {"date": format_date(dates[0])})
+            if dates:
+                return Route(clause, intent, confidence, "get_reservations_batch",
+                             {"dates": [format_date(d) for d in dates]})
+        elif intent == "food_cost":
+            cost = extract_cost(clause)
+            if cost:
+                return Route(clause, intent, confidence, "calculate_food_cost",
+                             {"price_per_kg": cost[0], "weight_kg": cost[1]})
+        return "missing_args"
+
+    def route(self, question: str):
+        """Routes de toutes les propositions, ou la raison du repli (str). N'appelle aucun outil."""
+        clauses = split_clauses(question)
+        if not clauses:
+            return "empty"
+        routes = []
+        for clause in clauses:
+            route = self._route_clause(clause)
+            if isinstance(route, str):
+                return route
+            if route.tool not in self.registry:
+                return "unknown_tool"
+            routes.append(route)
+        return routes
+
+    def _render(self, route: Route) -> Optional[str]:
+        result = self.registry[route.tool](**route.args)
+        if route.tool == "get_seasonal_products":
+            return None if result.startswith("No data") else f"Seasonal products for {result}"
+        if route.tool == "get_seasonal_products_batch":
+            if "error" in result:
+                return None
+            lines = [f"Seasonal products ({result['region']}):"]
+            for month, names in result["months"].items():
+                if isinstance(names, str):
+                    return None
+                lines.append(f"- {month_name(parse_month(month))}: {', '.join(names)}")
+            return "\n".join(lines)
+        if route.tool == "get_reservations":
+            if result.startswith("ERROR"):
+                return None
+            return result if result.startswith("No reservations") else f"Reservations for {route.args['date']}: {result}"
+        if route.tool == "get_reservations_batch":
+            if any(text.startswith("ERROR") for text in result.values()):
+                return None
+            return "\n".join(f"- {date}: {text}" for date, text in result.items())
+        if route.tool == "get_reservations_range":
+            return None if result.startswith("ERROR") else result
+        if route.tool == "calculate_food_cost":
+            if result.startswith("Error"):
+                return None
+            return (f"Food cost: {route.args['weight_kg']:g} kg at {route.args['price_per_kg']:.2f}€/kg "
+                    f"= {float(result):.2f}€")
+        return None
+
+    def serve(self, question: str) -> Optional[FastAnswer]:
+        """Réponse sans LLM si toute la question est une consultation directe, sinon None."""
+        routes = self.route(question)
+        answers = []
+        if not isinstance(routes, str):
+            for route in routes:
+                text = self._render(route)
+                if text is None:
+                    routes = "tool_error"
+                    break
+                answers.append(text)
+        with self._lock:
+            self.stats["questions"] += 1
+            if isinstance(routes, str):
+                self.stats["fallbacks"] += 1
+                self.reasons[routes] += 1
+                return None
+            self.stats["served"] += 1
+            self.intents.update(route.intent for route in routes)
+        return FastAnswer(text="\n".join(answers), routes=tuple(routes))
+
+    def report(self) -> dict:
+        with self._lock:
+            report = dict(self.stats)
+            report["intents"] = dict(self.intents)
+            report["fallback_reasons"] = dict(self.reasons)
+        report["fast_path_share"] = round(report["served"] / report["questions"], 4) if report["questions"] else 0.0
+        return report
+
+
+def print_fast_path_report(router: FastPathRouter):
+    report = router.report()
+    intents = ", ".join(f"{intent} {n}" for intent, n in sorted(report["intents"].items())) or "-"
+    reasons = ", ".join(f"{reason} {n}" for reason, n in sorted(report["fallback_reasons"].items())) or "-"
+    print(
+        f"[FAST PATH] {report['questions']} questions, {report['served']} servies sans LLM "
+        f"({report['fast_path_share']:.1%}) [{intents}] ; repli LLM : {report['fallbacks']} [{reasons}]"
+    )
+
+
+def fast_path_enabled() -> bool:
+    return os.environ.get("CHEFBOT_FAST_PATH", "1").lower() not in ("0", "false", "off", "no")
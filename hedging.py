@@ -0,0 +1,146 @@
+"""
+Requêtes "hedgées" : réduire la latence de queue des appels LLM
+==============================================================
+Si un appel n'a pas répondu après le p95 observé pour son modèle et sa taille
+de prompt, une copie part en parallèle ; la première réponse gagne. Le perdant
+n'est pas attendu : il est annulé s'il n'a pas encore démarré, sinon sa réponse
+est simplement ignorée (un appel HTTP synchrone ne s'interrompt pas) et sa
+connexion retourne au pool.
+
+Un budget plafonne le surcoût : au plus `budget` requêtes en plus (5 % par
+défaut) sur l'ensemble des requêtes passées par la politique.
+
+Activation (opt-in) par la passerelle LLM :
+    CHEFBOT_HEDGING=1  CHEFBOT_HEDGE_BUDGET=0.05  CHEFBOT_HEDGE_MIN_SAMPLES=20
+ou en code : `llm_gateway.get_gateway().enable_hedging(HedgePolicy(budget=0.05))`.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def prompt_size_bucket(kwargs: dict) -> int:
+    """Taille approximative du prompt en tokens (≈ 4 caractères), arrondie à la puissance de 2."""
+    chars = 0
+    for message in kwargs.get("messages") or []:
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", "")
+        if isinstance(content, list):
+            chars += sum(len(part.get("text", "")) for part in content if isinstance(part, dict))
+        else:
+            chars += len(content or "")
+    return (chars // 4).bit_length()
+
+
+class LatencyTracker:
+    """Fenêtre glissante des latences par clé (modèle, taille de prompt)."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: tuple, latency_s: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(latency_s)
+
+    def p95(self, key: tuple):
+        """None tant qu'il n'y a pas assez de mesures pour décider."""
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def keys(self) -> list:
+        with self._lock:
+            return list(self._samples)
+
+
+class HedgePolicy:
+    def __init__(self, budget: float = 0.05, min_samples: int = 20, window: int = 200, max_workers: int = 64):
+        self.budget = budget
+        self.latencies = LatencyTracker(window, min_samples)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chefbot-hedge")
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "budget_denied": 0}
+
+    @classmethod
+    def from_env(cls) -> "HedgePolicy":
+        return cls(
+            budget=float(os.environ.get("CHEFBOT_HEDGE_BUDGET", 0.05)),
+            min_samples=int(os.environ.get("CHEFBOT_HEDGE_MIN_SAMPLES", 20)),
+        )
+
+    def _attempt(self, key: tuple, func):
+        start = time.perf_counter()
+        result = func()
+        # Chaque tentative réussie alimente le p95, y compris un perdant arrivé plus tard
+        self.latencies.record(key, time.perf_counter() - start)
+        return result
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self.stats["hedged"] + 1 > self.budget * self.stats["requests"]:
+                self.stats["budget_denied"] += 1
+                return False
+            self.stats["hedged"] += 1
+            return True
+
+    def call(self, model: str, kwargs: dict, func):
+        key = (model, prompt_size_bucket(kwargs))
+        with self._lock:
+            self.stats["requests"] += 1
+        delay = self.latencies.p95(key)
+        if delay is None:
+            # Pas encore de référence : appel direct, juste mesuré
+            return self._attempt(key, func)
+
+        # Les tentatives gardent le contexte de l'appelant (trace en cours, deadline)
+        primary = self._pool.submit(contextvars.copy_context().run, self._attempt, key, func)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_budget():
+            return primary.result()
+
+        hedge = self._pool.submit(contextvars.copy_context().run, self._attempt, key, func)
+        pending = {primary, hedge}
+        first_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if future is hedge:
+                        with self._lock:
+                            self.stats["hedge_wins"] += 1
+                    return future.result()
+                first_error = first_error or future.exception()
+        raise first_error
+
+    def report(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["extra_request_ratio"] = round(stats["hedged"] / stats["requests"], 4) if stats["requests"] else 0.0
+        stats["p95_s"] = {
+            f"{model}|~2^{bucket} tokens": round(p95, 3)
+            for model, bucket in self.latencies.keys()
+            if (p95 := self.latencies.p95((model, bucket))) is not None
+        }
+        return stats
+
+
+def print_hedging_report(policy: HedgePolicy):
+    report = policy.report()
+    print(
+        f"[HEDGING] {report['requests']} requêtes, {report['hedged']} doublées "
+        f"({report['extra_request_ratio']:.1%}, budget {policy.budget:.0%}), "
+        f"{report['hedge_wins']} gagnées par le doublon, {report['budget_denied']} refusées par le budget"
+    )
+    for key, p95 in report["p95_s"].items():
+        print(f"    p95 {key} : {p95:.3f}s")
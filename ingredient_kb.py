@@ -0,0 +1,332 @@
+"""
+Base de connaissances des ingrédients
+=====================================
+Allergènes (les 14 allergènes réglementaires), régimes, prix au kilo et
+saisonnalité par mois et par région, chargés une seule fois par processus
+depuis data/ingredients.json (ou $CHEFBOT_INGREDIENTS_PATH).
+
+Le fichier est compilé en structures compactes et indexées :
+- un identifiant entier par ingrédient, un index nom/alias (FR et EN, sans
+  accents ni pluriel) -> identifiant ;
+- allergènes et régimes en masques de bits (array) : un plat = OU / ET des
+  masques de ses ingrédients ;
+- saisonnalité en masque de 12 bits par région, et la liste des produits de
+  saison précalculée pour chaque (région, mois).
+
+Toutes les requêtes acceptent des lots (listes ou chaînes séparées par des
+virgules) et se résolvent en quelques microsecondes, sans appel LLM :
+
+    kb = get_kb()
+    kb.prices("saumon, courgettes, truffe")     # {'saumon': 25.0, ...}
+    kb.seasonal("mars", region="provence")      # ids des produits de saison
+    kb.dish_profile("Mushroom Risotto")         # allergènes + régimes
+"""
+
+import json
+import os
+import re
+import threading
+import unicodedata
+from array import array
+from dataclasses import dataclass
+from typing import Optional
+
+DEFAULT_INGREDIENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ingredients.json")
+DEFAULT_REGION = "france"
+
+# Régimes : un bit par régime compatible
+VEGETARIAN = 1
+VEGAN = 2
+GLUTEN_FREE = 4
+LACTOSE_FREE = 8
+NO_PORK_ALCOHOL = 16  # Condition nécessaire du halal (la viande doit en plus être certifiée)
+DIETS = {
+    "vegetarian": VEGETARIAN,
+    "vegan": VEGAN,
+    "gluten_free": GLUTEN_FREE,
+    "lactose_free": LACTOSE_FREE,
+    "no_pork_alcohol": NO_PORK_ALCOHOL,
+}
+ALL_DIETS = sum(DIETS.values())
+
+# Origines qui excluent un régime
+_NOT_VEGETARIAN = {"viande", "porc", "poisson", "fruits_de_mer"}
+_NOT_VEGAN = _NOT_VEGETARIAN | {"lait", "oeuf", "miel"}
+
+MONTHS = (
+    ("january", "janvier"), ("february", "fevrier"), ("march", "mars"), ("april", "avril"),
+    ("may", "mai"), ("june", "juin"), ("july", "juillet"), ("august", "aout"),
+    ("september", "septembre"), ("october", "octobre"), ("november", "novembre"), ("december", "decembre"),
+)
+# Abréviations françaises usuelles ("jui" serait ambigu entre juin et juillet)
+_MONTH_INDEX = {"fev": 2, "avr": 4, "juil": 7, "aou": 8}
+for _number, (_en, _fr) in enumerate(MONTHS, start=1):
+    _MONTH_INDEX.update({_en: _number, _en[:3]: _number, _fr: _number, str(_number): _number, f"{_number:02d}": _number})
+
+
+def fold(text: str) -> str:
+    """Clé de recherche : minuscules, sans accents, ponctuation réduite à des espaces."""
+    text = unicodedata.normalize("NFKD", text.replace("œ", "oe").replace("Œ", "oe"))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+def _singular(key: str) -> str:
+    # Pluriel FR/EN le plus courant ; suffisant pour des noms d'ingrédients
+    return " ".join(w[:-1] if len(w) > 3 and w[-1] in "sx" else w for w in key.split())
+
+
+def parse_month(month) -> int:
+    """'March', 'mars', 'Mar', '03' ou 3 -> 3. ValueError si le mois est inconnu."""
+    number = _MONTH_INDEX.get(fold(str(month)))
+    if number is None:
+        raise ValueError(f"Mois inconnu : {month!r}")
+    return number
+
+
+def month_name(number: int, lang: str = "en") -> str:
+    name = MONTHS[number - 1][0 if lang == "en" else 1]
+    return name.capitalize() if lang == "en" else {"fevrier": "février", "aout": "août", "decembre": "décembre"}.get(name, name)
+
+
+def split_names(names) -> list:
+    """Une chaîne 'a, b; c' ou une liste -> liste de noms non vides."""
+    if isinstance(names, str):
+        names = re.split(r"[,;\n]", names)
+    return [n.strip() for n in names if n and n.strip()]
+
+
+@dataclass(frozen=True)
+class DishProfile:
+    """Allergènes et régimes compatibles d'un plat, calculés sur ses ingrédients."""
+    dish: str
+    ingredients: tuple
+    allergens: tuple
+    diets: tuple      # régimes garantis ; vide pour un profil deviné (recette inconnue)
+    excluded: tuple   # régimes exclus par au moins un ingrédient repéré
+    known: bool  # False : ingrédients seulement devinés dans le nom du plat, allergènes = minimum
+
+
+class IngredientKB:
+    """Index en lecture seule ; partagé entre threads sans verrou."""
+
+    def __init__(self, data: dict):
+        self.allergen_names = tuple(data["allergenes"])
+        allergen_bit = {name: 1 << i for i, name in enumerate(self.allergen_names)}
+
+        self.region_labels = {r: spec["label"] for r, spec in data["regions"].items()}
+        self._region_index = {}
+        for region, spec in data["regions"].items():
+            for alias in [region, *spec.get("aliases", ())]:
+                self._region_index[fold(alias)] = region
+
+        entries = data["ingredients"]
+        self.names = tuple(e["name"] for e in entries)
+        self.names_fr = tuple(e["fr"] for e in entries)
+        self.categories = tuple(e["categorie"] for e in entries)
+        self.allergen_mask = array("H", [0]) * len(entries)
+        self.diet_mask = array("B", [0]) * len(entries)
+        self.price_per_kg = array("d", [0.0]) * len(entries)
+        # Conversions d'unités (0 = inconnu) : poids d'une pièce, masse volumique en kg/l
+        self.piece_kg = array("d", [0.0]) * len(entries)
+        self.density = array("d", [0.0]) * len(entries)
+        all_year = (1 << 12) - 1
+        self.season_mask = {region: array("H", [all_year]) * len(entries) for region in self.region_labels}
+
+        self._index = {}
+        for i, entry in enumerate(entries):
+            for name in [entry["name"], entry["fr"], *entry.get("aliases", ())]:
+                key = fold(name)
+                self._index.setdefault(key, i)
+                self._index.setdefault(_singular(key), i)
+
+            mask = 0
+            for allergen in entry.get("allergenes", ()):
+                mask |= allergen_bit[allergen]
+            self.allergen_mask[i] = mask
+
+            origine = entry["origine"]
+            diet = ALL_DIETS
+            if origine in _NOT_VEGETARIAN:
+                diet &= ~VEGETARIAN
+            if origine in _NOT_VEGAN:
+                diet &= ~VEGAN
+            if mask & allergen_bit["gluten"]:
+                diet &= ~GLUTEN_FREE
+            if mask & allergen_bit["lait"]:
+                diet &= ~LACTOSE_FREE
+            if origine == "porc" or entry.get("alcool"):
+                diet &= ~NO_PORK_ALCOHOL
+            self.diet_mask[i] = diet
+
+            self.price_per_kg[i] = float(entry["prix_kg"])
+            self.piece_kg[i] = float(entry.get("piece_kg", 0.0))
+            self.density[i] = float(entry.get("densite", 0.0))
+            for region, months in (entry.get("saison") or {}).items():
+                self.season_mask[region][i] = sum(1 << (m - 1) for m in months)
+
+        # Produits de saison précalculés : (région, mois) -> ids, sans ceux disponibles toute l'année
+        seasonal_ids = [i for i, m in enumerate(self.season_mask[DEFAULT_REGION]) if m != all_year]
+        self._in_season = {
+            (region, month): tuple(i for i in seasonal_ids if masks[i] >> (month - 1) & 1)
+            for region, masks in self.season_mask.items()
+            for month in range(1, 13)
+        }
+        # Pour repérer des ingrédients dans un texte libre ("Salmon with asparagus")
+        self._max_words = max(len(key.split()) for key in self._index)
+
+        # Plats connus : profil calculé une fois pour toutes, recette pour une portion
+        self._dishes = {}
+        self._dish_index = {}
+        self.dish_names = []
+        self.dish_portions = []
+        for dish in data.get("plats", ()):
+            portion = tuple((self._index[fold(name)], float(quantity), unit) for name, quantity, unit in dish["portion"])
+            profile = self._profile(dish["nom"], tuple(i for i, _, _ in portion), known=True)
+            for name in [dish["nom"], *dish.get("aliases", ())]:
+                self._dishes[fold(name)] = profile
+                self._dish_index[fold(name)] = len(self.dish_names)
+            self.dish_names.append(dish["nom"])
+            self.dish_portions.append(portion)
+
+    # -------------------------------------------------------------------------
+    # Ingrédients
+    # -------------------------------------------------------------------------
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Identifiant d'un ingrédient (nom FR/EN ou alias, accents et pluriel ignorés)."""
+        key = fold(name)
+        i = self._index.get(key)
+        return i if i is not None else self._index.get(_singular(key))
+
+    def lookup_many(self, names) -> dict:
+        """{nom demandé: id ou None} pour un lot de noms."""
+        return {name: self.lookup(name) for name in split_names(names)}
+
+    def find_in_text(self, text: str) -> list:
+        """Ingrédients cités dans un texte libre (plus longue correspondance d'abord)."""
+        words = fold(text).split()
+        found, start = [], 0
+        while start < len(words):
+            for size in range(min(self._max_words, len(words) - start), 0, -1):
+                key = " ".join(words[start:start + size])
+                i = self._index.get(key)
+                if i is None:
+                    i = self._index.get(_singular(key))
+                if i is not None:
+                    if i not in found:
+                        found.append(i)
+                    start += size
+                    break
+            else:
+                start += 1
+        return found
+
+    def allergens(self, mask: int) -> tuple:
+        return tuple(name for bit, name in enumerate(self.allergen_names) if mask >> bit & 1)
+
+    @staticmethod
+    def diets(mask: int) -> tuple:
+        return tuple(name for name, bit in DIETS.items() if mask & bit)
+
+    def prices(self, names) -> dict:
+        """{nom demandé: prix au kilo (€) ou None si inconnu} pour un lot d'ingrédients."""
+        prices = {}
+        for name, i in self.lookup_many(names).items():
+            prices[name] = None if i is None else self.price_per_kg[i]
+        return prices
+
+    # -------------------------------------------------------------------------
+    # Saisonnalité
+    # -------------------------------------------------------------------------
+
+    def region(self, region: Optional[str] = None) -> str:
+        """Normalise une région ('Provence' -> 'sud'). ValueError si elle est inconnue."""
+        if not region:
+            return DEFAULT_REGION
+        key = self._region_index.get(fold(region))
+        if key is None:
+            raise ValueError(f"Région inconnue : {region!r} (connues : {', '.join(self.region_labels)})")
+        return key
+
+    def seasonal(self, month, region: Optional[str] = None) -> tuple:
+        """Ids des produits de saison (hors produits disponibles toute l'année)."""
+        return self._in_season[(self.region(region), parse_month(month))]
+
+    def in_season(self, names, month, region: Optional[str] = None) -> dict:
+        """{nom demandé: True/False, ou None si inconnu} pour un lot d'ingrédients."""
+        bit = 1 << (parse_month(month) - 1)
+        masks = self.season_mask[self.region(region)]
+        return {name: None if i is None else bool(masks[i] & bit) for name, i in self.lookup_many(names).items()}
+
+    # -------------------------------------------------------------------------
+    # Plats
+    # -------------------------------------------------------------------------
+
+    def _profile(self, dish: str, ids: tuple, known: bool) -> DishProfile:
+        allergen_mask, diet_mask = 0, ALL_DIETS if ids else 0
+        for i in ids:
+            allergen_mask |= self.allergen_mask[i]
+            diet_mask &= self.diet_mask[i]
+        diets = self.diets(diet_mask)
+        return DishProfile(
+            dish=dish,
+            ingredients=tuple(self.names[i] for i in ids),
+            allergens=self.allergens(allergen_mask),
+            # Plat deviné : les ingrédients non repérés peuvent exclure n'importe quel régime
+            diets=diets if known else (),
+            excluded=tuple(d for d in DIETS if d not in diets),
+            known=known,
+        )
+
+    def dish_profile(self, dish: str) -> DishProfile:
+        """Profil d'un plat connu, sinon des ingrédients repérés dans son nom.
+
+        Pour un plat inconnu, les allergènes sont un minimum et aucun régime n'est garanti."""
+        profile = self._dishes.get(fold(dish))
+        if profile is None:
+            profile = self._profile(dish, tuple(self.find_in_text(dish)), known=False)
+        return profile
+
+    def dish_id(self, dish: str) -> Optional[int]:
+        """Identifiant d'un plat connu (nom FR/EN ou alias), None sinon."""
+        return self._dish_index.get(fold(dish))
+
+    def find_dishes(self, text: str) -> list:
+        """Plats connus cités dans un texte libre, dans l'ordre d'apparition."""
+        folded = f" {fold(text)} "
+        positions = {}
+        for key, dish_id in self._dish_index.items():
+            position = folded.find(f" {key} ")
+            if position >= 0 and position < positions.get(dish_id, len(folded)):
+                positions[dish_id] = position
+        # Plusieurs alias d'un même plat ("Salmon", "Salmon Fillet") ne le comptent qu'une fois
+        return sorted(positions, key=positions.get)
+
+    def dish_profiles(self, dishes) -> list:
+        return [self.dish_profile(dish) for dish in split_names(dishes)]
+
+
+# =============================================================================
+# BASE PARTAGÉE (chargée une seule fois par processus)
+# =============================================================================
+
+_kbs = {}
+_kbs_lock = threading.Lock()
+
+
+def load_kb(path: str) -> IngredientKB:
+    with open(path, "r", encoding="utf-8") as f:
+        return IngredientKB(json.load(f))
+
+
+def get_kb(path: Optional[str] = None) -> IngredientKB:
+    """Retourne la base partagée (par défaut $CHEFBOT_INGREDIENTS_PATH ou data/ingredients.json)."""
+    path = os.path.abspath(path or os.environ.get("CHEFBOT_INGREDIENTS_PATH", DEFAULT_INGREDIENTS_PATH))
+    kb = _kbs.get(path)
+    if kb is None:
+        with _kbs_lock:
+            kb = _kbs.get(path)
+            if kb is None:
+                kb = _kbs[path] = load_kb(path)
+    return kb
@@ -0,0 +1,235 @@
+"""
+Instrumentation locale des agents (Partie 6)
+===========================================
+Mesure, sans Langfuse, ce que consomme chaque agent : appels LLM, tokens,
+appels d'outils, étapes et secondes. Deux sources sont combinées :
+
+- les step callbacks smolagents (par agent : étapes, tokens, durée, outils) ;
+- un callback litellm (par modèle : appels, tokens, latence réseau, échecs).
+
+Les métriques sont agrégées par run et par agent, puis exportées en JSON ou au
+format texte Prometheus.
+
+Exemple :
+    collector = MetricsCollector()
+    collector.attach(manager)          # inclut les agents gérés
+    collector.install_litellm_hook()
+    with collector.run("scenario-8-personnes"):
+        manager.run(task)
+    collector.write_json("metrics.json")
+"""
+
+import contextvars
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import litellm
+from litellm.integrations.custom_logger import CustomLogger
+from smolagents.memory import ActionStep, FinalAnswerStep, PlanningStep
+
+AGENT_METRICS = (
+    "runs", "steps", "planning_steps", "llm_calls", "tool_calls", "errors",
+    "input_tokens", "output_tokens", "seconds",
+)
+MODEL_METRICS = ("llm_calls", "failures", "input_tokens", "output_tokens", "seconds")
+RUN_KEY = "chefbot_metrics_run"
+
+
+def _empty(keys) -> dict:
+    return {key: 0 for key in keys}
+
+
+class MetricsCollector:
+    """Agrège les métriques par run, par agent et par modèle."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = {}
+        # Run courant par contexte (thread / tâche) : des runs concurrents (fan_out, batch_runner)
+        # ne s'écrasent pas ; les threads lancés avec copy_context() héritent du run de l'appelant
+        self._current_run = contextvars.ContextVar(f"chefbot_metrics_run_{id(self):x}", default=None)
+        self._attached = set()
+
+    @property
+    def current_run(self):
+        return self._current_run.get()
+
+    # --- Runs ----------------------------------------------------------------
+
+    @contextmanager
+    def run(self, name: str = None):
+        """Délimite un run : toutes les métriques collectées pendant le bloc lui sont rattachées."""
+        run_id = name or uuid.uuid4().hex[:8]
+        with self._lock:
+            self.runs.setdefault(run_id, {"started_at": time.time(), "seconds": 0.0, "agents": {}, "models": {}})
+        token = self._current_run.set(run_id)
+        start = time.perf_counter()
+        try:
+            yield run_id
+        finally:
+            with self._lock:
+                self.runs[run_id]["seconds"] += time.perf_counter() - start
+            self._current_run.reset(token)
+
+    def _bucket(self, kind: str, key: str, keys, run_id: str = None) -> dict:
+        run_id = run_id or self.current_run or "default"
+        run = self.runs.setdefault(run_id, {"started_at": time.time(), "seconds": 0.0, "agents": {}, "models": {}})
+        return run[kind].setdefault(key, _empty(keys))
+
+    def _add(self, kind: str, key: str, keys, run_id: str = None, **values):
+        with self._lock:
+            bucket = self._bucket(kind, key, keys, run_id)
+            for name, value in values.items():
+                bucket[name] += value
+
+    # --- Hooks smolagents ----------------------------------------------------
+
+    def attach(self, agent):
+        """Branche les step callbacks sur un agent et, récursivement, sur ses agents gérés."""
+        if id(agent) in self._attached:
+            return agent
+        self._attached.add(id(agent))
+        name = agent.name or type(agent).__name__
+
+        agent.step_callbacks.register(ActionStep, lambda step, agent=None: self._on_action(name, step))
+        agent.step_callbacks.register(PlanningStep, lambda step, agent=None: self._on_planning(name, step))
+        agent.step_callbacks.register(FinalAnswerStep, lambda step, agent=None: self._add("agents", name, AGENT_METRICS, runs=1))
+
+        for tool_name, tool in agent.tools.items():
+            if tool_name != "final_answer":
+                self._count_tool_calls(name, tool)
+
+        for managed in agent.managed_agents.values():
+            self.attach(managed)
+        return agent
+
+    def _count_tool_calls(self, agent_name: str, tool):
+        forward = tool.forward
+
+        def counted_forward(*args, **kwargs):
+            self._add("agents", agent_name, AGENT_METRICS, tool_calls=1)
+            return forward(*args, **kwargs)
+
+        tool.forward = counted_forward
+
+    @staticmethod
+    def _step_values(step) -> dict:
+        usage = step.token_usage
+        return {
+            "llm_calls": 1,
+            "input_tokens": usage.input_tokens if usage else 0,
+            "output_tokens": usage.output_tokens if usage else 0,
+            "seconds": step.timing.duration or 0.0,
+        }
+
+    def _on_action(self, agent_name: str, step):
+        self._add("agents", agent_name, AGENT_METRICS, steps=1, errors=int(step.error is not None), **self._step_values(step))
+
+    def _on_planning(self, agent_name: str, step):
+        self._add("agents", agent_name, AGENT_METRICS, planning_steps=1, **self._step_values(step))
+
+    # --- Hook litellm --------------------------------------------------------
+
+    def install_litellm_hook(self):
+        """Ajoute le collecteur aux callbacks litellm (sans retirer ceux déjà configurés)."""
+        hook = LiteLLMHook(self)
+        litellm.callbacks = list(litellm.callbacks or []) + [hook]
+        return hook
+
+    def record_llm_call(self, model: str, seconds: float, input_tokens: int = 0, output_tokens: int = 0,
+                        failed: bool = False, run_id: str = None):
+        self._add(
+            "models", model, MODEL_METRICS, run_id=run_id,
+            llm_calls=1, failures=int(failed), seconds=seconds,
+            input_tokens=input_tokens, output_tokens=output_tokens,
+        )
+
+    # --- Exports -------------------------------------------------------------
+
+    def totals(self) -> dict:
+        """Métriques par agent, tous runs confondus."""
+        totals = {}
+        with self._lock:
+            for run in self.runs.values():
+                for agent_name, metrics in run["agents"].items():
+                    bucket = totals.setdefault(agent_name, _empty(AGENT_METRICS))
+                    for key, value in metrics.items():
+                        bucket[key] += value
+        return totals
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            runs = json.loads(json.dumps(self.runs))
+        return {"runs": runs, "agents": self.totals()}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+
+    def write_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+
+    def to_prometheus(self) -> str:
+        """Export au format texte Prometheus (une série par run et par agent / modèle)."""
+        data = self.to_dict()
+        lines = []
+        for kind, label, keys in (("agents", "agent", AGENT_METRICS), ("models", "model", MODEL_METRICS)):
+            for key in keys:
+                metric = f"chefbot_{label}_{key}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for run_id, run in data["runs"].items():
+                    for name, metrics in run[kind].items():
+                        lines.append(f'{metric}{{run="{run_id}",{label}="{name}"}} {metrics[key]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+
+
+def _usage(response_obj):
+    usage = getattr(response_obj, "usage", None)
+    if usage is None and isinstance(response_obj, dict):
+        usage = response_obj.get("usage")
+    if usage is None:
+        return 0, 0
+    if isinstance(usage, dict):
+        return usage.get("prompt_tokens", 0) or 0, usage.get("completion_tokens", 0) or 0
+    return getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+
+
+class LiteLLMHook(CustomLogger):
+    """Callback litellm : compte appels, tokens et latence par modèle."""
+
+    def __init__(self, collector: MetricsCollector):
+        super().__init__()
+        self.collector = collector
+
+    def log_pre_api_call(self, model, messages, kwargs):
+        # Appelé dans le thread de l'appelant : on mémorise le run avant que le
+        # callback de succès ne parte dans un thread de litellm
+        kwargs[RUN_KEY] = self.collector.current_run
+
+    def _record(self, kwargs, response_obj, start_time, end_time, failed):
+        input_tokens, output_tokens = (0, 0) if failed else _usage(response_obj)
+        self.collector.record_llm_call(
+            kwargs.get("model", "unknown"),
+            (end_time - start_time).total_seconds(),
+            input_tokens, output_tokens, failed=failed,
+            run_id=kwargs.get(RUN_KEY),
+        )
+
+    def log_success_event(self, kwargs, response_obj, start_time, end_time):
+        self._record(kwargs, response_obj, start_time, end_time, failed=False)
+
+    def log_failure_event(self, kwargs, response_obj, start_time, end_time):
+        self._record(kwargs, response_obj, start_time, end_time, failed=True)
+
+    async def async_log_success_event(self, kwargs, response_obj, start_time, end_time):
+        self._record(kwargs, response_obj, start_time, end_time, failed=False)
+
+    async def async_log_failure_event(self, kwargs, response_obj, start_time, end_time):
+        self._record(kwargs, response_obj, start_time, end_time, failed=True)
@@ -0,0 +1,304 @@
+"""
+Passerelle LLM partagée (pool HTTP keep-alive + fusion des requêtes en vol)
+==========================================================================
+Point de passage unique des appels LLM du dépôt :
+- `make_groq_client()` remplace `Groq()` dans les scripts ;
+- `install_litellm_gateway()` place la passerelle sous `litellm.completion`
+  (donc sous `LiteLLMModel` de smolagents).
+
+Tous les clients partagent un seul `httpx.Client` réglé (connexions keep-alive
+réutilisées, HTTP/2 si le paquet `h2` est installé) : une poignée de main TLS par
+connexion du pool au lieu d'une par client ou par appel.
+
+Fusion "single-flight" : deux requêtes identiques (même modèle, messages, outils,
+paramètres, voir cassette.normalize_request) lancées en même temps ne partent
+qu'une fois ; les appelants suivants attendent et reçoivent une copie de la
+réponse. Les requêtes en streaming ne sont jamais fusionnées.
+
+La cassette ($CHEFBOT_CASSETTE) est branchée sous la passerelle : un rejeu
+profite aussi de la fusion.
+
+Sous une deadline (deadline.scope), le timeout HTTP de chaque appel est borné au
+temps restant de la requête.
+
+Hedging optionnel (voir hedging.py) : CHEFBOT_HEDGING=1 double les appels plus
+lents que le p95 observé, dans la limite d'un budget. Jamais en rejeu de cassette
+(le doublon consommerait la réponse enregistrée suivante).
+
+Profil des prompts optionnel (voir prompt_profiler.py) : CHEFBOT_PROMPT_PROFILE=1
+tokenise chaque requête sortante et affiche en fin de processus les tokens par
+point d'appel et par segment (system, outils, historique...).
+
+Réglages : CHEFBOT_HTTP_MAX_CONNECTIONS (100), CHEFBOT_HTTP_MAX_KEEPALIVE (20),
+CHEFBOT_HTTP_KEEPALIVE_EXPIRY (60 s), CHEFBOT_HTTP2 (auto | 0 | 1).
+"""
+
+import copy
+import importlib.util
+import os
+import threading
+from concurrent.futures import Future
+
+from cassette import CassetteGroqClient, cassette_from_env, normalize_request, request_key
+from deadline import current as current_deadline
+from hedging import HedgePolicy
+from prompt_profiler import PromptProfiler, print_at_exit, profiling_enabled
+
+
+def _http2_enabled() -> bool:
+    setting = os.environ.get("CHEFBOT_HTTP2", "auto").lower()
+    if setting in ("0", "false", "no"):
+        return False
+    return importlib.util.find_spec("h2") is not None
+
+
+# =============================================================================
+# FUSION DES REQUÊTES EN VOL
+# =============================================================================
+
+class SingleFlight:
+    """Une seule exécution par clé à un instant donné ; les appels concurrents partagent le résultat."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.stats = {"calls": 0, "upstream": 0, "coalesced": 0}
+
+    def do(self, key: str, func):
+        with self._lock:
+            self.stats["calls"] += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self.stats["upstream"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            # Copie : chaque appelant peut modifier sa réponse sans toucher celle des autres
+            return copy.deepcopy(future.result())
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+
+# =============================================================================
+# PASSERELLE
+# =============================================================================
+
+class LLMGateway:
+    def __init__(self, max_connections: int = 100, max_keepalive: int = 20, keepalive_expiry: float = 60.0,
+                 http2: bool = None, hedging: HedgePolicy = None, profiler: PromptProfiler = None):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = _http2_enabled() if http2 is None else http2
+        self.single_flight = SingleFlight()
+        self.hedging = hedging
+        self.profiler = profiler
+        self._http_client = None
+        self._litellm_handler = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LLMGateway":
+        gateway = cls(
+            max_connections=int(os.environ.get("CHEFBOT_HTTP_MAX_CONNECTIONS", 100)),
+            max_keepalive=int(os.environ.get("CHEFBOT_HTTP_MAX_KEEPALIVE", 20)),
+            keepalive_expiry=float(os.environ.get("CHEFBOT_HTTP_KEEPALIVE_EXPIRY", 60)),
+            hedging=HedgePolicy.from_env() if os.environ.get("CHEFBOT_HEDGING", "0").lower() in ("1", "true", "yes") else None,
+        )
+        if profiling_enabled():
+            print_at_exit(gateway.enable_profiling())
+        return gateway
+
+    def enable_hedging(self, policy: HedgePolicy = None) -> HedgePolicy:
+        self.hedging = policy or HedgePolicy()
+        return self.hedging
+
+    def enable_profiling(self, profiler: PromptProfiler = None) -> PromptProfiler:
+        self.profiler = profiler or PromptProfiler()
+        return self.profiler
+
+    @property
+    def http_client(self):
+        """Pool de connexions partagé, créé au premier appel."""
+        if self._http_client is None:
+            with self._lock:
+                if self._http_client is None:
+                    import httpx
+
+                    self._http_client = httpx.Client(
+                        http2=self.http2,
+                        limits=httpx.Limits(
+                            max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_keepalive,
+                            keepalive_expiry=self.keepalive_expiry,
+                        ),
+                        timeout=httpx.Timeout(60.0, connect=5.0),
+                    )
+        return self._http_client
+
+    @property
+    def litellm_handler(self):
+        if self._litellm_handler is None:
+            from litellm.llms.custom_httpx.http_handler import HTTPHandler
+            self._litellm_handler = HTTPHandler(client=self.http_client)
+        return self._litellm_handler
+
+    def call(self, source: str, kwargs: dict, upstream, hedge: bool = True):
+        """Exécute `upstream()` en fusionnant les requêtes identiques concurrentes (et en hedgeant si activé)."""
+        if self.profiler is not None:
+            self.profiler.observe(source, kwargs)
+        budget = current_deadline()
+        if budget is not None and not budget.unlimited:
+            # `upstream` relit ce même dict : le timeout s'applique à l'appel réel
+            kwargs["timeout"] = budget.call_timeout(kwargs.get("timeout"))
+        if kwargs.get("stream"):
+            return upstream()
+        key = request_key({"source": source, **normalize_request(kwargs)})
+        policy = self.hedging
+        if hedge and policy is not None:
+            model = kwargs.get("model", "?")
+            return self.single_flight.do(key, lambda: policy.call(model, kwargs, upstream))
+        return self.single_flight.do(key, upstream)
+
+    def stats(self) -> dict:
+        stats = {**self.single_flight.stats, "http2": self.http2}
+        if self.hedging is not None:
+            stats["hedging"] = self.hedging.report()
+        if self.profiler is not None:
+            stats["prompts"] = self.profiler.report()
+        return stats
+
+    def close(self):
+        if self._http_client is not None:
+            self._http_client.close()
+            self._http_client = None
+            self._litellm_handler = None
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway.from_env()
+    return _gateway
+
+
+# =============================================================================
+# CLIENT GROQ
+# =============================================================================
+
+class _GatewayCompletions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        upstream = self._owner.upstream
+        return self._owner.gateway.call(
+            "groq", kwargs, lambda: upstream.chat.completions.create(**kwargs),
+            hedge=not isinstance(upstream, CassetteGroqClient),
+        )
+
+
+class _GatewayChat:
+    def __init__(self, owner):
+        self.completions = _GatewayCompletions(owner)
+
+
+class GatewayGroqClient:
+    """Remplace `Groq()` : même interface `chat.completions.create`, via la passerelle partagée.
+
+    Le vrai client (ou la cassette) n'est créé qu'au premier appel.
+    """
+
+    def __init__(self, gateway: LLMGateway, client_factory=None):
+        self.gateway = gateway
+        self._client_factory = client_factory
+        self._upstream = None
+        self._lock = threading.Lock()
+        self.chat = _GatewayChat(self)
+
+    def _build_client(self):
+        if self._client_factory is not None:
+            return self._client_factory()
+        from groq import Groq
+        return Groq(http_client=self.gateway.http_client)
+
+    @property
+    def upstream(self):
+        if self._upstream is None:
+            with self._lock:
+                if self._upstream is None:
+                    cassette = cassette_from_env()
+                    self._upstream = (
+                        CassetteGroqClient(cassette, self._build_client) if cassette is not None else self._build_client()
+                    )
+        return self._upstream
+
+    def __getattr__(self, name):
+        return getattr(self.upstream, name)
+
+
+def make_groq_client(client_factory=None) -> GatewayGroqClient:
+    """Client Groq à utiliser dans les scripts (pool partagé, fusion, cassette si configurée)."""
+    return GatewayGroqClient(get_gateway(), client_factory)
+
+
+# =============================================================================
+# LITELLM (LiteLLMModel de smolagents)
+# =============================================================================
+
+_litellm_original_completion = None
+
+
+def install_litellm_gateway(gateway: LLMGateway = None) -> LLMGateway:
+    """Remplace `litellm.completion` : pool HTTP partagé, fusion des requêtes et cassette si configurée."""
+    global _litellm_original_completion
+    import litellm
+
+    gateway = gateway or get_gateway()
+    if _litellm_original_completion is None:
+        _litellm_original_completion = litellm.completion
+    original = _litellm_original_completion
+    cassette = cassette_from_env()
+
+    def completion(*args, **kwargs):
+        kwargs.setdefault("client", gateway.litellm_handler)
+        if cassette is None:
+            return gateway.call("litellm", kwargs, lambda: original(*args, **kwargs))
+        if kwargs.get("stream"):
+            raise ValueError("Les cassettes ne gèrent pas les réponses en streaming.")
+
+        def play():
+            return litellm.ModelResponse(**cassette.play("litellm", kwargs, lambda: original(*args, **kwargs)))
+
+        return gateway.call("litellm", kwargs, play, hedge=False)
+
+    litellm.completion = completion
+    return gateway
+
+
+def uninstall_litellm_gateway():
+    global _litellm_original_completion
+    import litellm
+
+    if _litellm_original_completion is not None:
+        litellm.completion = _litellm_original_completion
+        _litellm_original_completion = None
@@ -0,0 +1,201 @@
+"""
+Test de charge des pipelines contre le serveur LLM factice
+=========================================================
+Lance `ask_chef`, `plan_weekly_menu`, `run_manual_loop` ou l'expérience du
+07_boss (agent + juge) à une concurrence donnée, contre mock_llm_server, puis
+affiche les latences p50/p95/p99 et le débit (requêtes/s).
+
+    python load_test.py --scenario plan --concurrency 8 --requests 64 --latency lognormal:0.3,0.4
+    python load_test.py --scenario all --base-url http://127.0.0.1:8765   # serveur déjà lancé
+    python load_test.py --scenario plan --latency lognormal:0.3,0.8 --hedge-budget 0.05   # hedging
+    python load_test.py --scenario ask_chef --question-cache   # avec le cache de questions
+    python load_test.py --scenario all --profile-prompts       # tokens de prompt par point d'appel
+    python load_test.py --scenario manual_loop --fast-path     # consultations directes sans LLM
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from chefbot import load_script
+
+SCENARIO_INPUTS = {
+    "ask_chef": [
+        "What are some quick and easy meals I can make for dinner?",
+        "How do I keep asparagus crisp when roasting?",
+        "What can I cook with leftover rice?",
+    ],
+    "plan": [
+        "Menu végétarien pour 2 personnes, budget serré, incluant des restes pour le midi",
+        "Menu sans gluten pour 4 personnes, budget moyen",
+    ],
+    "manual_loop": [
+        "What represent the seasonal products for March? Also, check the reservations for 15/03/2025.",
+        "Which seasonal March vegetables would go well with a salmon main course?",
+        "Reservations from 10/03/2025 to 16/03/2025",
+    ],
+    "boss": [
+        "Je veux un dîner romantique simple pour 2 personnes ce soir.",
+        "Dîner pour 6 amis. 2 sont végétariens, 1 est intolérant au gluten. On a un petit budget de 15€ par personne max.",
+    ],
+}
+
+
+def _boss_call(question: str):
+    boss = load_script("07_boss.py")
+    # Un agent par requête : un CodeAgent n'est pas prévu pour des runs concurrents
+    agent = boss.build_chef_agent("groq/llama-3.3-70b-versatile")
+    agent.logger.level = -1
+    response = str(agent.run(question))
+    return boss.judge_chef_response(question, response, {"must_respect": []})
+
+
+def scenario_callable(scenario: str):
+    if scenario == "ask_chef":
+        return load_script("01_chefbot.py").ask_chef
+    if scenario == "plan":
+        return load_script("02_planification.py").plan_weekly_menu
+    if scenario == "manual_loop":
+        return load_script("04_outils.py").run_manual_loop
+    if scenario == "boss":
+        return _boss_call
+    raise ValueError(f"Scénario inconnu : {scenario}")
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Percentile par rang le plus proche sur une liste déjà triée."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_load(scenario: str, concurrency: int, requests: int) -> dict:
+    func = scenario_callable(scenario)
+    inputs = SCENARIO_INPUTS[scenario]
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def one(i: int):
+        start = time.perf_counter()
+        try:
+            func(inputs[i % len(inputs)])
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": requests,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "error_samples": errors[:3],
+        "wall_s": round(wall, 3),
+        "requests_per_s": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_s": round(percentile(latencies, 50), 4),
+        "p95_s": round(percentile(latencies, 95), 4),
+        "p99_s": round(percentile(latencies, 99), 4),
+    }
+
+
+def print_report(result: dict):
+    print(
+        f"{result['scenario']:<12} c={result['concurrency']:<3} n={result['requests']:<5} "
+        f"ok={result['ok']:<5} err={result['errors']:<4} {result['requests_per_s']:>8.2f} req/s  "
+        f"p50={result['p50_s']:.3f}s p95={result['p95_s']:.3f}s p99={result['p99_s']:.3f}s"
+    )
+    for sample in result["error_samples"]:
+        print(f"    ! {sample}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge des pipelines ChefBot")
+    parser.add_argument("--scenario", default="all", choices=["all", *SCENARIO_INPUTS])
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--base-url", default=None, help="Serveur déjà lancé (sinon un serveur factice est démarré)")
+    parser.add_argument("--latency", default="fixed:0.05", help="Latence du serveur factice démarré")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--hedge-budget", type=float, default=None, help="Active le hedging avec ce budget (ex: 0.05)")
+    parser.add_argument("--question-cache", action="store_true",
+                        help="Garde le cache de questions d'ask_chef (désactivé par défaut : on mesure le LLM)")
+    parser.add_argument("--fast-path", action="store_true",
+                        help="Garde la voie rapide sans LLM de run_manual_loop (désactivée par défaut : on mesure le LLM)")
+    parser.add_argument("--profile-prompts", action="store_true", help="Tokens de prompt par point d'appel et par segment")
+    parser.add_argument("--output", default=None, help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    # Les clients sont créés à l'import des scripts : on configure l'environnement avant
+    os.environ["CHEFBOT_QUESTION_CACHE"] = "1" if args.question_cache else "0"
+    os.environ["CHEFBOT_FAST_PATH"] = "1" if args.fast_path else "0"
+    from cassette import LatencyModel
+    from mock_llm_server import MockLLMConfig, point_clients_to, start_server
+
+    base_url = args.base_url
+    if base_url is None:
+        config = MockLLMConfig.from_script(
+            latency=LatencyModel.parse(args.latency),
+            tokens_per_sec=args.tokens_per_sec,
+            error_rate=args.error_rate,
+        )
+        _, base_url = start_server(config)
+    point_clients_to(base_url)
+
+    if args.profile_prompts:
+        from llm_gateway import get_gateway
+        get_gateway().enable_profiling()
+
+    if args.hedge_budget is not None:
+        from hedging import HedgePolicy
+        from llm_gateway import get_gateway
+        get_gateway().enable_hedging(HedgePolicy(budget=args.hedge_budget))
+
+    scenarios = list(SCENARIO_INPUTS) if args.scenario == "all" else [args.scenario]
+    results = []
+    for scenario in scenarios:
+        result = run_load(scenario, args.concurrency, args.requests)
+        print_report(result)
+        results.append(result)
+
+    if args.hedge_budget is not None:
+        from hedging import print_hedging_report
+        from llm_gateway import get_gateway
+        print_hedging_report(get_gateway().hedging)
+
+    if args.profile_prompts:
+        from llm_gateway import get_gateway
+        from prompt_profiler import print_profile_report
+        print_profile_report(get_gateway().profiler)
+
+    if args.question_cache and "ask_chef" in scenarios:
+        from question_cache import print_cache_report
+        print_cache_report(load_script("01_chefbot.py").question_cache)
+
+    if args.fast_path and "manual_loop" in scenarios:
+        from fast_path import print_fast_path_report
+        print_fast_path_report(load_script("04_outils.py").fast_path)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
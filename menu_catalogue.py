@@ -0,0 +1,209 @@
+"""
+Catalogue du menu partagé (Partie 5)
+====================================
+Le menu est chargé une seule fois par processus depuis un fichier JSON ou une
+base SQLite, puis partagé entre tous les outils et agents sous forme
+d'instantanés immuables (snapshots).
+
+Quand la source change sur disque, un nouvel instantané est construit à côté
+de l'ancien puis échangé d'un coup (copy-on-write) : un appel en cours garde
+l'instantané qu'il a lu, les appels suivants voient le nouveau menu, sans
+redémarrage. Chaque instantané porte une version (hash du contenu) que les
+outils recopient dans leurs réponses.
+
+Format SQLite attendu :
+    CREATE TABLE dishes (nom TEXT, prix REAL, prep TEXT, allergenes TEXT, categorie TEXT)
+    -- allergenes : liste séparée par des virgules (ou tableau JSON)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+MIN_PARTIAL_MATCH = 3  # caractères minimum pour une recherche par inclusion ("" ou "a" ne désignent aucun plat)
+DEFAULT_MENU_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "menu.json")
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+
+class AmbiguousDishError(LookupError):
+    """Le nom partiel correspond à plusieurs plats du menu."""
+
+    def __init__(self, name: str, matches: list):
+        super().__init__(f"{name!r} correspond à plusieurs plats : {', '.join(matches)}")
+        self.name = name
+        self.matches = matches
+
+
+def normalize_dish_name(name: str) -> str:
+    """Clé de recherche d'un plat (insensible à la casse et aux espaces)."""
+    return " ".join(name.lower().split())
+
+
+@dataclass(frozen=True)
+class MenuSnapshot:
+    """Vue immuable du menu à un instant donné."""
+    version: str
+    loaded_at: float
+    dishes: tuple
+    by_name: Mapping
+
+    def find(self, name: str) -> Optional[Mapping]:
+        """Retrouve un plat par son nom exact, puis par inclusion partielle (au moins MIN_PARTIAL_MATCH
+        caractères). None si aucun plat ne correspond, AmbiguousDishError si plusieurs correspondent."""
+        key = normalize_dish_name(name or "")
+        dish = self.by_name.get(key)
+        if dish is not None or len(key) < MIN_PARTIAL_MATCH:
+            return dish
+        matches = [dish for dish_key, dish in self.by_name.items() if key in dish_key]
+        if len(matches) > 1:
+            raise AmbiguousDishError(name, [d["nom"] for d in matches])
+        return matches[0] if matches else None
+
+
+def _split_allergens(allergenes) -> list:
+    """'gluten, lait', '["gluten"]' ou une liste -> liste d'allergènes."""
+    if not allergenes:
+        return []
+    if isinstance(allergenes, str):
+        if allergenes.lstrip().startswith("["):
+            return json.loads(allergenes)
+        return [a.strip() for a in allergenes.split(",") if a.strip()]
+    return [str(a).strip() for a in allergenes if str(a).strip()]
+
+
+def _freeze_dish(raw: dict) -> Mapping:
+    """Plat immuable. KeyError / TypeError / ValueError si la ligne est invalide (nom ou prix manquant)."""
+    name = raw["nom"]
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError(f"nom de plat manquant ({name!r})")
+    return MappingProxyType({
+        "nom": name.strip(),
+        "prix": float(raw["prix"]),
+        "prep": str(raw.get("prep") or ""),
+        "allergenes": tuple(_split_allergens(raw.get("allergenes"))),
+        "categorie": str(raw.get("categorie") or ""),
+    })
+
+
+def _read_json(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _read_sqlite(path: str) -> list:
+    # Connexion en lecture seule : le catalogue ne modifie jamais la source
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("SELECT rowid, nom, prix, prep, allergenes, categorie FROM dishes").fetchall()
+    finally:
+        conn.close()
+
+    dishes = []
+    for rowid, nom, prix, prep, allergenes, categorie in rows:
+        dishes.append({"id": rowid, "nom": nom, "prix": prix, "prep": prep, "allergenes": allergenes,
+                       "categorie": categorie})
+    return dishes
+
+
+def build_snapshot(raw_dishes: list) -> MenuSnapshot:
+    """Construit un instantané immuable à partir d'une liste de dictionnaires.
+
+    Une ligne invalide (prix NULL, nom manquant...) est ignorée et signalée ; le reste du menu est gardé.
+    """
+    dishes = []
+    for index, raw in enumerate(raw_dishes, start=1):
+        try:
+            dishes.append(_freeze_dish(raw))
+        except (KeyError, TypeError, ValueError) as e:
+            row_id = raw.get("id", index) if isinstance(raw, dict) else index
+            print(f"[MENU] Plat ignoré (ligne {row_id}) : {type(e).__name__}: {e}")
+    dishes = tuple(dishes)
+    canonical = json.dumps([dict(d) for d in dishes], ensure_ascii=False, sort_keys=True)
+    version = hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:8]
+    by_name = MappingProxyType({normalize_dish_name(d["nom"]): d for d in dishes})
+    return MenuSnapshot(version=version, loaded_at=time.time(), dishes=dishes, by_name=by_name)
+
+
+class MenuCatalogue:
+    """Source unique du menu, rechargée à chaud quand le fichier change."""
+
+    def __init__(self, source: str = DEFAULT_MENU_PATH, check_interval: float = 1.0):
+        self.source = os.path.abspath(source)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = None
+        self._last_check = 0.0
+        self._snapshot = None
+        self.reload(force=True)
+
+    def _stat_signature(self):
+        st = os.stat(self.source)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self) -> list:
+        if self.source.lower().endswith(SQLITE_EXTENSIONS):
+            return _read_sqlite(self.source)
+        return _read_json(self.source)
+
+    def reload(self, force: bool = False) -> bool:
+        """Recharge la source si elle a changé. Retourne True si le menu a été échangé."""
+        with self._lock:
+            self._last_check = time.monotonic()
+            signature = self._stat_signature()
+            if not force and signature == self._signature:
+                return False
+
+            try:
+                snapshot = build_snapshot(self._load())
+            except Exception as e:
+                # Fichier en cours d'écriture ou invalide : on garde l'ancien menu
+                if self._snapshot is None:
+                    raise
+                print(f"[MENU] Rechargement ignoré ({e}), version {self._snapshot.version} conservée.")
+                return False
+
+            self._signature = signature
+            changed = self._snapshot is None or snapshot.version != self._snapshot.version
+            # Échange atomique de la référence : les lecteurs n'ont pas besoin du verrou
+            self._snapshot = snapshot
+            return changed
+
+    def snapshot(self) -> MenuSnapshot:
+        """Retourne l'instantané courant (vérifie la source au plus une fois par intervalle)."""
+        if time.monotonic() - self._last_check >= self.check_interval:
+            try:
+                self.reload()
+            except OSError as e:
+                print(f"[MENU] Source illisible ({e}), version {self._snapshot.version} conservée.")
+        return self._snapshot
+
+    @property
+    def version(self) -> str:
+        return self.snapshot().version
+
+
+# =============================================================================
+# CATALOGUE PARTAGÉ (un seul par source et par processus)
+# =============================================================================
+
+_catalogues = {}
+_catalogues_lock = threading.Lock()
+
+
+def get_catalogue(source: Optional[str] = None) -> MenuCatalogue:
+    """Retourne le catalogue partagé pour une source (par défaut $CHEFBOT_MENU_PATH ou data/menu.json)."""
+    path = os.path.abspath(source or os.environ.get("CHEFBOT_MENU_PATH", DEFAULT_MENU_PATH))
+    catalogue = _catalogues.get(path)
+    if catalogue is None:
+        with _catalogues_lock:
+            catalogue = _catalogues.get(path)
+            if catalogue is None:
+                catalogue = MenuCatalogue(path)
+                _catalogues[path] = catalogue
+    return catalogue
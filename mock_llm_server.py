@@ -0,0 +1,260 @@
+"""
+Serveur LLM factice compatible chat-completions (tests de charge)
+================================================================
+Remplace l'API Groq en local pour `Groq()` et pour les modèles litellm `groq/...` :
+
+    python mock_llm_server.py --port 8765 --latency lognormal:0.4,0.5 --tokens-per-sec 300 --error-rate 0.02
+
+    export GROQ_BASE_URL=http://127.0.0.1:8765             # client groq.Groq
+    export GROQ_API_BASE=http://127.0.0.1:8765/openai/v1   # litellm (LiteLLMModel)
+
+Fonctionnalités :
+- latence configurable (fixe ou log-normale, voir cassette.LatencyModel) ;
+- streaming SSE à un débit donné en tokens/seconde ;
+- injection d'erreurs 429 (avec en-tête retry-after) ;
+- réponses scriptées (texte, JSON, tool_calls) via un fichier de règles
+  (par défaut data/mock_llm_script.json). La première règle qui correspond gagne :
+      {"contains": "...", "has_tools": true, "has_tool_results": false,
+       "content": "..." | "json": {...} | "tool_calls": [{"name": ..., "arguments": {...}}]}
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cassette import LatencyModel
+
+DEFAULT_SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "mock_llm_script.json")
+DEFAULT_CONTENT = "Réponse simulée du serveur LLM local."
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+
+def count_tokens(text: str) -> int:
+    # Approximation suffisante pour un serveur de test (≈ 1 token par mot)
+    return max(1, len(text.split()))
+
+
+class MockLLMConfig:
+    def __init__(self, latency: LatencyModel = None, tokens_per_sec: float = 0.0, error_rate: float = 0.0,
+                 rules: list = None, seed: int = None):
+        self.latency = latency or LatencyModel()
+        self.tokens_per_sec = tokens_per_sec
+        self.error_rate = error_rate
+        self.rules = rules or []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "rate_limited": 0, "streamed": 0}
+
+    @classmethod
+    def from_script(cls, path: str = DEFAULT_SCRIPT_PATH, **kwargs) -> "MockLLMConfig":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(rules=json.load(f), **kwargs)
+
+    def should_rate_limit(self) -> bool:
+        with self._lock:
+            return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    def match(self, body: dict) -> dict:
+        messages = body.get("messages", [])
+        text = "\n".join(_message_text(m) for m in messages)
+        has_tools = bool(body.get("tools"))
+        has_tool_results = any(m.get("role") == "tool" for m in messages)
+
+        for rule in self.rules:
+            if "contains" in rule and rule["contains"] not in text:
+                continue
+            if "has_tools" in rule and rule["has_tools"] != has_tools:
+                continue
+            if "has_tool_results" in rule and rule["has_tool_results"] != has_tool_results:
+                continue
+            return rule
+        return {"content": DEFAULT_CONTENT}
+
+
+def build_message(rule: dict) -> dict:
+    if "tool_calls" in rule:
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments", {}))},
+                }
+                for call in rule["tool_calls"]
+            ],
+        }
+    if "json" in rule:
+        return {"role": "assistant", "content": json.dumps(rule["json"], ensure_ascii=False)}
+    return {"role": "assistant", "content": rule.get("content", DEFAULT_CONTENT)}
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: MockLLMConfig = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        config = self.config
+        with config._lock:
+            config.stats["requests"] += 1
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+
+        if config.should_rate_limit():
+            with config._lock:
+                config.stats["rate_limited"] += 1
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_exceeded", "code": "rate_limit_exceeded"}},
+                headers={"retry-after": "1"},
+            )
+            return
+
+        config.latency.sleep()
+        message = build_message(config.match(body))
+        prompt_tokens = sum(count_tokens(_message_text(m)) for m in body.get("messages", []))
+        completion_tokens = count_tokens(message["content"] or json.dumps(message.get("tool_calls")))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:16]}"
+        finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+
+        if body.get("stream"):
+            with config._lock:
+                config.stats["streamed"] += 1
+            self._stream(completion_id, body.get("model", "mock"), message, finish_reason, usage)
+            return
+
+        self._send_json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": usage,
+            # Champs propres à Groq, attendus par litellm
+            "service_tier": "on_demand",
+            "system_fingerprint": "mock",
+            "x_groq": {"id": completion_id},
+        })
+
+    def _stream(self, completion_id: str, model: str, message: dict, finish_reason: str, usage: dict):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def chunk(delta: dict, finish=None, with_usage=False):
+            payload = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                "service_tier": "on_demand",
+            }
+            if with_usage:
+                payload["usage"] = usage
+                payload["x_groq"] = {"usage": usage}
+            self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        chunk({"role": "assistant", "content": ""})
+        delay = 1.0 / self.config.tokens_per_sec if self.config.tokens_per_sec > 0 else 0.0
+        if message.get("tool_calls"):
+            for index, call in enumerate(message["tool_calls"]):
+                chunk({"tool_calls": [{"index": index, **call}]})
+        else:
+            # Découpage en "tokens" (mots + espaces) envoyés au débit demandé
+            words = (message["content"] or "").split(" ")
+            for i, word in enumerate(words):
+                if delay:
+                    time.sleep(delay)
+                chunk({"content": word if i == 0 else " " + word})
+        chunk({}, finish=finish_reason, with_usage=True)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def start_server(config: MockLLMConfig = None, host: str = "127.0.0.1", port: int = 0):
+    """Démarre le serveur dans un thread. Retourne (serveur, url de base)."""
+    config = config or MockLLMConfig.from_script()
+    handler = type("ConfiguredMockLLMHandler", (MockLLMHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def point_clients_to(base_url: str):
+    """Configure les variables d'environnement lues par groq.Groq et par litellm."""
+    os.environ["GROQ_BASE_URL"] = base_url
+    os.environ["GROQ_API_BASE"] = f"{base_url}/openai/v1"
+    os.environ.setdefault("GROQ_API_KEY", "mock-key")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur LLM factice compatible chat-completions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="none", help="'fixed:0.5' ou 'lognormal:0.4,0.5' (secondes)")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="Débit du streaming (0 = immédiat)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proportion de réponses 429")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT_PATH, help="Fichier JSON de règles de réponse")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = MockLLMConfig.from_script(
+        args.script,
+        latency=LatencyModel.parse(args.latency, seed=args.seed),
+        tokens_per_sec=args.tokens_per_sec,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    server, url = start_server(config, args.host, args.port)
+    print(f"Serveur LLM factice sur {url}")
+    print(f"  export GROQ_BASE_URL={url}")
+    print(f"  export GROQ_API_BASE={url}/openai/v1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"Arrêt. Statistiques : {config.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Routage des modèles par agent (Partie 6)
+========================================
+Chaque agent reçoit son propre niveau de modèle : les sous-agents triviaux
+(un outil, max_steps=2) tournent sur le 8B instantané, le manager sur le 70B.
+En cas d'échec transitoire (rate limit, timeout, erreur 5xx) ou de code
+illisible (AgentParsingError), l'agent passe automatiquement au niveau supérieur
+et y reste pour la suite du processus. Les autres erreurs (authentification,
+requête invalide, contexte trop long) sont relevées telles quelles.
+
+Latence, tokens et coût estimé sont comptés par agent et par modèle pour
+ajuster la table de routage.
+"""
+
+import os
+import threading
+import time
+
+from smolagents import LiteLLMModel
+from smolagents.memory import ActionStep
+from smolagents.models import Model
+from smolagents.utils import AgentParsingError
+
+from deadline import DeadlineExceeded
+
+MODEL_TIERS = {
+    "small": "groq/llama-3.1-8b-instant",
+    "large": "groq/llama-3.3-70b-versatile",
+}
+
+# Prix Groq en $ par million de tokens (entrée, sortie)
+MODEL_PRICES_PER_MTOK = {
+    "groq/llama-3.1-8b-instant": (0.05, 0.08),
+    "groq/llama-3.3-70b-versatile": (0.59, 0.79),
+}
+
+# Agent -> niveaux essayés dans l'ordre (escalade vers la droite)
+ROUTING_TABLE = {
+    "restaurant_manager": ["large"],
+    "chef_agent": ["small", "large"],
+    "nutritionist": ["small", "large"],
+    "budget_agent": ["small", "large"],
+}
+DEFAULT_ROUTE = ["large"]
+
+# Dernier modèle créé pour chaque agent (références fortes, ordre de première création gardé) :
+# le rapport survit à run_scenario, et un manager reconstruit remplace l'ancien au lieu de s'accumuler
+_routed_models = {}
+_routed_models_lock = threading.Lock()
+
+
+def estimate_cost(model_id: str, input_tokens: int, output_tokens: int) -> float:
+    price_in, price_out = MODEL_PRICES_PER_MTOK.get(model_id, (0.0, 0.0))
+    return (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Rate limit, timeout ou erreur serveur (5xx) : un autre modèle a une chance de répondre."""
+    while exc is not None:
+        if isinstance(exc, DeadlineExceeded):
+            # Budget de l'appelant épuisé : un plus gros modèle serait encore plus lent
+            return False
+        status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+        name = type(exc).__name__.lower()
+        if isinstance(status, int) and (status == 429 or status >= 500):
+            return True
+        if isinstance(exc, TimeoutError) or "ratelimit" in name or "timeout" in name:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+class RoutedModel(Model):
+    """Modèle d'un agent : démarre au premier niveau de sa route et escalade en cas de problème."""
+
+    def __init__(self, agent_name: str, model_ids: list, api_key: str = None, **model_kwargs):
+        super().__init__(model_id=model_ids[0])
+        self.agent_name = agent_name
+        self.model_ids = list(model_ids)
+        self.api_key = api_key or os.environ.get("GROQ_API_KEY")
+        self.model_kwargs = model_kwargs
+        self.tier = 0
+        self._models = {}
+        self.escalations = []
+        self.stats = {}
+
+    @property
+    def current(self) -> LiteLLMModel:
+        model_id = self.model_ids[self.tier]
+        if model_id not in self._models:
+            self._models[model_id] = LiteLLMModel(model_id=model_id, api_key=self.api_key, **self.model_kwargs)
+        return self._models[model_id]
+
+    def escalate(self, reason: str) -> bool:
+        """Passe au niveau suivant. Retourne False si on est déjà au plus gros modèle."""
+        if self.tier + 1 >= len(self.model_ids):
+            return False
+        self.escalations.append({"from": self.model_ids[self.tier], "to": self.model_ids[self.tier + 1], "reason": reason})
+        print(f"[ROUTING] {self.agent_name} : {self.model_ids[self.tier]} -> {self.model_ids[self.tier + 1]} ({reason})")
+        self.tier += 1
+        self.model_id = self.model_ids[self.tier]
+        return True
+
+    def _record(self, model_id: str, elapsed: float, response=None, failed: bool = False):
+        entry = self.stats.setdefault(model_id, {
+            "calls": 0, "failures": 0, "latency_s": 0.0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+        })
+        entry["calls"] += 1
+        entry["latency_s"] += elapsed
+        if failed:
+            entry["failures"] += 1
+            return
+        usage = getattr(response, "token_usage", None)
+        if usage is not None:
+            entry["input_tokens"] += usage.input_tokens
+            entry["output_tokens"] += usage.output_tokens
+            entry["cost_usd"] += estimate_cost(model_id, usage.input_tokens, usage.output_tokens)
+
+    def generate(self, messages, stop_sequences=None, response_format=None, tools_to_call_from=None, **kwargs):
+        while True:
+            model_id = self.model_ids[self.tier]
+            start = time.perf_counter()
+            try:
+                response = self.current.generate(
+                    messages,
+                    stop_sequences=stop_sequences,
+                    response_format=response_format,
+                    tools_to_call_from=tools_to_call_from,
+                    **kwargs,
+                )
+            except Exception as e:
+                self._record(model_id, time.perf_counter() - start, failed=True)
+                if not is_transient(e) or not self.escalate(f"échec d'appel : {type(e).__name__}"):
+                    raise
+                continue
+            self._record(model_id, time.perf_counter() - start, response)
+            return response
+
+    def generate_stream(self, *args, **kwargs):
+        # Pas d'escalade au milieu d'un flux : on délègue au niveau courant
+        return self.current.generate_stream(*args, **kwargs)
+
+    def parse_tool_calls(self, message):
+        return self.current.parse_tool_calls(message)
+
+    def report(self) -> dict:
+        totals = {"calls": 0, "failures": 0, "latency_s": 0.0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0}
+        for entry in self.stats.values():
+            for key in totals:
+                totals[key] += entry[key]
+        totals["latency_s"] = round(totals["latency_s"], 3)
+        totals["cost_usd"] = round(totals["cost_usd"], 6)
+        return {
+            "agent": self.agent_name,
+            "route": self.model_ids,
+            "current_model": self.model_id,
+            "escalations": list(self.escalations),
+            "by_model": self.stats,
+            **totals,
+        }
+
+
+def _escalate_on_parse_error(memory_step, agent=None):
+    """Step callback : du code illisible au petit modèle -> on passe au modèle supérieur."""
+    if agent is not None and isinstance(memory_step.error, AgentParsingError) and isinstance(agent.model, RoutedModel):
+        agent.model.escalate("erreur de parsing du code")
+
+
+def routed_model(agent_name: str, routing_table: dict = None, **model_kwargs) -> RoutedModel:
+    """Crée le modèle d'un agent selon la table de routage (niveaux ou identifiants de modèles)."""
+    table = routing_table or ROUTING_TABLE
+    route = [MODEL_TIERS.get(tier, tier) for tier in table.get(agent_name, DEFAULT_ROUTE)]
+    model = RoutedModel(agent_name, route, **model_kwargs)
+    with _routed_models_lock:
+        _routed_models[agent_name] = model
+    return model
+
+
+def enable_escalation(agent):
+    """Branche l'escalade sur erreur de parsing pour un agent dont le modèle est routé."""
+    agent.step_callbacks.register(ActionStep, _escalate_on_parse_error)
+    return agent
+
+
+def routing_report(models: list = None) -> list:
+    """Latence, tokens et coût par agent : `models`, sinon le dernier modèle routé de chaque agent."""
+    if models is None:
+        with _routed_models_lock:
+            models = list(_routed_models.values())
+    return [model.report() for model in models]
+
+
+def print_routing_report(models: list = None):
+    print(f"{'AGENT':<20}{'MODÈLE ACTUEL':<32}{'APPELS':>7}{'ÉCHECS':>8}{'LATENCE':>10}{'TOKENS':>9}{'COÛT $':>11}")
+    for entry in routing_report(models):
+        tokens = entry["input_tokens"] + entry["output_tokens"]
+        print(
+            f"{entry['agent']:<20}{entry['current_model']:<32}{entry['calls']:>7}{entry['failures']:>8}"
+            f"{entry['latency_s']:>9.2f}s{tokens:>9}{entry['cost_usd']:>11.5f}"
+        )
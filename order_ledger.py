@@ -0,0 +1,163 @@
+"""
+Note de commande par session (Partie 5.3)
+=========================================
+Au lieu de retrouver le plat choisi dans l'historique puis de recalculer
+l'addition avec `calculate`, l'agent inscrit chaque commande dans une note.
+Les prix viennent du catalogue partagé (menu_catalogue) et le total est tenu
+à jour à chaque ajout : "C'est combien ?" devient une simple lecture.
+"""
+
+import threading
+
+from smolagents import Tool
+
+from menu_catalogue import AmbiguousDishError, get_catalogue
+
+
+class OrderLedger:
+    """Lignes de commande d'une session, avec total maintenu de façon incrémentale."""
+
+    def __init__(self, session_id: str = "default", catalogue=None):
+        self.session_id = session_id
+        self.catalogue = catalogue or get_catalogue()
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.lines = {}
+            self._total = 0.0
+            self._items = 0
+
+    def add(self, dish: str, quantity: int = 1) -> dict:
+        """Ajoute `quantity` fois un plat du menu. Lève KeyError si le plat est inconnu, AmbiguousDishError
+        si le nom désigne plusieurs plats, ValueError si quantity < 1."""
+        if quantity < 1:
+            raise ValueError(f"Quantité invalide : {quantity}")
+        snapshot = self.catalogue.snapshot()
+        item = snapshot.find(dish)
+        if item is None:
+            raise KeyError(dish)
+
+        with self._lock:
+            line = self.lines.get(item["nom"])
+            if line is None:
+                # Le prix est figé au moment de la commande (version du menu notée)
+                line = {"nom": item["nom"], "prix": item["prix"], "quantite": 0, "menu_version": snapshot.version}
+                self.lines[item["nom"]] = line
+            line["quantite"] += quantity
+            self._total += line["prix"] * quantity
+            self._items += quantity
+            return dict(line)
+
+    def remove(self, dish: str, quantity: int = None) -> dict:
+        """Retire un plat (entièrement si `quantity` est None). Lève KeyError s'il n'est pas commandé,
+        ValueError si quantity < 1."""
+        if quantity is not None and quantity < 1:
+            raise ValueError(f"Quantité invalide : {quantity}")
+        snapshot = self.catalogue.snapshot()
+        item = snapshot.find(dish)
+        name = item["nom"] if item else dish
+
+        with self._lock:
+            line = self.lines[name]
+            removed = line["quantite"] if quantity is None else min(quantity, line["quantite"])
+            line["quantite"] -= removed
+            self._total -= line["prix"] * removed
+            self._items -= removed
+            if line["quantite"] == 0:
+                del self.lines[name]
+            return dict(line)
+
+    def total(self) -> float:
+        return round(self._total, 2)
+
+    def item_count(self) -> int:
+        return self._items
+
+    def summary(self) -> str:
+        if not self.lines:
+            return "La note est vide."
+        details = [f"- {l['quantite']} x {l['nom']} à {l['prix']:g}€ = {l['quantite'] * l['prix']:g}€" for l in self.lines.values()]
+        details.append(f"TOTAL : {self.total():g}€ ({self._items} article(s))")
+        return "\n".join(details)
+
+
+_ledgers = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_ledger(session_id: str = "default") -> OrderLedger:
+    """Retourne la note de la session (créée au premier accès)."""
+    with _ledgers_lock:
+        ledger = _ledgers.get(session_id)
+        if ledger is None:
+            ledger = OrderLedger(session_id)
+            _ledgers[session_id] = ledger
+        return ledger
+
+
+class OrderLedgerTool(Tool):
+    def __init__(self, ledger: OrderLedger):
+        self.name = "order_ledger"
+        self.description = (
+            "Note de commande du client. Utilise action='ajouter' quand le client choisit un plat, "
+            "action='retirer' s'il change d'avis, action='total' pour l'addition (plats, quantités et total en €)."
+        )
+        self.inputs = {
+            "action": {
+                "type": "string",
+                "description": "L'action : 'ajouter', 'retirer', 'total' ou 'vider'.",
+            },
+            "dish": {
+                "type": "string",
+                "description": "Nom du plat tel qu'il apparaît dans le menu (pour 'ajouter' et 'retirer').",
+                "nullable": True
+            },
+            "quantity": {
+                "type": "integer",
+                "description": "Nombre de portions (1 par défaut).",
+                "nullable": True
+            }
+        }
+        self.output_type = "string"
+        self.ledger = ledger
+        super().__init__()
+
+    def forward(self, action: str, dish: str = None, quantity: int = None) -> str:
+        action = action.lower().strip()
+
+        if action in ("ajouter", "add"):
+            if not dish:
+                return "Erreur: précisez le plat à ajouter."
+            try:
+                line = self.ledger.add(dish, 1 if quantity is None else int(quantity))
+            except AmbiguousDishError as e:
+                return f"Erreur: '{dish}' est ambigu, précisez parmi : {', '.join(e.matches)}."
+            except KeyError:
+                return f"Erreur: '{dish}' n'est pas au menu."
+            except ValueError:
+                return f"Erreur: quantité invalide '{quantity}' (au moins 1 portion)."
+            return f"Ajouté : {line['nom']} (x{line['quantite']}). Total actuel : {self.ledger.total():g}€"
+
+        if action in ("retirer", "remove"):
+            if not dish:
+                return "Erreur: précisez le plat à retirer."
+            try:
+                self.ledger.remove(dish, None if quantity is None else int(quantity))
+            except AmbiguousDishError as e:
+                return f"Erreur: '{dish}' est ambigu, précisez parmi : {', '.join(e.matches)}."
+            except KeyError:
+                return f"Erreur: '{dish}' n'est pas sur la note."
+            except ValueError:
+                return f"Erreur: quantité invalide '{quantity}' (au moins 1 portion)."
+            return f"Retiré : {dish}. Total actuel : {self.ledger.total():g}€"
+
+        if action in ("total", "addition"):
+            return self.ledger.summary()
+
+        if action in ("vider", "clear"):
+            self.ledger.clear()
+            return "La note a été vidée."
+
+        return f"Erreur: action inconnue '{action}'. Actions possibles : ajouter, retirer, total, vider."
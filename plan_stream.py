@@ -0,0 +1,180 @@
+"""
+Plan en streaming : exécuter l'étape 1 pendant que le modèle écrit les suivantes
+================================================================================
+Le planificateur (02_planification.py) renvoie `{"steps": ["...", "...", ...]}`.
+En mode "bufferisé", on attend le JSON complet avant la première `_execute_step`.
+Ici, la réponse est lue en streaming et analysée au fil de l'eau : chaque étape
+part vers l'exécuteur dès que sa chaîne se ferme, pendant que le modèle génère
+les étapes 2 à 4.
+
+- `StepStreamParser` : analyseur JSON incrémental (chaînes, échappements,
+  imbrication) qui ne décode que les éléments du tableau `steps` ; à la fin,
+  `finish()` relit le texte complet avec `json.loads` et vérifie que les étapes
+  émises sont exactement celles du mode bufferisé.
+- `StepStream` : lit le flux dans un thread et expose les étapes comme un
+  itérateur bloquant ; mesure le recouvrement entre génération du plan et
+  exécution des étapes.
+
+Configuration :
+    CHEFBOT_STREAM_PLAN=1     active le plan en streaming (désactivé avec une cassette,
+                              qui ne gère pas les réponses en streaming)
+"""
+
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+
+from cassette import CASSETTE_ENV
+
+_DONE = object()
+
+
+class StepStreamParser:
+    """Analyse un JSON reçu par morceaux et renvoie les éléments de `key` dès qu'ils sont complets."""
+
+    def __init__(self, key: str = "steps"):
+        self.key = key
+        self.text = ""
+        self.steps = []
+        self._pos = 0
+        self._stack = []          # conteneurs ouverts : "{" ou "["
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_key = None     # dernière chaîne lue dans l'objet racine
+        self._in_steps = False
+        self._item_start = None   # début de l'élément courant du tableau `key`
+
+    def _at_item_level(self) -> bool:
+        return self._in_steps and len(self._stack) == 2
+
+    def _emit(self, raw: str, new: list):
+        step = json.loads(raw)
+        self.steps.append(step)
+        new.append(step)
+        self._item_start = None
+
+    def feed(self, chunk: str) -> list:
+        """Ajoute un morceau de texte ; renvoie les étapes terminées dans ce morceau."""
+        self.text += chunk
+        text, new = self.text, []
+        for pos in range(self._pos, len(text)):
+            c = text[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    raw = text[self._string_start:pos + 1]
+                    if self._at_item_level() and self._item_start == self._string_start:
+                        # Une étape-chaîne est complète dès son guillemet fermant
+                        self._emit(raw, new)
+                    elif self._stack == ["{"]:
+                        self._last_key = json.loads(raw)
+                continue
+            if c.isspace() or c == ":":
+                continue
+            if self._at_item_level() and self._item_start is None and c not in ",]":
+                self._item_start = pos
+            if c == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif c in "{[":
+                self._stack.append(c)
+                if self._stack == ["{", "["] and self._last_key == self.key:
+                    self._in_steps = True
+            elif c in "}]":
+                if c == "]" and self._at_item_level():
+                    if self._item_start is not None:
+                        self._emit(text[self._item_start:pos].strip(), new)
+                    self._in_steps = False
+                if self._stack:
+                    self._stack.pop()
+            elif c == "," and self._at_item_level() and self._item_start is not None:
+                self._emit(text[self._item_start:pos].strip(), new)
+        self._pos = len(text)
+        return new
+
+    def finish(self) -> dict:
+        """JSON complet, tel que le lirait le mode bufferisé. ValueError si les étapes émises diffèrent."""
+        start, end = self.text.find("{"), self.text.rfind("}")
+        data = json.loads(self.text[start:end + 1] if start != -1 and end > start else self.text)
+        if data.get(self.key, []) != self.steps:
+            raise ValueError("Les étapes lues en streaming ne correspondent pas au JSON complet")
+        return data
+
+
+class StepStream:
+    """Étapes d'un plan en cours de génération, lues dans un thread.
+
+    `produce(on_step)` consomme le flux du modèle et appelle `on_step` pour chaque
+    étape complète ; il est exécuté dans le contexte de l'appelant (trace, deadline).
+    """
+
+    def __init__(self, produce):
+        self.plan = None
+        self.error = None
+        self.steps = []
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self._queue = queue.Queue()
+        self._windows = []
+        self._thread = threading.Thread(
+            target=contextvars.copy_context().run, args=(self._run, produce),
+            name="chefbot-plan-stream", daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self, produce):
+        try:
+            self.plan = produce(self._push)
+        except Exception as e:
+            # JSON invalide, étapes incohérentes ou erreur d'API : l'appelant repasse en mode bufferisé
+            self.error = e
+        finally:
+            self.finished_at = time.perf_counter()
+            self._queue.put(_DONE)
+
+    def _push(self, step):
+        self.steps.append(step)
+        self._queue.put(step)
+
+    def __iter__(self):
+        while True:
+            step = self._queue.get()
+            if step is _DONE:
+                return
+            yield step
+
+    def record_step(self, start: float, end: float):
+        """Fenêtre d'exécution d'une étape (time.perf_counter) pour le calcul du recouvrement."""
+        self._windows.append((start, end))
+
+    def report(self) -> dict:
+        end = self.finished_at or time.perf_counter()
+        overlap = sum(max(0.0, min(e, end) - s) for s, e in self._windows)
+        first = self._windows[0][0] - self.started_at if self._windows else None
+        return {
+            "plan_s": round(end - self.started_at, 3),
+            "first_step_at_s": None if first is None else round(first, 3),
+            "overlap_s": round(overlap, 3),
+            "steps_overlapped": sum(1 for s, _ in self._windows if s < end),
+        }
+
+
+def print_stream_report(report: dict):
+    print(
+        f"[STREAM] Plan généré en {report['plan_s']}s, 1re étape lancée à {report['first_step_at_s']}s, "
+        f"{report['steps_overlapped']} étape(s) pendant la génération : {report['overlap_s']}s gagnées"
+    )
+
+
+def streaming_enabled() -> bool:
+    if os.environ.get(CASSETTE_ENV):
+        return False
+    return os.environ.get("CHEFBOT_STREAM_PLAN", "0").lower() in ("1", "true", "on", "yes")
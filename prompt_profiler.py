@@ -0,0 +1,211 @@
+"""
+Profil de taille des prompts, par point d'appel
+===============================================
+Prérequis (optionnel) :
+    pip install tiktoken        # sinon estimation heuristique (~4-6 caractères par token)
+
+Branché sur la passerelle LLM (llm_gateway.LLMGateway.call), par où passent le
+client Groq des scripts et `litellm.completion` (LiteLLMModel de smolagents).
+Chaque requête sortante est tokenisée hors-ligne, avant l'envoi, et ses tokens
+sont répartis en segments :
+
+- system        : messages system (CHEF_JUDGE_PROMPT, prompts générés par smolagents...)
+- tool_schemas  : définitions `tools` envoyées avec la requête
+- history       : tours précédents (réponses de l'assistant, anciens messages utilisateur)
+- tool_results  : résultats d'outils (role "tool", observations smolagents)
+- user_input    : dernier message utilisateur
+
+Point d'appel : nom de l'agent smolagents qui appelle le modèle (agent:nutritionist),
+sinon la première fonction des scripts du dépôt dans la pile (07_boss.py:judge_chef_response).
+
+    CHEFBOT_PROMPT_PROFILE=1 python 06_multi-agent.py     # rapport affiché en fin de processus
+    python load_test.py --scenario all --profile-prompts
+"""
+
+import atexit
+import json
+import os
+import re
+import sys
+import threading
+from collections import defaultdict
+
+SEGMENTS = ("system", "tool_schemas", "history", "tool_results", "user_input")
+MESSAGE_OVERHEAD = 4      # balises de rôle / séparateurs du format chat, par message
+_TOOL_RESULT_PREFIXES = ("Observation:", "Error:", "Call id:")
+_WORDS = re.compile(r"\w+|[^\w\s]")
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+# Modules d'infrastructure traversés par tous les appels : jamais un point d'appel
+_INFRA = {"llm_gateway.py", "prompt_profiler.py", "hedging.py", "cassette.py", "tracing.py", "deadline.py",
+          "model_routing.py", "instrumentation.py", "fan_out.py"}
+
+
+def _load_encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Vocabulaire non téléchargeable (hors-ligne) : on garde l'heuristique
+        return None
+
+
+class TokenCounter:
+    """tiktoken (cl100k_base) si disponible, sinon heuristique mots / ponctuation."""
+
+    def __init__(self):
+        self._encoding = _load_encoding()
+        self.exact = self._encoding is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        # Un mot court = 1 token, puis 1 token de plus tous les 6 caractères ; ponctuation = 1
+        return sum(1 + (len(w) - 1) // 6 for w in _WORDS.findall(text))
+
+
+def _text(content) -> str:
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return str(content)
+
+
+def _field(message, name):
+    return message.get(name) if isinstance(message, dict) else getattr(message, name, None)
+
+
+def _role(message) -> str:
+    # "user", ou MessageRole.USER de smolagents
+    return str(_field(message, "role") or "").split(".")[-1].lower()
+
+
+def split_request(kwargs: dict) -> dict:
+    """{segment: [textes]} d'une requête chat-completions."""
+    segments = {name: [] for name in SEGMENTS}
+    tools = kwargs.get("tools")
+    if tools:
+        segments["tool_schemas"].append(json.dumps(tools, ensure_ascii=False, default=str))
+
+    messages = list(kwargs.get("messages") or [])
+    last_user = None
+    for i, message in enumerate(messages):
+        if _role(message) == "user" and not _text(_field(message, "content")).lstrip().startswith(_TOOL_RESULT_PREFIXES):
+            last_user = i
+
+    for i, message in enumerate(messages):
+        role = _role(message)
+        text = _text(_field(message, "content"))
+        tool_calls = _field(message, "tool_calls")
+        if tool_calls:
+            text += json.dumps(tool_calls, ensure_ascii=False, default=str)
+        if role in ("system", "developer"):
+            segment = "system"
+        elif role in ("tool", "tool-response", "tool_response") or text.lstrip().startswith(_TOOL_RESULT_PREFIXES):
+            segment = "tool_results"
+        elif i == last_user:
+            segment = "user_input"
+        else:
+            segment = "history"
+        segments[segment].append(text)
+    return segments
+
+
+def call_site() -> str:
+    """Agent smolagents appelant, sinon première fonction d'un script du dépôt dans la pile."""
+    frame = sys._getframe(1)
+    repo_frame = None
+    while frame is not None:
+        owner = frame.f_locals.get("self")
+        if owner is not None and type(owner).__module__.startswith("smolagents.agents"):
+            return f"agent:{getattr(owner, 'name', None) or type(owner).__name__}"
+        filename = frame.f_code.co_filename
+        if repo_frame is None and os.path.dirname(os.path.abspath(filename)) == _ROOT \
+                and os.path.basename(filename) not in _INFRA:
+            repo_frame = f"{os.path.basename(filename)}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return repo_frame or "?"
+
+
+class PromptProfiler:
+    """Agrège les tokens de prompt par point d'appel et par segment."""
+
+    def __init__(self, counter: TokenCounter = None):
+        self.counter = counter or TokenCounter()
+        self._lock = threading.Lock()
+        self._sites = defaultdict(lambda: {"calls": 0, "tokens": 0, "max": 0, "models": set(),
+                                           "segments": dict.fromkeys(SEGMENTS, 0)})
+
+    def observe(self, source: str, kwargs: dict, site: str = None) -> dict:
+        """Tokenise une requête sortante et l'ajoute au profil. Renvoie {segment: tokens}."""
+        site = site or call_site()
+        counts = {}
+        for segment, texts in split_request(kwargs).items():
+            counts[segment] = sum(self.counter.count(t) for t in texts)
+            if segment != "tool_schemas":
+                counts[segment] += MESSAGE_OVERHEAD * len(texts)
+        total = sum(counts.values())
+        with self._lock:
+            stats = self._sites[site]
+            stats["calls"] += 1
+            stats["tokens"] += total
+            stats["max"] = max(stats["max"], total)
+            stats["models"].add(f"{source}:{kwargs.get('model', '?')}")
+            for segment, tokens in counts.items():
+                stats["segments"][segment] += tokens
+        return counts
+
+    def reset(self):
+        with self._lock:
+            self._sites.clear()
+
+    def report(self) -> list:
+        """Points d'appel triés par tokens de prompt cumulés (le plus gros gisement d'abord)."""
+        with self._lock:
+            rows = [
+                {
+                    "site": site,
+                    "calls": s["calls"],
+                    "tokens": s["tokens"],
+                    "avg_tokens": round(s["tokens"] / s["calls"], 1),
+                    "max_tokens": s["max"],
+                    "models": sorted(s["models"]),
+                    "segments": dict(s["segments"]),
+                }
+                for site, s in self._sites.items()
+            ]
+        return sorted(rows, key=lambda row: row["tokens"], reverse=True)
+
+
+def print_profile_report(profiler: PromptProfiler, top: int = 15):
+    rows = profiler.report()
+    grand_total = sum(row["tokens"] for row in rows)
+    method = "tiktoken cl100k_base" if profiler.counter.exact else "estimation heuristique"
+    print(f"[PROMPTS] {sum(r['calls'] for r in rows)} appels, {grand_total} tokens de prompt ({method})")
+    for row in rows[:top]:
+        share = row["tokens"] / grand_total if grand_total else 0.0
+        parts = ", ".join(
+            f"{segment} {tokens / row['tokens']:.0%}"
+            for segment, tokens in sorted(row["segments"].items(), key=lambda item: -item[1])
+            if tokens and row["tokens"]
+        )
+        print(
+            f"  {row['site']:<42} {row['calls']:>4} appels  moy {row['avg_tokens']:>8.1f}  max {row['max_tokens']:>6}  "
+            f"total {row['tokens']:>8} ({share:.0%})  [{parts}]"
+        )
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get("CHEFBOT_PROMPT_PROFILE", "0").lower() in ("1", "true", "on", "yes")
+
+
+def print_at_exit(profiler: PromptProfiler):
+    atexit.register(lambda: profiler.report() and print_profile_report(profiler))
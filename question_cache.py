@@ -0,0 +1,234 @@
+"""
+Cache des questions quasi identiques (MinHash / LSH)
+===================================================
+"quick easy dinner ideas?" et "fast simple meals for dinner?" sont la même
+question : la seconde peut recevoir la réponse déjà calculée pour la première
+au lieu de repartir trois fois vers le modèle 120B.
+
+- Normalisation : minuscules, accents et ponctuation retirés, mots vides FR/EN
+  supprimés, pluriels ramenés au singulier, synonymes courants ramenés à un mot
+  canonique (fast/rapide -> quick, meals/repas -> dish...).
+- Traits d'une question : ses mots normalisés + les 4-grammes de caractères de
+  chaque mot (tolérance aux fautes de frappe).
+- Clés strictes : négations et "avec" liées au mot qui suit (sans gluten ->
+  -gluten, with garlic -> +garlic, gluten free -> -gluten), nombres et
+  ingrédients cités (base d'ingrédients). Elles doivent être identiques avant
+  toute comparaison de Jaccard : "sans gluten" et "avec gluten", "2 personnes"
+  et "20 personnes", "leftover pasta" et "leftover rice" ne partagent jamais de réponse.
+- Index : signature MinHash (64 permutations) découpée en 16 bandes de 4 ; deux
+  questions partageant une bande sont candidates, puis la similarité de Jaccard
+  exacte des traits est comparée au seuil (0.6 par défaut).
+- Éviction LRU au-delà de `max_entries` ; compteurs hits / misses / évictions.
+
+Configuration :
+    CHEFBOT_QUESTION_CACHE=0                 désactive le cache
+    CHEFBOT_QUESTION_CACHE_THRESHOLD=0.6     similarité minimale pour servir une réponse
+    CHEFBOT_QUESTION_CACHE_SIZE=1024         nombre de questions gardées
+"""
+
+import hashlib
+import os
+import random
+import threading
+from collections import OrderedDict
+
+from ingredient_kb import fold, get_kb
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE = 4
+_MERSENNE = (1 << 61) - 1
+
+STOPWORDS = frozenset("""
+a an the and or of for to in on at my me i we you can could would should some any what which how is are do does
+give suggest suggestion suggestions idea ideas please make cook
+le la les un une des de du d l et ou pour a au aux en mon ma mes je tu on nous vous quel quelle quels quelles
+est sont peux peut pourrais faire cuisiner donne donner propose proposer idee idees suggestion svp
+""".split())
+
+# Mots de polarité : jamais des mots vides, ils changent le sens de la question
+NEGATIONS = frozenset({"sans", "without", "no", "not", "pas", "ni", "nor", "aucun", "aucune", "never", "jamais"})
+POSITIVES = frozenset({"avec", "with"})
+POSTFIX_NEGATIONS = frozenset({"free"})  # "gluten free"
+NUMBER_WORDS = {
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5", "six": "6", "seven": "7", "eight": "8",
+    "nine": "9", "ten": "10", "twelve": "12", "twenty": "20",
+    "un": "1", "une": "1", "deux": "2", "trois": "3", "quatre": "4", "cinq": "5", "sept": "7", "huit": "8",
+    "neuf": "9", "dix": "10", "douze": "12", "vingt": "20",
+}
+_POLARITY = NEGATIONS | POSITIVES | POSTFIX_NEGATIONS
+
+SYNONYMS = {
+    "fast": "quick", "rapid": "quick", "rapide": "quick", "vite": "quick", "speedy": "quick",
+    "simple": "easy", "facile": "easy", "effortless": "easy",
+    "meal": "dish", "recipe": "dish", "repas": "dish", "plat": "dish", "recette": "dish",
+    "supper": "dinner", "diner": "dinner", "souper": "dinner",
+    "dejeuner": "lunch",
+    "cheap": "budget", "inexpensive": "budget", "economique": "budget",
+    "veggie": "vegetarian", "vegetarien": "vegetarian", "vegetarienne": "vegetarian",
+}
+
+
+def _singular(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word[-1] in "sx" and not word.endswith("ss") else word
+
+
+def normalize(question: str) -> list:
+    """Mots canoniques d'une question, dans l'ordre (sans doublons)."""
+    words = []
+    for word in fold(question).split():
+        if word in STOPWORDS:
+            continue
+        word = SYNONYMS.get(word) or SYNONYMS.get(_singular(word)) or _singular(word)
+        if word not in words:
+            words.append(word)
+    return words
+
+
+def hard_key(question: str) -> frozenset:
+    """Négations / "avec" liées au mot suivant, nombres et ingrédients : doivent être identiques pour servir une réponse."""
+    words = fold(question).split()
+    # "beef ribs" / "pork ribs" : un seul mot d'écart, mais jamais la même réponse
+    key = {f"@{i}" for i in get_kb().find_in_text(question)}
+    for i, word in enumerate(words):
+        if word.isdigit():
+            key.add(str(int(word)))
+        elif word in NUMBER_WORDS and word not in ("un", "une"):
+            # "un"/"une" sont surtout des articles
+            key.add(NUMBER_WORDS[word])
+        elif word in NEGATIONS or word in POSITIVES:
+            sign = "-" if word in NEGATIONS else "+"
+            following = next((w for w in words[i + 1:] if w not in STOPWORDS and w not in _POLARITY), "")
+            key.add(sign + _singular(SYNONYMS.get(following, following)))
+        elif word in POSTFIX_NEGATIONS and i > 0:
+            key.add("-" + _singular(SYNONYMS.get(words[i - 1], words[i - 1])))
+    return frozenset(key)
+
+
+def features(question: str) -> frozenset:
+    words = normalize(question)
+    # Pas de n-grammes pour les nombres et les mots de polarité : "2" / "20", "with" / "without" restent distincts
+    grams = {
+        f"#{w[i:i + SHINGLE]}"
+        for w in words if len(w) > SHINGLE and not w.isdigit() and w not in _POLARITY
+        for i in range(len(w) - SHINGLE + 1)
+    }
+    return frozenset(words) | grams
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self.params = [(rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE)) for _ in range(num_perm)]
+
+    def signature(self, feature_set: frozenset) -> tuple:
+        hashes = [int.from_bytes(hashlib.blake2b(f.encode(), digest_size=8).digest(), "little") for f in feature_set]
+        if not hashes:
+            return (0,) * len(self.params)
+        return tuple(min((a * h + b) % _MERSENNE for h in hashes) for a, b in self.params)
+
+
+class QuestionCache:
+    """Cache LRU de réponses indexé par similarité de questions (MinHash + LSH en bandes)."""
+
+    def __init__(self, threshold: float = 0.6, max_entries: int = 1024, num_perm: int = NUM_PERM, bands: int = BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple de bands")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._entries = OrderedDict()  # id -> (question, traits, clés de bandes, réponse, clé stricte)
+        self._buckets = {}             # (bande, valeurs) -> ids
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls) -> "QuestionCache":
+        return cls(
+            threshold=float(os.environ.get("CHEFBOT_QUESTION_CACHE_THRESHOLD", 0.6)),
+            max_entries=int(os.environ.get("CHEFBOT_QUESTION_CACHE_SIZE", 1024)),
+        )
+
+    def _band_keys(self, signature: tuple) -> list:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def lookup(self, question: str):
+        """(réponse, similarité, question stockée) de la plus proche question au-dessus du seuil, sinon None."""
+        feature_set, hard = features(question), hard_key(question)
+        keys = self._band_keys(self.hasher.signature(feature_set))
+        with self._lock:
+            self.stats["lookups"] += 1
+            candidates = set()
+            for key in keys:
+                candidates |= self._buckets.get(key, set())
+            best, best_score = None, self.threshold
+            for entry_id in candidates:
+                if self._entries[entry_id][4] != hard:
+                    continue
+                score = jaccard(feature_set, self._entries[entry_id][1])
+                if score >= best_score:
+                    best, best_score = entry_id, score
+            if best is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self._entries.move_to_end(best)
+            stored_question, _, _, answer, _ = self._entries[best]
+            return answer, best_score, stored_question
+
+    def store(self, question: str, answer):
+        feature_set = features(question)
+        keys = self._band_keys(self.hasher.signature(feature_set))
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (question, feature_set, keys, answer, hard_key(question))
+            for key in keys:
+                self._buckets.setdefault(key, set()).add(entry_id)
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        entry_id, (_, _, keys, _, _) = self._entries.popitem(last=False)
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+        self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def report(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        stats["hit_rate"] = round(stats["hits"] / stats["lookups"], 4) if stats["lookups"] else 0.0
+        return stats
+
+
+def print_cache_report(cache: QuestionCache):
+    report = cache.report()
+    print(
+        f"[CACHE QUESTIONS] {report['lookups']} recherches, {report['hits']} hits ({report['hit_rate']:.1%}), "
+        f"{report['entries']} questions gardées, {report['evictions']} évictions (seuil {cache.threshold:g})"
+    )
+
+
+def cache_enabled() -> bool:
+    return os.environ.get("CHEFBOT_QUESTION_CACHE", "1").lower() not in ("0", "false", "off", "no")
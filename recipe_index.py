@@ -0,0 +1,500 @@
+"""
+Index plein texte des recettes (recherche BM25 + filtres)
+=========================================================
+Prérequis:
+    pip install numpy
+
+Le corpus est un fichier JSONL (data/recipes.jsonl ou $CHEFBOT_RECIPES_PATH),
+une recette par ligne :
+    {"id": "r001", "nom": "...", "categorie": "entrée", "description": "...",
+     "ingredients": [["saumon", 160, "g"], ["citron", 0.25, ""]]}
+
+L'index est construit une fois à côté du corpus (répertoire `<corpus>.idx/`)
+puis ouvert en mémoire mappée (np.load(mmap_mode="r")) : le démarrage ne lit
+que le vocabulaire, les postings et les facettes restent sur disque et sont
+paginés à la demande. Il est reconstruit automatiquement quand le corpus ou la
+base d'ingrédients change.
+
+- Analyse : minuscules, accents retirés, mots vides FR/EN, racinisation
+  française légère (pluriels, féminins, finales en -er/-e, consonnes doublées).
+  Le nom de la recette compte double ; les ingrédients sont indexés en FR et EN.
+- Classement : BM25 (k1=1.2, b=0.75), calculé en NumPy sur les postings des
+  termes de la requête.
+- Facettes (calculées avec ingredient_kb et costing) : régimes compatibles,
+  allergènes, type de plat et coût matière par portion. Une recette avec un
+  ingrédient inconnu n'a ni régime garanti ni allergènes sûrs : elle est
+  exclue dès qu'un allergène est à éviter.
+
+Les contraintes exprimées en langage naturel sont reconnues dans la requête :
+    search("entrée végétarienne sans gluten moins de 3€")
+    -> termes: [] ; filtres: course=entrée, diets=vegetarian, sans gluten, coût <= 3€
+
+    python recipe_index.py build            # (re)construit l'index
+    python recipe_index.py search "plat vegan aux pois chiches"
+"""
+
+import argparse
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import sys
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from costing import get_engine
+from ingredient_kb import ALL_DIETS, DIETS, fold, get_kb
+
+DEFAULT_RECIPES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "recipes.jsonl")
+INDEX_VERSION = 3
+K1 = 1.2
+B = 0.75
+NAME_WEIGHT = 2
+
+COURSES = ("entrée", "plat", "dessert")
+
+# =============================================================================
+# ANALYSE DU TEXTE
+# =============================================================================
+
+STOPWORDS = frozenset("""
+a au aux avec ce ces dans de des du en et la le les leur ma mes mon ou par pas pour sa se ses son sur ta tes ton un une
+d l j m n s t qu que qui quoi est sont plus tres
+the an and or of with for in on to my our some any from is are
+recette recettes idee idees suggestion suggestions recipe recipes idea ideas dish dishes
+je veux voudrais cherche propose proposer want need looking menu repas diner dejeuner personnes personne people
+""".split())
+
+
+def stem(word: str) -> str:
+    """Racinisation française légère (mot déjà sans accents) : 'courgettes' et 'courgette' -> 'courget'."""
+    if len(word) > 3 and word[-1] in "sx":
+        word = word[:-1]
+    # gateau / gateaux et animal / animaux : même racine en -au
+    if len(word) > 4 and word.endswith("al"):
+        word = word[:-2] + "au"
+    if len(word) > 4 and word.endswith("r"):
+        word = word[:-1]
+    while len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    if len(word) > 4 and word[-1] == word[-2] and word[-1].isalpha():
+        word = word[:-1]
+    return word
+
+
+def analyze(text: str) -> list:
+    return [stem(token) for token in fold(text).split() if token not in STOPWORDS]
+
+
+# =============================================================================
+# CONTRAINTES EN LANGAGE NATUREL
+# =============================================================================
+
+_DIET_WORDS = {
+    "vegetarien": "vegetarian", "vegetarienne": "vegetarian", "vegetariens": "vegetarian", "vegetariennes": "vegetarian",
+    "vegetarian": "vegetarian", "veggie": "vegetarian",
+    "vegan": "vegan", "vegane": "vegan", "vegans": "vegan", "vegetalien": "vegan", "vegetalienne": "vegan",
+    "halal": "no_pork_alcohol",
+}
+_COURSE_WORDS = {
+    "entree": "entrée", "entrees": "entrée", "starter": "entrée", "starters": "entrée", "appetizer": "entrée",
+    "plat": "plat", "plats": "plat", "main": "plat", "mains": "plat",
+    "dessert": "dessert", "desserts": "dessert",
+}
+# Mot après "sans" / "without" / "allergique aux" -> allergènes exclus
+_ALLERGEN_WORDS = {
+    "gluten": ("gluten",), "ble": ("gluten",), "wheat": ("gluten",),
+    "lactose": ("lait",), "lait": ("lait",), "produits laitiers": ("lait",), "dairy": ("lait",), "milk": ("lait",),
+    "oeuf": ("oeuf",), "oeufs": ("oeuf",), "egg": ("oeuf",), "eggs": ("oeuf",),
+    "poisson": ("poisson",), "poissons": ("poisson",), "fish": ("poisson",),
+    "fruits de mer": ("crustaces", "mollusques"), "seafood": ("crustaces", "mollusques"),
+    "crustaces": ("crustaces",), "shellfish": ("crustaces",), "mollusques": ("mollusques",),
+    "fruits a coque": ("fruits_a_coque",), "fruit a coque": ("fruits_a_coque",), "noix": ("fruits_a_coque",),
+    "noisettes": ("fruits_a_coque",), "amandes": ("fruits_a_coque",), "nuts": ("fruits_a_coque",), "tree nuts": ("fruits_a_coque",),
+    "arachide": ("arachides",), "arachides": ("arachides",), "cacahuetes": ("arachides",), "peanuts": ("arachides",), "peanut": ("arachides",),
+    "soja": ("soja",), "soy": ("soja",), "sesame": ("sesame",), "moutarde": ("moutarde",), "mustard": ("moutarde",),
+    "celeri": ("celeri",), "celery": ("celeri",), "sulfites": ("sulfites",), "lupin": ("lupin",),
+    "porc": ("porc",), "pork": ("porc",), "alcool": ("alcool",), "alcohol": ("alcool",),
+    "viande": ("viande",), "meat": ("viande",),
+}
+# Exclusions qui sont des régimes et non des allergènes
+_DIET_EXCLUSIONS = {"porc": "no_pork_alcohol", "alcool": "no_pork_alcohol", "viande": "vegetarian"}
+_MAX_ALLERGEN_WORDS = max(len(key.split()) for key in _ALLERGEN_WORDS)
+_NEGATIONS = {"sans", "ni", "without", "no", "nor", "allergique", "allergiques", "allergic", "intolerant", "intolerante"}
+_FILLERS = {"aux", "au", "a", "la", "le", "les", "de", "des", "du", "to", "d"}
+_MAX_COST = re.compile(
+    r"(?:moins de|max(?:imum)?|under|less than|<=?|budget(?: de)?|≤)\s*(\d+(?:[.,]\d+)?)\s*(?:€|eur|euros?)",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class Filters:
+    course: Optional[str] = None
+    diets: set = field(default_factory=set)
+    exclude_allergens: set = field(default_factory=set)
+    max_cost: Optional[float] = None
+
+    def describe(self) -> str:
+        parts = []
+        if self.course:
+            parts.append(self.course)
+        parts += sorted(self.diets)
+        parts += [f"sans {a}" for a in sorted(self.exclude_allergens)]
+        if self.max_cost is not None:
+            parts.append(f"coût <= {self.max_cost:g}€/portion")
+        return ", ".join(parts) or "aucun"
+
+
+def parse_query(query: str):
+    """Sépare une requête en termes de recherche et en filtres (régime, allergènes, type de plat, coût)."""
+    filters = Filters()
+    match = _MAX_COST.search(query)
+    if match:
+        filters.max_cost = float(match.group(1).replace(",", "."))
+        query = query[:match.start()] + " " + query[match.end():]
+
+    words = fold(query).split()
+    terms, i = [], 0
+    while i < len(words):
+        word = words[i]
+        if word in _NEGATIONS:
+            j = i + 1
+            while j < len(words) and words[j] in _FILLERS:
+                j += 1
+            for size in range(_MAX_ALLERGEN_WORDS, 0, -1):
+                key = " ".join(words[j:j + size])
+                if key in _ALLERGEN_WORDS:
+                    filters.exclude_allergens.update(_ALLERGEN_WORDS[key])
+                    i = j + size
+                    break
+            else:
+                # "sans sucre" : exclusion non reconnue, le mot exclu ne devient pas un terme recherché
+                i = j + 1
+            continue
+        if word in _DIET_WORDS:
+            filters.diets.add(_DIET_WORDS[word])
+        elif word in _COURSE_WORDS:
+            filters.course = _COURSE_WORDS[word]
+        elif word == "gluten" and i + 1 < len(words) and words[i + 1] == "free":
+            filters.exclude_allergens.add("gluten")
+            i += 1
+        elif word not in STOPWORDS:
+            terms.append(stem(word))
+        i += 1
+
+    for marker, diet in _DIET_EXCLUSIONS.items():
+        if marker in filters.exclude_allergens:
+            filters.exclude_allergens.discard(marker)
+            filters.diets.add(diet)
+    return terms, filters
+
+
+# =============================================================================
+# CONSTRUCTION
+# =============================================================================
+
+_ARRAYS = ("postings_docs", "postings_tf", "doc_len", "offsets", "diet", "allergens", "allergens_unknown", "course", "cost")
+
+
+def _signature(path: str) -> list:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _kb_path() -> str:
+    from ingredient_kb import DEFAULT_INGREDIENTS_PATH
+    return os.path.abspath(os.environ.get("CHEFBOT_INGREDIENTS_PATH", DEFAULT_INGREDIENTS_PATH))
+
+
+def build_index(corpus_path: str, index_dir: Optional[str] = None) -> str:
+    """Construit l'index du corpus (écriture dans un répertoire temporaire puis échange)."""
+    corpus_path = os.path.abspath(corpus_path)
+    index_dir = index_dir or corpus_path + ".idx"
+    kb = get_kb()
+
+    offsets, recipes, doc_terms = [], [], []
+    with open(corpus_path, "rb") as f:
+        offset = 0
+        for raw in f:
+            if raw.strip():
+                recipe = json.loads(raw)
+                offsets.append(offset)
+                recipes.append(recipe)
+                ingredient_ids = [kb.lookup(name) for name, _, _ in recipe["ingredients"]]
+                ingredient_text = " ".join(
+                    name if i is None else f"{name} {kb.names_fr[i]} {kb.names[i]}"
+                    for (name, _, _), i in zip(recipe["ingredients"], ingredient_ids)
+                )
+                terms = analyze(recipe["nom"]) * NAME_WEIGHT + analyze(recipe.get("description", "")) + analyze(ingredient_text)
+                doc_terms.append((Counter(terms), len(terms), ingredient_ids))
+            offset += len(raw)
+        offsets.append(offset)
+
+    # Postings triés par terme, puis par document
+    postings = {}
+    for doc, (counts, _, _) in enumerate(doc_terms):
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((doc, tf))
+    vocabulary, docs, tfs = {}, [], []
+    for term in sorted(postings):
+        entries = postings[term]
+        vocabulary[term] = [len(docs), len(entries)]
+        docs.extend(doc for doc, _ in entries)
+        tfs.extend(tf for _, tf in entries)
+
+    # Facettes : régimes (ET), allergènes (OU) ; un ingrédient inconnu n'offre aucune garantie
+    # de régime et rend la liste d'allergènes incomplète
+    diet = np.zeros(len(recipes), dtype=np.uint8)
+    allergens = np.zeros(len(recipes), dtype=np.uint16)
+    allergens_unknown = np.zeros(len(recipes), dtype=np.uint8)
+    for doc, (_, _, ingredient_ids) in enumerate(doc_terms):
+        diet_mask, allergen_mask = ALL_DIETS, 0
+        for i in ingredient_ids:
+            if i is None:
+                diet_mask = 0
+                allergens_unknown[doc] = 1
+            else:
+                diet_mask &= kb.diet_mask[i]
+                allergen_mask |= kb.allergen_mask[i]
+        diet[doc], allergens[doc] = diet_mask, allergen_mask
+    costs, incomplete = get_engine(kb).cost_recipes([recipe["ingredients"] for recipe in recipes])
+    # Coût inconnu : NaN, la recette ne passe jamais un filtre de coût
+    cost = np.where(incomplete, np.nan, costs).astype(np.float32)
+    course = np.array([
+        COURSES.index(recipe["categorie"]) if recipe.get("categorie") in COURSES else 255 for recipe in recipes
+    ], dtype=np.uint8)
+
+    arrays = {
+        "postings_docs": np.array(docs, dtype=np.uint32),
+        "postings_tf": np.array(tfs, dtype=np.uint16),
+        "doc_len": np.array([length for _, length, _ in doc_terms], dtype=np.uint16),
+        "offsets": np.array(offsets, dtype=np.uint64),
+        "diet": diet,
+        "allergens": allergens,
+        "allergens_unknown": allergens_unknown,
+        "course": course,
+        "cost": cost,
+    }
+    meta = {
+        "version": INDEX_VERSION,
+        "corpus": _signature(corpus_path),
+        "ingredients": _signature(_kb_path()),
+        "n_docs": len(recipes),
+        "avg_doc_len": float(arrays["doc_len"].mean()) if recipes else 0.0,
+        "allergens": list(kb.allergen_names),
+        "vocabulary": vocabulary,
+    }
+
+    tmp_dir = f"{index_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    # Échange : un lecteur déjà ouvert garde ses fichiers mappés (inodes conservés sous POSIX)
+    old_dir = f"{index_dir}.old-{os.getpid()}"
+    if os.path.isdir(index_dir):
+        os.replace(index_dir, old_dir)
+    os.replace(tmp_dir, index_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return index_dir
+
+
+# =============================================================================
+# RECHERCHE
+# =============================================================================
+
+@dataclass(frozen=True)
+class RecipeHit:
+    id: str
+    nom: str
+    categorie: str
+    score: float
+    cost: Optional[float]
+    diets: tuple
+    allergens: tuple
+    allergens_known: bool  # False : ingrédient inconnu, `allergens` est un minimum
+    ingredients: tuple
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    hits: tuple
+    matches: int  # Recettes qui passent les filtres (et contiennent au moins un terme)
+    terms: tuple
+    filters: Filters
+
+
+class RecipeIndex:
+    """Index ouvert en lecture seule, partagé entre threads."""
+
+    def __init__(self, corpus_path: str, index_dir: str):
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.meta = meta
+        self.n_docs = meta["n_docs"]
+        self.avg_doc_len = meta["avg_doc_len"] or 1.0
+        self.vocabulary = meta["vocabulary"]
+        self.allergen_names = meta["allergens"]
+        for name in _ARRAYS:
+            setattr(self, name, np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r"))
+
+        with open(corpus_path, "rb") as f:
+            self._corpus = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(corpus_path) else b""
+
+    @classmethod
+    def open(cls, corpus_path: str = None, rebuild: bool = False) -> "RecipeIndex":
+        """Ouvre l'index du corpus, en le (re)construisant s'il manque ou s'il est périmé."""
+        corpus_path = os.path.abspath(corpus_path or os.environ.get("CHEFBOT_RECIPES_PATH", DEFAULT_RECIPES_PATH))
+        index_dir = corpus_path + ".idx"
+        if rebuild or not cls._fresh(corpus_path, index_dir):
+            print(f"[RECETTES] Construction de l'index {index_dir}...")
+            build_index(corpus_path, index_dir)
+        return cls(corpus_path, index_dir)
+
+    @staticmethod
+    def _fresh(corpus_path: str, index_dir: str) -> bool:
+        try:
+            with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return (
+            meta.get("version") == INDEX_VERSION
+            and meta.get("corpus") == _signature(corpus_path)
+            and meta.get("ingredients") == _signature(_kb_path())
+        )
+
+    def recipe(self, doc: int) -> dict:
+        start, end = int(self.offsets[doc]), int(self.offsets[doc + 1])
+        return json.loads(self._corpus[start:end])
+
+    def _filter_mask(self, filters: Filters):
+        mask = np.ones(self.n_docs, dtype=bool)
+        if filters.course:
+            mask &= np.asarray(self.course) == COURSES.index(filters.course)
+        if filters.diets:
+            required = sum(DIETS[d] for d in filters.diets)
+            mask &= (np.asarray(self.diet) & required) == required
+        if filters.exclude_allergens:
+            excluded = sum(1 << self.allergen_names.index(a) for a in filters.exclude_allergens if a in self.allergen_names)
+            mask &= (np.asarray(self.allergens) & excluded) == 0
+            # Allergènes incomplets : impossible de garantir l'absence de ceux à éviter
+            mask &= np.asarray(self.allergens_unknown) == 0
+        if filters.max_cost is not None:
+            mask &= np.asarray(self.cost) <= filters.max_cost  # NaN (coût inconnu) -> False
+        return mask
+
+    def _bm25(self, terms: list):
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        doc_len = np.asarray(self.doc_len, dtype=np.float32)
+        for term in set(terms):
+            entry = self.vocabulary.get(term)
+            if entry is None:
+                continue
+            start, df = entry
+            docs = np.asarray(self.postings_docs[start:start + df])
+            tf = np.asarray(self.postings_tf[start:start + df], dtype=np.float32)
+            idf = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+            norm = K1 * (1 - B + B * doc_len[docs] / self.avg_doc_len)
+            # Un terme n'apparaît qu'une fois par document dans ses postings : l'indexation += est sûre
+            scores[docs] += idf * tf * (K1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, k: int = 5, course: str = None, diets=(), exclude_allergens=(),
+               max_cost: float = None) -> SearchResult:
+        """Recettes classées par BM25 parmi celles qui respectent les filtres (requête + arguments)."""
+        terms, filters = parse_query(query)
+        filters.course = course or filters.course
+        filters.diets.update(diets)
+        filters.exclude_allergens.update(exclude_allergens)
+        if max_cost is not None:
+            filters.max_cost = max_cost
+
+        mask = self._filter_mask(filters)
+        # Les termes absents du corpus ne comptent pas (sinon aucune recette ne ressortirait)
+        terms = [term for term in terms if term in self.vocabulary]
+        if terms:
+            scores = self._bm25(terms)
+            mask &= scores > 0
+        else:
+            # Aucun terme : toutes les recettes filtrées, les moins chères d'abord
+            scores = -np.nan_to_num(np.asarray(self.cost, dtype=np.float32), nan=np.inf)
+        candidates = np.flatnonzero(mask)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        hits = []
+        for doc in candidates:
+            recipe = self.recipe(int(doc))
+            cost = float(self.cost[doc])
+            hits.append(RecipeHit(
+                id=recipe.get("id", str(doc)),
+                nom=recipe["nom"],
+                categorie=recipe.get("categorie", ""),
+                score=float(scores[doc]) if terms else 0.0,
+                cost=None if math.isnan(cost) else cost,
+                diets=tuple(name for name, bit in DIETS.items() if self.diet[doc] & bit),
+                allergens=tuple(a for bit, a in enumerate(self.allergen_names) if self.allergens[doc] >> bit & 1),
+                allergens_known=not bool(self.allergens_unknown[doc]),
+                ingredients=tuple(name for name, _, _ in recipe["ingredients"]),
+            ))
+        return SearchResult(hits=tuple(hits), matches=int(mask.sum()), terms=tuple(terms), filters=filters)
+
+
+# =============================================================================
+# INDEX PARTAGÉ (un seul par corpus et par processus)
+# =============================================================================
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(corpus_path: Optional[str] = None) -> RecipeIndex:
+    """Retourne l'index partagé du corpus (par défaut $CHEFBOT_RECIPES_PATH ou data/recipes.jsonl)."""
+    path = os.path.abspath(corpus_path or os.environ.get("CHEFBOT_RECIPES_PATH", DEFAULT_RECIPES_PATH))
+    index = _indexes.get(path)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(path)
+            if index is None:
+                index = _indexes[path] = RecipeIndex.open(path)
+    return index
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Index des recettes ChefBot")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="(Re)construit l'index du corpus")
+    build.add_argument("corpus", nargs="?", default=None)
+    search = sub.add_parser("search", help="Recherche dans le corpus")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=5)
+    search.add_argument("--corpus", default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        index = RecipeIndex.open(args.corpus, rebuild=True)
+        print(f"{index.n_docs} recettes, {len(index.vocabulary)} termes")
+        return 0
+
+    result = get_index(args.corpus).search(args.query, k=args.k)
+    print(f"Termes: {' '.join(result.terms) or '-'} | Filtres: {result.filters.describe()} | {result.matches} recette(s)")
+    for hit in result.hits:
+        cost = f"{hit.cost:.2f}€" if hit.cost is not None else "?"
+        print(f"  {hit.score:6.2f}  {hit.nom} ({hit.categorie}, {cost}/portion) - {', '.join(hit.diets) or '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
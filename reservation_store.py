@@ -0,0 +1,225 @@
+"""
+Carnet de réservations indexé par date (SQLite)
+===============================================
+Remplace le dictionnaire codé en dur de `get_reservations` : les réservations
+sont chargées une fois dans une base SQLite (en mémoire par défaut) indexée sur
+(jour, service). Une semaine de planning du personnel devient une seule
+requête d'agrégat au lieu de sept appels d'outil.
+
+- Dates normalisées une seule fois, à l'entrée : '15/03/2025', '15-03-25',
+  '2025-03-15', '15 mars 2025', 'March 15, 2025', 'samedi 15 mars',
+  'demain'... -> datetime.date ; stockées en ISO (tri = ordre chronologique).
+- Requêtes : résumé d'un jour, plage de dates (jours vides compris),
+  couverts par jour, pic de service sur une période.
+
+Configuration :
+    CHEFBOT_RESERVATIONS_PATH=data/reservations.json   réservations initiales
+    CHEFBOT_RESERVATIONS_DB=reservations.db            base sur disque (sinon en mémoire)
+"""
+
+import datetime as dt
+import json
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from ingredient_kb import fold, parse_month
+
+DEFAULT_RESERVATIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "reservations.json")
+CAPACITY = 45           # couverts sur une journée : au-delà, service complet
+LIGHT_SERVICE = 15      # en dessous : service léger
+MAX_RANGE_DAYS = 92
+SERVICES = ("midi", "soir")
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+_IGNORED = frozenset(WEEKDAYS) | {
+    "lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche",
+    "mon", "tue", "wed", "thu", "fri", "sat", "sun", "le", "the", "of", "du", "on",
+}
+_RELATIVE = {"today": 0, "aujourd hui": 0, "tomorrow": 1, "demain": 1, "yesterday": -1, "hier": -1}
+_ORDINAL = re.compile(r"^(\d{1,2})(?:er|st|nd|rd|th|e)$")
+
+
+# =============================================================================
+# DATES
+# =============================================================================
+
+def parse_date(value, today: Optional[dt.date] = None) -> dt.date:
+    """'15/03/2025', '2025-03-15', '15 mars 2025', 'March 15', 'demain'... -> date. ValueError sinon."""
+    if isinstance(value, dt.datetime):
+        return value.date()
+    if isinstance(value, dt.date):
+        return value
+    today = today or dt.date.today()
+    key = fold(str(value))
+    if key in _RELATIVE:
+        return today + dt.timedelta(days=_RELATIVE[key])
+
+    tokens = [_ORDINAL.sub(r"\1", t) for t in key.split() if t not in _IGNORED]
+    numbers = [t for t in tokens if t.isdigit()]
+    words = [t for t in tokens if not t.isdigit()]
+    try:
+        if not words and len(numbers) in (2, 3):
+            if len(numbers[0]) == 4:                   # 2025-03-15
+                year, month, day = (int(n) for n in numbers + ["1"] * (3 - len(numbers)))
+            else:                                      # 15/03/2025, 15/03/25, 15/03
+                day, month = int(numbers[0]), int(numbers[1])
+                year = int(numbers[2]) if len(numbers) == 3 else today.year
+        elif len(words) == 1 and len(numbers) in (1, 2):
+            month = parse_month(words[0])
+            days = [int(n) for n in numbers if len(n) <= 2]
+            years = [int(n) for n in numbers if len(n) == 4]
+            if len(days) != 1 or len(years) > 1:
+                raise ValueError
+            day, year = days[0], years[0] if years else today.year
+        else:
+            raise ValueError
+        if year < 100:
+            year += 2000
+        return dt.date(year, month, day)
+    except ValueError:
+        raise ValueError(f"Date non reconnue : {value!r} (formats : JJ/MM/AAAA, AAAA-MM-JJ, '15 mars 2025')") from None
+
+
+def format_date(day: dt.date) -> str:
+    return day.strftime("%d/%m/%Y")
+
+
+# =============================================================================
+# CARNET
+# =============================================================================
+
+@dataclass(frozen=True)
+class DaySummary:
+    """Agrégat d'une journée : couverts, nombre de réservations, table VIP, couverts par service."""
+    day: dt.date
+    covers: int = 0
+    bookings: int = 0
+    vip: bool = False
+    services: tuple = ()   # ((service, couverts), ...)
+
+    def describe(self) -> str:
+        """Texte de l'outil : 'FULL SERVICE: 45 covers (VIP table booked)'."""
+        if not self.bookings:
+            return f"No reservations found for {format_date(self.day)}"
+        if self.covers >= CAPACITY:
+            label = "FULL SERVICE"
+        elif self.covers < LIGHT_SERVICE:
+            label = "Light service"
+        else:
+            label = "Regular service"
+        return f"{label}: {self.covers} covers{' (VIP table booked)' if self.vip else ''}"
+
+
+class ReservationStore:
+    """Réservations dans SQLite, indexées sur (jour ISO, service)."""
+
+    def __init__(self, path: str = ":memory:", seed_path: Optional[str] = DEFAULT_RESERVATIONS_PATH):
+        # Une connexion partagée entre threads, sérialisée par le verrou
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS reservations ("
+                " id INTEGER PRIMARY KEY, day TEXT NOT NULL, service TEXT NOT NULL,"
+                " covers INTEGER NOT NULL, name TEXT, vip INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS reservations_day ON reservations (day, service)")
+            empty = self._conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0] == 0
+        if empty and seed_path and os.path.exists(seed_path):
+            with open(seed_path, "r", encoding="utf-8") as f:
+                self.add_many(json.load(f))
+
+    @classmethod
+    def from_env(cls) -> "ReservationStore":
+        return cls(
+            path=os.environ.get("CHEFBOT_RESERVATIONS_DB", ":memory:"),
+            seed_path=os.environ.get("CHEFBOT_RESERVATIONS_PATH", DEFAULT_RESERVATIONS_PATH),
+        )
+
+    @staticmethod
+    def _row(booking: dict) -> tuple:
+        service = fold(booking.get("service") or "soir")
+        if service not in SERVICES:
+            raise ValueError(f"Service inconnu : {service!r} (connus : {', '.join(SERVICES)})")
+        covers = int(booking["couverts"])
+        if covers <= 0:
+            raise ValueError("Le nombre de couverts doit être positif")
+        return parse_date(booking["date"]).isoformat(), service, covers, booking.get("nom", ""), int(bool(booking.get("vip")))
+
+    def add_many(self, bookings) -> int:
+        """Ajoute des réservations {date, service, couverts, nom, vip}. ValueError si l'une est invalide."""
+        rows = [self._row(b) for b in bookings]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO reservations (day, service, covers, name, vip) VALUES (?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def add(self, date, covers: int, service: str = "soir", name: str = "", vip: bool = False) -> dt.date:
+        self.add_many([{"date": date, "service": service, "couverts": covers, "nom": name, "vip": vip}])
+        return parse_date(date)
+
+    def days(self, start, end=None) -> list:
+        """Un DaySummary par jour de [start, end] (bornes incluses), jours sans réservation compris."""
+        first = parse_date(start)
+        last = parse_date(end) if end else first
+        if last < first:
+            first, last = last, first
+        if (last - first).days >= MAX_RANGE_DAYS:
+            raise ValueError(f"Période trop longue : {MAX_RANGE_DAYS} jours au plus")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, service, SUM(covers), COUNT(*), MAX(vip) FROM reservations"
+                " WHERE day BETWEEN ? AND ? GROUP BY day, service ORDER BY day, service",
+                (first.isoformat(), last.isoformat()),
+            ).fetchall()
+        by_day = {}
+        for day, service, covers, bookings, vip in rows:
+            by_day.setdefault(day, []).append((service, covers, bookings, vip))
+        summaries = []
+        for offset in range((last - first).days + 1):
+            day = first + dt.timedelta(days=offset)
+            services = by_day.get(day.isoformat(), [])
+            summaries.append(DaySummary(
+                day=day,
+                covers=sum(s[1] for s in services),
+                bookings=sum(s[2] for s in services),
+                vip=any(s[3] for s in services),
+                services=tuple((s[0], s[1]) for s in services),
+            ))
+        return summaries
+
+    def day(self, date) -> DaySummary:
+        return self.days(date)[0]
+
+    def covers_per_day(self, start, end=None) -> dict:
+        return {summary.day: summary.covers for summary in self.days(start, end)}
+
+    def peak(self, start, end=None) -> Optional[tuple]:
+        """(jour, service, couverts) du service le plus chargé de la période, None si elle est vide."""
+        best = None
+        for summary in self.days(start, end):
+            for service, covers in summary.services:
+                if best is None or covers > best[2]:
+                    best = (summary.day, service, covers)
+        return best
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_reservation_store() -> ReservationStore:
+    """Carnet partagé par le processus (voir `ReservationStore.from_env`)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ReservationStore.from_env()
+    return _store
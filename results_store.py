@@ -0,0 +1,316 @@
+"""
+Résultats d'expériences en local (SQLite) et reprise incrémentale
+=================================================================
+Prérequis:
+    pip install numpy
+
+Les scores de `run_experiment` (07_boss.py) et `run_full_experiment`
+(03_evaluation.py) ne vivaient que dans Langfuse : chaque relance rejouait tous
+les items, même quand un seul modèle ou un seul prompt avait changé.
+
+Chaque résultat est rangé sous la clé
+    (expérience, hash de l'item, modèle, hash du prompt, version de l'évaluateur)
+et ses scores dans une table longue (une ligne par métrique), lue colonne par
+colonne en NumPy. Avant une relance, les items déjà notés pour la même
+configuration sont retirés du lot envoyé à Langfuse.
+
+Le rapport compare chaque configuration à une référence sur les items communs
+(appariés) : moyennes, écart et intervalle de confiance bootstrap à 95 %,
+calculé d'un bloc (matrice de rééchantillonnage n_boot x n_items).
+
+    python results_store.py list
+    python results_store.py report --experiment boss
+    python results_store.py report --experiment boss --baseline groq/llama-3.3-70b-versatile
+
+Configuration :
+    CHEFBOT_RESULTS_DB=data/experiments.db
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "experiments.db")
+N_BOOT = 10_000
+MAX_BOOT_CELLS = 4_000_000   # taille max d'un bloc de la matrice de rééchantillonnage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    experiment TEXT NOT NULL,
+    item_hash TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    evaluator_version TEXT NOT NULL,
+    run_name TEXT,
+    output TEXT,
+    created_at REAL NOT NULL,
+    UNIQUE (experiment, model_id, prompt_hash, evaluator_version, item_hash)
+);
+CREATE TABLE IF NOT EXISTS scores (
+    result_id INTEGER NOT NULL REFERENCES results (id) ON DELETE CASCADE,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (result_id, metric)
+);
+"""
+
+
+def content_hash(*parts) -> str:
+    """Empreinte courte et stable : valeurs JSON, ou code source pour les fonctions."""
+    digest = hashlib.sha1()
+    for part in parts:
+        if callable(part):
+            part = inspect.getsource(part)
+        digest.update(json.dumps(part, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def item_hash(item) -> str:
+    """Hash d'un item de dataset Langfuse (objet ou dict) : entrée + sortie attendue."""
+    if isinstance(item, dict):
+        return content_hash(item.get("input"), item.get("expected_output"))
+    return content_hash(item.input, item.expected_output)
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    """Une configuration comparée : modèle, prompt et évaluateur d'une expérience."""
+    experiment: str
+    model_id: str
+    prompt_hash: str
+    evaluator_version: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.model_id} (prompt {self.prompt_hash[:6]}, éval {self.evaluator_version[:6]})"
+
+
+# =============================================================================
+# BOOTSTRAP
+# =============================================================================
+
+def bootstrap_diff(baseline: np.ndarray, candidate: np.ndarray, paired: bool = True, n_boot: int = N_BOOT,
+                   alpha: float = 0.05, seed: int = 0) -> tuple:
+    """(écart moyen, borne basse, borne haute) de candidate - baseline, par bootstrap vectorisé."""
+    rng = np.random.default_rng(seed)
+    baseline = np.asarray(baseline, dtype=np.float64)
+    candidate = np.asarray(candidate, dtype=np.float64)
+    diff = candidate.mean() - baseline.mean()
+    if paired:
+        deltas = candidate - baseline
+        samples = [(deltas, 1)]
+    else:
+        samples = [(candidate, 1), (baseline, -1)]
+
+    boot = np.zeros(n_boot)
+    for values, sign in samples:
+        n = len(values)
+        rows = max(1, MAX_BOOT_CELLS // max(n, 1))
+        for start in range(0, n_boot, rows):
+            stop = min(n_boot, start + rows)
+            boot[start:stop] += sign * values[rng.integers(0, n, size=(stop - start, n))].mean(axis=1)
+    low, high = np.quantile(boot, [alpha / 2, 1 - alpha / 2])
+    return float(diff), float(low), float(high)
+
+
+# =============================================================================
+# STOCKAGE
+# =============================================================================
+
+class ResultsStore:
+    def __init__(self, path: str = DEFAULT_RESULTS_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Les évaluateurs Langfuse tournent dans des threads : une connexion partagée sous verrou
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls) -> "ResultsStore":
+        return cls(os.environ.get("CHEFBOT_RESULTS_DB", DEFAULT_RESULTS_PATH))
+
+    def done(self, config: RunConfig) -> set:
+        """Hash des items déjà notés pour cette configuration."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_hash FROM results WHERE experiment = ? AND model_id = ? AND prompt_hash = ? AND evaluator_version = ?",
+                (config.experiment, config.model_id, config.prompt_hash, config.evaluator_version),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def pending(self, config: RunConfig, items) -> list:
+        """Items du dataset qui restent à exécuter pour cette configuration."""
+        done = self.done(config)
+        return [item for item in items if item_hash(item) not in done]
+
+    def record(self, config: RunConfig, item_key: str, output, scores: dict, run_name: str = None):
+        """Enregistre (ou remplace) le résultat d'un item. Seuls les scores numériques sont gardés."""
+        numeric = {name: float(value) for name, value in scores.items() if isinstance(value, (int, float))}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM results WHERE experiment = ? AND model_id = ? AND prompt_hash = ? AND evaluator_version = ? AND item_hash = ?",
+                (config.experiment, config.model_id, config.prompt_hash, config.evaluator_version, item_key),
+            )
+            result_id = self._conn.execute(
+                "INSERT INTO results (experiment, item_hash, model_id, prompt_hash, evaluator_version, run_name, output, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (config.experiment, item_key, config.model_id, config.prompt_hash, config.evaluator_version,
+                 run_name, output if isinstance(output, str) else json.dumps(output, ensure_ascii=False, default=str), time.time()),
+            ).lastrowid
+            self._conn.executemany(
+                "INSERT INTO scores (result_id, metric, value) VALUES (?, ?, ?)",
+                [(result_id, name, value) for name, value in numeric.items()],
+            )
+
+    def record_experiment(self, config: RunConfig, experiment_result, run_name: str = None, skip=()) -> int:
+        """Range les `item_results` d'un `client.run_experiment` Langfuse, sauf les items de `skip`
+        et ceux sans sortie ni évaluation (tâche en échec). Renvoie le nombre d'items enregistrés."""
+        count = 0
+        for item_result in getattr(experiment_result, "item_results", None) or []:
+            key = item_hash(item_result.item)
+            if key in skip or item_result.output is None or not item_result.evaluations:
+                continue
+            scores = {e.name: e.value for e in item_result.evaluations}
+            self.record(config, key, item_result.output, scores, run_name=run_name)
+            count += 1
+        return count
+
+    def configs(self, experiment: str = None) -> list:
+        """[(RunConfig, nombre d'items)] par ordre de première exécution."""
+        query = ("SELECT experiment, model_id, prompt_hash, evaluator_version, COUNT(*), MIN(created_at) FROM results"
+                 + (" WHERE experiment = ?" if experiment else "")
+                 + " GROUP BY experiment, model_id, prompt_hash, evaluator_version ORDER BY MIN(created_at)")
+        with self._lock:
+            rows = self._conn.execute(query, (experiment,) if experiment else ()).fetchall()
+        return [(RunConfig(*row[:4]), row[4]) for row in rows]
+
+    def scores(self, config: RunConfig) -> tuple:
+        """(hash des items, métriques, matrice items x métriques avec NaN pour les scores absents)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.item_hash, s.metric, s.value FROM results r JOIN scores s ON s.result_id = r.id"
+                " WHERE r.experiment = ? AND r.model_id = ? AND r.prompt_hash = ? AND r.evaluator_version = ?",
+                (config.experiment, config.model_id, config.prompt_hash, config.evaluator_version),
+            ).fetchall()
+        items = sorted({row[0] for row in rows})
+        metrics = sorted({row[1] for row in rows})
+        item_pos = {h: i for i, h in enumerate(items)}
+        metric_pos = {m: j for j, m in enumerate(metrics)}
+        matrix = np.full((len(items), len(metrics)), np.nan)
+        if rows:
+            r = np.fromiter((item_pos[row[0]] for row in rows), dtype=np.intp, count=len(rows))
+            c = np.fromiter((metric_pos[row[1]] for row in rows), dtype=np.intp, count=len(rows))
+            matrix[r, c] = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+        return items, metrics, matrix
+
+    def compare(self, baseline: RunConfig, candidate: RunConfig, n_boot: int = N_BOOT, seed: int = 0) -> list:
+        """Une ligne par métrique commune : moyennes, écart et IC bootstrap (apparié sur les items communs)."""
+        items_a, metrics_a, matrix_a = self.scores(baseline)
+        items_b, metrics_b, matrix_b = self.scores(candidate)
+        common = sorted(set(items_a) & set(items_b))
+        rows = []
+        for metric in (m for m in metrics_a if m in metrics_b):
+            a = matrix_a[:, metrics_a.index(metric)]
+            b = matrix_b[:, metrics_b.index(metric)]
+            paired = len(common) >= 2
+            if paired:
+                pos_a = {h: i for i, h in enumerate(items_a)}
+                pos_b = {h: i for i, h in enumerate(items_b)}
+                a = a[[pos_a[h] for h in common]]
+                b = b[[pos_b[h] for h in common]]
+                keep = ~(np.isnan(a) | np.isnan(b))
+                a, b = a[keep], b[keep]
+            else:
+                a, b = a[~np.isnan(a)], b[~np.isnan(b)]
+            if len(a) == 0 or len(b) == 0:
+                continue
+            diff, low, high = bootstrap_diff(a, b, paired=paired, n_boot=n_boot, seed=seed)
+            rows.append({
+                "metric": metric, "n": int(len(a)) if paired else int(min(len(a), len(b))), "paired": paired,
+                "baseline": round(float(a.mean()), 4), "candidate": round(float(b.mean()), 4),
+                "diff": round(diff, 4), "ci_low": round(low, 4), "ci_high": round(high, 4),
+                "significant": bool(low > 0 or high < 0),
+            })
+        return rows
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def print_comparison_report(store: ResultsStore, experiment: str, baseline: str = None, n_boot: int = N_BOOT):
+    """Compare chaque configuration de l'expérience à la référence (la plus ancienne, ou celle du modèle `baseline`)."""
+    configs = [config for config, _ in store.configs(experiment)]
+    if len(configs) < 2:
+        print(f"[RÉSULTATS] {experiment} : {len(configs)} configuration(s), rien à comparer.")
+        return
+    reference = next((c for c in configs if baseline in (c.model_id, c.label)), configs[0]) if baseline else configs[0]
+    print(f"[RÉSULTATS] {experiment} : référence {reference.label}")
+    for config in configs:
+        if config == reference:
+            continue
+        print(f"  vs {config.label}")
+        for row in store.compare(reference, config, n_boot=n_boot):
+            mark = " *" if row["significant"] else ""
+            print(
+                f"    {row['metric']:<22} {row['baseline']:.3f} -> {row['candidate']:.3f}  "
+                f"écart {row['diff']:+.3f} [IC95 {row['ci_low']:+.3f}, {row['ci_high']:+.3f}] "
+                f"n={row['n']}{'' if row['paired'] else ' (non apparié)'}{mark}"
+            )
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_results_store(path: Optional[str] = None) -> ResultsStore:
+    """Base partagée par chemin (par défaut $CHEFBOT_RESULTS_DB ou data/experiments.db)."""
+    path = os.path.abspath(path or os.environ.get("CHEFBOT_RESULTS_DB", DEFAULT_RESULTS_PATH))
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                store = ResultsStore(path)
+                _stores[path] = store
+    return store
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Résultats d'expériences ChefBot")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", default=None, help="Base SQLite (sinon $CHEFBOT_RESULTS_DB ou data/experiments.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", parents=[common], help="Configurations enregistrées")
+    report = sub.add_parser("report", parents=[common], help="Comparaison des configurations avec IC bootstrap")
+    report.add_argument("--experiment", required=True)
+    report.add_argument("--baseline", default=None, help="Modèle de référence (sinon la plus ancienne configuration)")
+    report.add_argument("--n-boot", type=int, default=N_BOOT)
+    args = parser.parse_args(argv)
+
+    store = get_results_store(args.db)
+    if args.command == "list":
+        for config, count in store.configs():
+            print(f"{config.experiment:<12} {config.label:<60} {count} item(s)")
+        return 0
+    print_comparison_report(store, args.experiment, baseline=args.baseline, n_boot=args.n_boot)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+"""
+Traçage échantillonné et exporté en arrière-plan (remplace `langfuse.observe`)
+=============================================================================
+    from tracing import observe, update_current_trace, update_current_span
+
+    @observe(name="ask_chef", as_type="generation")
+    def ask_chef(question): ...
+
+Échantillonnage en tête (head-based) : la décision est prise une seule fois, à
+l'entrée du point d'entrée racine (premier @observe sans trace parente), puis
+héritée par tous les appels imbriqués via un ContextVar. Une trace non
+échantillonnée ne coûte qu'une lecture de ContextVar par appel imbriqué : ni
+span, ni client Langfuse, ni export.
+
+Variables d'environnement :
+    CHEFBOT_TRACING        langfuse (défaut) | file | off
+    CHEFBOT_TRACE_SAMPLE   taux d'échantillonnage : "0.1" ou "ask_chef=0.1,plan_weekly_menu=0.5,*=1"
+    CHEFBOT_TRACE_FILE     fichier JSONL de l'exporteur local (défaut : traces.jsonl)
+
+En mode `langfuse`, les traces échantillonnées passent par `langfuse.observe`,
+dont le SDK exporte déjà par lots dans un thread. En mode `file`, les spans sont
+écrits par lots dans un fichier JSONL par un thread d'arrière-plan (hors-ligne).
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+
+EXPORTERS = ("langfuse", "file", "off")
+PREVIEW_CHARS = 500
+
+
+class TracingConfig:
+    def __init__(self, exporter: str = "langfuse", default_rate: float = 1.0, rates: dict = None,
+                 path: str = "traces.jsonl", batch_size: int = 64, flush_interval: float = 1.0):
+        if exporter not in EXPORTERS:
+            raise ValueError(f"Exporteur inconnu : {exporter!r} (attendu : {', '.join(EXPORTERS)})")
+        self.exporter = exporter
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+    @staticmethod
+    def parse_rates(spec: str) -> tuple:
+        """'0.1' -> (0.1, {}) ; 'ask_chef=0.1,*=0.5' -> (0.5, {'ask_chef': 0.1})."""
+        default, rates = 1.0, {}
+        for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+            name, _, value = item.rpartition("=")
+            if name in ("", "*"):
+                default = float(value)
+            else:
+                rates[name.strip()] = float(value)
+        return default, rates
+
+    @classmethod
+    def from_env(cls) -> "TracingConfig":
+        default, rates = cls.parse_rates(os.environ.get("CHEFBOT_TRACE_SAMPLE", ""))
+        return cls(
+            exporter=os.environ.get("CHEFBOT_TRACING", "langfuse").lower(),
+            default_rate=default,
+            rates=rates,
+            path=os.environ.get("CHEFBOT_TRACE_FILE", "traces.jsonl"),
+        )
+
+    def sample_rate(self, name: str) -> float:
+        return self.rates.get(name, self.default_rate)
+
+
+# =============================================================================
+# SPANS ET CONTEXTE
+# =============================================================================
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "root", "name", "type", "start", "attributes", "trace_attributes")
+
+    def __init__(self, name: str, span_type: str, parent: "Span" = None):
+        self.span_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.type = span_type or "span"
+        self.start = time.time()
+        self.attributes = {}
+        if parent is None:
+            self.trace_id = uuid.uuid4().hex
+            self.parent_id = None
+            self.root = self
+            self.trace_attributes = {}
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self.root = parent.root
+            self.trace_attributes = None
+
+
+# Marqueur partagé par toutes les traces non échantillonnées
+_UNSAMPLED = object()
+_context = contextvars.ContextVar("chefbot_trace", default=None)
+
+_config = None
+_exporter = None
+_random = random.Random()
+_lock = threading.Lock()
+
+
+def get_config() -> TracingConfig:
+    global _config
+    if _config is None:
+        _config = TracingConfig.from_env()
+    return _config
+
+
+def configure(config: TracingConfig = None, **kwargs) -> TracingConfig:
+    """Change la configuration à chaud (ex: `configure(exporter="file", default_rate=0.1)`)."""
+    global _config, _exporter
+    with _lock:
+        if _exporter is not None:
+            _exporter.close()
+            _exporter = None
+        _config = config or TracingConfig(**kwargs)
+    return _config
+
+
+def current_span():
+    """Span courant, ou None hors trace / trace non échantillonnée."""
+    span = _context.get()
+    return None if span is _UNSAMPLED else span
+
+
+def _preview(value) -> str:
+    text = value if isinstance(value, str) else repr(value)
+    return text if len(text) <= PREVIEW_CHARS else text[:PREVIEW_CHARS] + "…"
+
+
+# =============================================================================
+# EXPORTEUR FICHIER (par lots, thread d'arrière-plan)
+# =============================================================================
+
+class BatchFileExporter:
+    def __init__(self, path: str, batch_size: int = 64, flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.exported = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._worker, name="chefbot-trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, record: dict):
+        # Appelé sur le chemin critique : simple dépôt dans la file
+        self._queue.put(record)
+
+    def flush(self, timeout: float = 5.0):
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join(timeout=5.0)
+
+    def _write(self, batch: list):
+        if not batch:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in batch))
+        self.exported += len(batch)
+        batch.clear()
+
+    def _worker(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = False
+            if item is None:
+                self._write(batch)
+                return
+            if isinstance(item, threading.Event):
+                self._write(batch)
+                item.set()
+            elif item is not False:
+                batch.append(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write(batch)
+                deadline = time.monotonic() + self.flush_interval
+
+
+def _get_exporter(config: TracingConfig) -> BatchFileExporter:
+    global _exporter
+    if _exporter is None:
+        with _lock:
+            if _exporter is None:
+                _exporter = BatchFileExporter(config.path, config.batch_size, config.flush_interval)
+    return _exporter
+
+
+def _run_exported(config: TracingConfig, span: Span, func, args, kwargs):
+    start = time.perf_counter()
+    status, error, output = "ok", None, None
+    try:
+        output = func(*args, **kwargs)
+        return output
+    except BaseException as e:
+        status, error = "error", f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record = {
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "type": span.type,
+            "start": span.start,
+            "duration_ms": round((time.perf_counter() - start) * 1e3, 3),
+            "status": status,
+            "error": error,
+            "input": _preview((args, kwargs)),
+            "output": _preview(output),
+            **span.attributes,
+        }
+        if span.trace_attributes is not None:
+            record["trace"] = span.trace_attributes
+        _get_exporter(config).export(record)
+
+
+# =============================================================================
+# API PUBLIQUE (mêmes signatures que langfuse)
+# =============================================================================
+
+def observe(func=None, *, name: str = None, as_type: str = None, **langfuse_kwargs):
+    def decorator(func):
+        span_name = name or func.__name__
+        langfuse_func = None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            nonlocal langfuse_func
+            parent = _context.get()
+            # Chemin rapide : trace parente non échantillonnée
+            if parent is _UNSAMPLED:
+                return func(*args, **kwargs)
+
+            config = _config or get_config()
+            if config.exporter == "off":
+                return func(*args, **kwargs)
+
+            if parent is None:
+                rate = config.sample_rate(span_name)
+                if rate < 1.0 and _random.random() >= rate:
+                    token = _context.set(_UNSAMPLED)
+                    try:
+                        return func(*args, **kwargs)
+                    finally:
+                        _context.reset(token)
+
+            span = Span(span_name, as_type, parent)
+            token = _context.set(span)
+            try:
+                if config.exporter == "file":
+                    return _run_exported(config, span, func, args, kwargs)
+                if langfuse_func is None:
+                    from langfuse import observe as langfuse_observe
+                    langfuse_func = langfuse_observe(name=span_name, as_type=as_type, **langfuse_kwargs)(func)
+                return langfuse_func(*args, **kwargs)
+            finally:
+                _context.reset(token)
+
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
+
+
+def update_current_trace(**attributes):
+    span = _context.get()
+    if span is None or span is _UNSAMPLED:
+        return
+    if get_config().exporter == "langfuse":
+        from langfuse import get_client
+        get_client().update_current_trace(**attributes)
+    else:
+        span.root.trace_attributes.update(attributes)
+
+
+def update_current_span(**attributes):
+    span = _context.get()
+    if span is None or span is _UNSAMPLED:
+        return
+    if get_config().exporter == "langfuse":
+        from langfuse import get_client
+        get_client().update_current_span(**attributes)
+    else:
+        span.attributes.update(attributes)
+
+
+def flush():
+    """Vide l'exporteur local et, s'il est chargé (traces ou datasets), le client Langfuse."""
+    if _exporter is not None:
+        _exporter.flush()
+    if "langfuse" in sys.modules:
+        from langfuse import get_client
+        get_client().flush()
+
+
+def _flush_at_exit():
+    # Langfuse vide déjà son propre client à la sortie
+    if _exporter is not None:
+        _exporter.flush()
+
+
+atexit.register(_flush_at_exit)